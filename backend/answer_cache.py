@@ -0,0 +1,239 @@
+"""
+Near-duplicate answer cache for the stateless /chat endpoint.
+
+Only FAQ-style questions are cached: short, phrased as a question, made
+almost entirely of FAQ_INTENTS keywords (booking, pricing, privacy, ...) and
+FAQ_FILLER words, with no first-person disclosure ("my ...", "I feel ...")
+and none of the RISK_RE crisis, abuse or violence terms. Anything else is
+never stored or answered from the cache: a question that carries the asker's
+own circumstances gets its own answer.
+
+Questions are first canonicalised (lowercase, punctuation and apostrophes
+dropped, contractions expanded, British/variant spellings mapped), then turned
+into hashed sparse features (stemmed words, word bigrams, character trigrams)
+folded into a fixed-size, L2-normalised vector. Each entry also carries a
+signature of its guard tokens: negations plus the FAQ keywords it mentions. A
+lookup only considers entries with the same signature, so "how do I cancel a
+booking" never matches "how do I book", nor "not" its absence; among those it
+is a single matrix-vector product, and the best match is served if its cosine
+similarity clears the threshold and it hasn't expired. Eviction is
+least-recently-used once capacity is reached.
+"""
+import os
+import re
+import threading
+import time
+import zlib
+from collections import deque
+
+import numpy as np
+
+from retrieval import stem, tokenize
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") != "0"
+ANSWER_CACHE_CAPACITY = int(os.getenv("ANSWER_CACHE_CAPACITY", "512"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(60 * 60 * 6)))
+# Only short, FAQ-style questions are worth caching (and safe to answer from cache)
+ANSWER_CACHE_MAX_CHARS = int(os.getenv("ANSWER_CACHE_MAX_CHARS", "200"))
+# Content words that are neither FAQ keywords nor FAQ_FILLER a cacheable question may have
+ANSWER_CACHE_MAX_OTHER_TOKENS = int(os.getenv("ANSWER_CACHE_MAX_OTHER_TOKENS", "1"))
+FEATURE_DIM = 2 ** 12
+
+# Variant spellings and shorthand, mapped before tokenizing
+SPELLINGS = {
+    "counsellor": "counselor", "counsellors": "counselors", "counselling": "counseling",
+    "counselled": "counseled", "cancelled": "canceled", "cancelling": "canceling",
+    "behaviour": "behavior", "programme": "program", "programmes": "programs",
+    "organise": "organize", "apointment": "appointment", "appoinment": "appointment",
+    "councelor": "counselor", "councellor": "counselor", "therapists": "therapist",
+    "checkin": "check in", "checkins": "check ins", "signup": "sign up", "login": "log in",
+    "pls": "please", "plz": "please", "u": "you", "ur": "your", "r": "are",
+}
+CONTRACTIONS = {
+    "dont": "do not", "doesnt": "does not", "didnt": "did not", "cant": "can not",
+    "cannot": "can not", "wont": "will not", "isnt": "is not", "arent": "are not",
+    "wasnt": "was not", "werent": "were not", "havent": "have not", "hasnt": "has not",
+    "shouldnt": "should not", "wouldnt": "would not", "couldnt": "could not", "aint": "is not",
+    "im": "i am", "ive": "i have",
+}
+NEGATIONS = frozenset("not no never nothing nobody none nor neither without".split())
+QUESTION_WORDS = frozenset("how what where when which who why can could do does is are will should may".split())
+
+# Topics whose answers don't depend on who is asking; a cacheable question names at least one
+FAQ_INTENTS = {
+    intent: frozenset(stem(w) for w in words.split())
+    for intent, words in {
+        "booking": "book booking appointment appointments schedule reschedule slot slots cancel canceling "
+                   "counselor counselors counseling therapist session sessions",
+        "pricing": "price prices pricing cost costs fee fees pay payment free premium subscription plan plans "
+                   "upgrade afford affordable",
+        "privacy": "anonymous anonymity private privacy confidential confidentiality secure data",
+        "checkin": "check assessment assessments mood tracker",
+        "community": "forum forums workshop workshops community peer mindfulness resources",
+        "account": "account register sign log password email",
+        "about": "mindcare platform app",
+    }.items()
+}
+FAQ_KEYWORDS = frozenset().union(*FAQ_INTENTS.values())
+# Question words and generic verbs that carry no personal context
+FAQ_FILLER = frozenset(stem(w) for w in (
+    "how what where when which who why can could should would may much many long often "
+    "need get use work works find make start help offer offers available online there any "
+    "not no".split()
+))
+
+# First-person disclosures: the answer depends on the asker, so never shared
+DISCLOSURE_RE = re.compile(
+    r"\b(my|mine|myself|i (feel|felt|have|had|am|was|been|keep|think|cant|can not|do not|did not|"
+    r"just|really|always|never|still|hate|lost|got))\b"
+)
+
+# Crisis and risk language: never cached, never answered from the cache
+RISK_RE = re.compile(
+    r"\b(suicid\w*|kill\w*|murder\w*|self ?harm\w*|harm(ing)? (my|your|him|her|them)sel\w+|"
+    r"hurt(ing)? (my|your|him|her|them)sel\w+|cut(ting)? (my|your)sel\w+|"
+    r"end(ing)? (my|it|it all|things)|want(ed)? to die|wanna die|die|dying|dead|death|overdos\w*|"
+    r"pills|hang(ing)?|jump(ing)? off|no reason to live|better off|hopeless\w*|worthless|"
+    r"abus\w*|rape\w*|raped|assault\w*|violen\w*|weapon\w*|gun|unsafe|danger\w*|"
+    r"hit|hits|hitting|beat|beats|beating|beaten|punch\w*|slap\w*|kick\w*|chok\w*|strangl\w*|"
+    r"threat\w*|stalk\w*|molest\w*|harass\w*|bully\w*|bullied|domestic|afraid|scared|"
+    r"emergenc\w*|crisis|urgent\w*)\b"
+)
+
+
+def canonicalize(text: str) -> str:
+    """Lowercase words with punctuation dropped, contractions expanded and spellings unified."""
+    text = (text or "").lower().replace("\u2019", "'").replace("'", "")
+    return " ".join(CONTRACTIONS.get(w) or SPELLINGS.get(w) or w for w in re.findall(r"[a-z0-9]+", text))
+
+
+def normalize(text: str) -> str:
+    return " ".join(tokenize(canonicalize(text)))
+
+
+def signature(text: str):
+    """Hash of the guard tokens (negations and FAQ keywords), or None unless text is a
+    cacheable FAQ question."""
+    canon = canonicalize(text)
+    words = canon.split()
+    if not words or RISK_RE.search(canon) or DISCLOSURE_RE.search(canon):
+        return None
+    if words[0] not in QUESTION_WORDS and not (text or "").rstrip().endswith("?"):
+        return None
+    stems = set(tokenize(canon))
+    keywords = stems & FAQ_KEYWORDS
+    if not keywords or len(stems - FAQ_KEYWORDS - FAQ_FILLER) > ANSWER_CACHE_MAX_OTHER_TOKENS:
+        return None
+    guards = sorted(keywords | (NEGATIONS & set(words)))
+    return zlib.crc32(" ".join(guards).encode("utf-8"))
+
+
+def embed(text: str, dim: int = FEATURE_DIM) -> np.ndarray:
+    """Signed feature hashing of words, word bigrams and char trigrams."""
+    words = tokenize(canonicalize(text))
+    features = [(w, 1.0) for w in words]
+    features += [(f"{a}_{b}", 1.0) for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"#{w}#"
+        features += [(padded[i:i + 3], 0.5) for i in range(len(padded) - 2)]
+    vec = np.zeros(dim, dtype=np.float32)
+    for feat, weight in features:
+        h = zlib.crc32(feat.encode("utf-8"))
+        vec[h % dim] += weight if (h >> 31) & 1 else -weight
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class AnswerCache:
+    def __init__(self, capacity: int, threshold: float, ttl_seconds: int, dim: int = FEATURE_DIM):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.dim = dim
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._expires = np.zeros(capacity, dtype=np.float64)     # 0 = empty slot
+        self._signatures = np.zeros(capacity, dtype=np.int64)    # guard-token hash per slot
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._entries = [None] * capacity                        # (normalized question, answer)
+        self._slot_of = {}                                       # normalized question -> slot
+        self._tick = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._latencies_ms = deque(maxlen=1000)
+
+    def _signature(self, message: str):
+        if not message or len(message) > ANSWER_CACHE_MAX_CHARS:
+            return None
+        return signature(message)
+
+    def cacheable(self, message: str) -> bool:
+        return self._signature(message) is not None
+
+    def get(self, message: str):
+        """Cached answer for a near-duplicate question with the same guard tokens, or None."""
+        sig = self._signature(message)
+        if sig is None:
+            return None
+        start = time.perf_counter()
+        vec = embed(message, self.dim)
+        with self._lock:
+            answer = None
+            candidates = (self._expires > time.time()) & (self._signatures == sig)
+            if candidates.any():
+                sims = self._vectors @ vec
+                sims[~candidates] = -1.0
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    self._tick += 1
+                    self._last_used[best] = self._tick
+                    answer = self._entries[best][1]
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._latencies_ms.append((time.perf_counter() - start) * 1000)
+        return answer
+
+    def put(self, message: str, answer: str):
+        sig = self._signature(message)
+        if sig is None:
+            return
+        key = normalize(message)
+        vec = embed(message, self.dim)
+        with self._lock:
+            slot = self._slot_of.get(key)
+            if slot is None:
+                # free/expired slot first, otherwise the least recently used one
+                free = np.flatnonzero(self._expires <= time.time())
+                slot = int(free[0]) if len(free) else int(np.argmin(self._last_used))
+                old = self._entries[slot]
+                if old is not None:
+                    self._slot_of.pop(old[0], None)
+                self._slot_of[key] = slot
+            self._tick += 1
+            self._vectors[slot] = vec
+            self._signatures[slot] = sig
+            self._expires[slot] = time.time() + self.ttl_seconds
+            self._last_used[slot] = self._tick
+            self._entries[slot] = (key, answer)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            lat = sorted(self._latencies_ms)
+            return {
+                "entries": int((self._expires > time.time()).sum()),
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "lookup_ms_p50": round(lat[len(lat) // 2], 3) if lat else None,
+                "lookup_ms_p95": round(lat[int(len(lat) * 0.95)], 3) if lat else None,
+            }
+
+
+answer_cache = AnswerCache(ANSWER_CACHE_CAPACITY, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL_SECONDS)
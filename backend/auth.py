@@ -1,4 +1,6 @@
-import os, time, jwt
+import os, time, jwt, asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from passlib.context import CryptContext
 from dotenv import load_dotenv
 
@@ -10,7 +12,18 @@ JWT_ALG = os.getenv("JWT_ALG", "HS256")
 # default: 7 days; override with JWT_TTL_SECONDS in .env if needed
 JWT_TTL_SECONDS = int(os.getenv("JWT_TTL_SECONDS", str(60*60*24*7)))
 
-pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor; hashes made with any other cost are re-hashed on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# processes for hashing off the request path; 0 = hash in the server's threadpool instead
+BCRYPT_POOL_SIZE = int(os.getenv("BCRYPT_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+
+pwd = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def hash_password(raw: str) -> str:
     return pwd.hash(raw)
@@ -18,6 +31,42 @@ def hash_password(raw: str) -> str:
 def verify_password(raw: str, hashed: str) -> bool:
     return pwd.verify(raw, hashed)
 
+def verify_and_update_password(raw: str, hashed: str):
+    """(ok, new_hash); new_hash is set when the stored hash uses another cost factor."""
+    return pwd.verify_and_update(raw, hashed)
+
+# -------------------- Off-request hashing --------------------
+# bcrypt is CPU-bound and holds the GIL long enough to starve other requests, so the
+# async variants run it in a small process pool ("spawn": safe next to server threads).
+
+_pool = None
+
+def _hash_pool():
+    global _pool
+    if _pool is None and BCRYPT_POOL_SIZE > 0:
+        _pool = ProcessPoolExecutor(
+            max_workers=BCRYPT_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+async def _run_hashing(fn, *args):
+    loop = asyncio.get_running_loop()
+    # executor None = default thread pool (BCRYPT_POOL_SIZE=0)
+    return await loop.run_in_executor(_hash_pool(), fn, *args)
+
+async def hash_password_async(raw: str) -> str:
+    return await _run_hashing(hash_password, raw)
+
+async def verify_and_update_password_async(raw: str, hashed: str):
+    return await _run_hashing(verify_and_update_password, raw, hashed)
+
+def shutdown_hash_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
 # auth.py
 def make_jwt(sub: int, email: str, exp_seconds: int = 60*60*24*7) -> str:
     payload = {
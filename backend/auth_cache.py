@@ -0,0 +1,167 @@
+"""
+Zero-DB fast path for auth_user.
+
+- token cache: sha256(token) -> (user_id, exp). A token is decoded and verified
+  once; later requests only check exp. Entries never outlive the token.
+- user cache: user_id -> AuthUser(id, email, plan, deleted) for
+  AUTH_USER_CACHE_TTL_SECONDS. Changes to User.plan / User.deleted made through
+  the ORM invalidate the entry when their transaction commits, but only in this
+  process: other workers keep their entry until the TTL runs out.
+
+That staleness is accepted for reads only. Write requests call load_user with
+fresh=True, which always reads the row (and refreshes the entry), so a deleted
+or downgraded account can't write, book or pass require_premium on any worker.
+A deleted account may still read its own data on another worker for up to the
+TTL.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from auth import decode_jwt
+from models import User
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class AuthUser:
+    """Detached snapshot of the columns routes read from the signed-in user."""
+    __slots__ = ("id", "email", "plan", "deleted")
+
+    def __init__(self, id: int, email: str, plan: str, deleted: bool):
+        self.id = id
+        self.email = email
+        self.plan = plan
+        self.deleted = deleted
+
+
+class _LRU:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, now: float):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, expires_at: float):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+token_cache = _LRU(AUTH_TOKEN_CACHE_SIZE)
+user_cache = _LRU(AUTH_USER_CACHE_SIZE)
+
+
+def token_user_id(token: str) -> int:
+    """User id from a verified, unexpired JWT; raises InvalidToken."""
+    now = time.time()
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    user_id = token_cache.get(key, now)
+    if user_id is not None:
+        return user_id
+    try:
+        payload = decode_jwt(token)
+    except Exception as e:
+        print("[auth] decode error:", repr(e))
+        raise InvalidToken() from e
+    # accept str sub (what make_jwt writes) and normalize to int for DB lookups
+    try:
+        user_id = int(payload["sub"])
+        exp = float(payload["exp"])
+    except (KeyError, TypeError, ValueError) as e:
+        print("[auth] bad token claims:", e)
+        raise InvalidToken() from e
+    token_cache.put(key, user_id, exp)
+    return user_id
+
+
+def load_user(db: Session, user_id: int, fresh: bool = False):
+    """AuthUser for an active user, from the cache or one primary-key query; None if missing/deleted.
+    fresh=True skips the cached entry (write paths: plan and deleted as committed)."""
+    user = None if fresh else user_cache.get(user_id, time.time())
+    if user is None:
+        row = (
+            db.query(User.id, User.email, User.plan, User.deleted)
+            .filter(User.id == user_id, User.deleted == False)
+            .first()
+        )
+        if not row:
+            user_cache.pop(user_id)
+            return None
+        user = AuthUser(row.id, row.email, row.plan or "free", bool(row.deleted))
+        user_cache.put(user_id, user, time.time() + AUTH_USER_CACHE_TTL_SECONDS)
+    return user
+
+
+def invalidate_user(user_id: int):
+    user_cache.pop(user_id)
+
+
+def stats() -> dict:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+
+# ---- invalidation on ORM writes to users.plan / users.deleted ----
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_changes(session, flush_context):
+    changed = session.info.setdefault("auth_users_changed", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if obj in session.deleted or any(
+                state.attrs[name].history.has_changes() for name in ("plan", "deleted", "email")
+            ):
+                changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("auth_users_changed", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_user_changes(session):
+    session.info.pop("auth_users_changed", None)
@@ -0,0 +1,178 @@
+"""
+Recurring availability: AvailabilityRule rows are expanded into slots on read,
+and an AvailabilitySlot row is written only when an occurrence is booked.
+
+A listed slot is either
+- concrete: a row in availability_slots (older seeds, imports, booked
+  occurrences); its id is the integer row id, as before
+- virtual: a rule occurrence with no row yet; its id is
+  "r<rule_id>-<YYYYmmddHHMM>" (UTC start), which POST /bookings accepts
+  wherever it accepts a row id
+
+An occurrence is not listed when availability_slots already has a row for
+that counselor and start time (a free row is listed as itself), or when an
+AvailabilityException covers its local day or start minute. The unique
+(counselor_id, start_time) index makes materializing race-safe: of two
+bookings for one occurrence, one inserts the row and the other finds it and
+gets the usual 409 from the conditional claim.
+"""
+import re
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import AvailabilityException, AvailabilityRule, AvailabilitySlot
+
+_VIRTUAL_ID = re.compile(r"^r(\d+)-(\d{12})$")
+MAX_UTC_OFFSET = timedelta(hours=14)
+
+
+class Occurrence:
+    __slots__ = ("id", "counselor_id", "start_time", "end_time")
+
+    def __init__(self, id, counselor_id: int, start_time: datetime, end_time: datetime):
+        self.id = id
+        self.counselor_id = counselor_id
+        self.start_time = start_time
+        self.end_time = end_time
+
+
+def virtual_slot_id(rule_id: int, start_time: datetime) -> str:
+    return f"r{rule_id}-{start_time:%Y%m%d%H%M}"
+
+
+def parse_virtual_slot_id(value):
+    """(rule_id, UTC start) for a virtual slot id; None for anything else."""
+    m = _VIRTUAL_ID.match(str(value))
+    if not m:
+        return None
+    try:
+        return int(m.group(1)), datetime.strptime(m.group(2), "%Y%m%d%H%M")
+    except ValueError:
+        return None
+
+
+def expand(rules, exceptions, start: datetime, end: datetime) -> list:
+    """Occurrences starting in [start, end] (naive UTC), exceptions removed,
+    one per counselor and start time, sorted by (start_time, counselor_id)."""
+    if not rules:
+        return []
+    off = {(e.counselor_id, e.day, e.start_minute) for e in exceptions}
+    by_weekday = defaultdict(list)
+    for r in sorted(rules, key=lambda r: r.id):
+        by_weekday[r.weekday].append(r)
+
+    out, seen = [], set()
+    day = (start - MAX_UTC_OFFSET).date()
+    last = (end + MAX_UTC_OFFSET).date()
+    while day <= last:
+        for r in by_weekday.get(day.weekday(), ()):
+            if day < r.valid_from or (r.valid_until is not None and day > r.valid_until):
+                continue
+            if (r.counselor_id, day, None) in off or (r.counselor_id, day, r.start_minute) in off:
+                continue
+            s = datetime.combine(day, time()) + timedelta(minutes=r.start_minute - r.utc_offset_minutes)
+            if not start <= s <= end or (s, r.counselor_id) in seen:
+                continue
+            seen.add((s, r.counselor_id))
+            out.append(Occurrence(virtual_slot_id(r.id, s), r.counselor_id, s,
+                                  s + timedelta(minutes=r.duration_minutes)))
+        day += timedelta(days=1)
+    out.sort(key=lambda o: (o.start_time, o.counselor_id))
+    return out
+
+
+# what expand() reads; rows rather than entities, rules are loaded on every slot listing
+RULE_COLUMNS = (AvailabilityRule.id, AvailabilityRule.counselor_id, AvailabilityRule.weekday,
+                AvailabilityRule.start_minute, AvailabilityRule.duration_minutes,
+                AvailabilityRule.utc_offset_minutes, AvailabilityRule.valid_from, AvailabilityRule.valid_until)
+
+
+def load_rules(db: Session, counselor_id: int = None) -> list:
+    q = db.query(*RULE_COLUMNS)
+    if counselor_id is not None:
+        q = q.filter(AvailabilityRule.counselor_id == counselor_id)
+    return q.all()
+
+
+def load_exceptions(db: Session, start: datetime, end: datetime, counselor_id: int = None) -> list:
+    """Exceptions on any local day the UTC window [start, end] can touch."""
+    q = db.query(AvailabilityException.counselor_id, AvailabilityException.day, AvailabilityException.start_minute)
+    if counselor_id is not None:
+        q = q.filter(AvailabilityException.counselor_id == counselor_id)
+    return q.filter(AvailabilityException.day >= (start - MAX_UTC_OFFSET).date(),
+                    AvailabilityException.day <= (end + MAX_UTC_OFFSET).date()).all()
+
+
+def open_slots(db: Session, counselor_id: int, start: datetime, end: datetime) -> list:
+    """Free slots of one counselor starting in [start, end]: concrete rows and
+    rule occurrences merged, earliest first."""
+    rows = (
+        db.query(AvailabilitySlot.id, AvailabilitySlot.start_time, AvailabilitySlot.end_time, AvailabilitySlot.is_booked)
+        .filter(AvailabilitySlot.counselor_id == counselor_id,
+                AvailabilitySlot.start_time >= start,
+                AvailabilitySlot.start_time <= end)
+        .order_by(AvailabilitySlot.start_time.asc())
+        .all()
+    )
+    taken = {r.start_time for r in rows}
+    out = [Occurrence(r.id, counselor_id, r.start_time, r.end_time) for r in rows if not r.is_booked]
+    rules = load_rules(db, counselor_id)
+    if rules:
+        exceptions = load_exceptions(db, start, end, counselor_id)
+        out += [o for o in expand(rules, exceptions, start, end) if o.start_time not in taken]
+        out.sort(key=lambda o: o.start_time)
+    return out
+
+
+def _slot_at(db: Session, counselor_id: int, start_time: datetime):
+    return (
+        db.query(AvailabilitySlot)
+        .filter(AvailabilitySlot.counselor_id == counselor_id, AvailabilitySlot.start_time == start_time)
+        .first()
+    )
+
+
+def resolve_slot(db: Session, counselor_id: int, slot_ref):
+    """The AvailabilitySlot a booking names: a row id, or a virtual id whose
+    occurrence is materialized (unbooked) in the caller's transaction.
+    None if it doesn't name a slot of this counselor."""
+    parsed = parse_virtual_slot_id(slot_ref)
+    if parsed is None:
+        try:
+            slot_id = int(slot_ref)
+        except (TypeError, ValueError):
+            return None
+        return (
+            db.query(AvailabilitySlot)
+            .filter(AvailabilitySlot.id == slot_id, AvailabilitySlot.counselor_id == counselor_id)
+            .first()
+        )
+
+    rule_id, start_time = parsed
+    rule = (
+        db.query(AvailabilityRule)
+        .filter(AvailabilityRule.id == rule_id, AvailabilityRule.counselor_id == counselor_id)
+        .first()
+    )
+    if not rule:
+        return None
+    exceptions = load_exceptions(db, start_time, start_time, counselor_id)
+    occurrence = expand([rule], exceptions, start_time, start_time)
+    if not occurrence:
+        return None
+
+    existing = _slot_at(db, counselor_id, start_time)
+    if existing:
+        return existing
+    try:
+        with db.begin_nested():
+            slot = AvailabilitySlot(counselor_id=counselor_id, start_time=start_time,
+                                    end_time=occurrence[0].end_time, is_booked=False)
+            db.add(slot)
+        return slot
+    except IntegrityError:
+        # a concurrent booking materialized it first
+        return _slot_at(db, counselor_id, start_time)
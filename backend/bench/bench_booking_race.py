@@ -0,0 +1,169 @@
+"""
+Booking race: hundreds of simultaneous POST /bookings for the same few slots.
+
+Seeds premium users and --slots open slots, starts the app under uvicorn,
+releases --concurrency clients at once through a barrier (each sends
+--requests / --concurrency bookings for random slots) and then checks:
+
+- exactly one 200 per slot that was requested, every other attempt a 409
+- no 5xx / transport errors
+- the database agrees: one booking per booked slot, no booking for a free slot
+
+Prints throughput, latency percentiles and the checks as JSON; exits 1 if any
+check fails.
+
+Run from backend/:  python bench/bench_booking_race.py --slots 5 --requests 1000 --concurrency 200
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH.parent))
+sys.path.insert(0, str(BENCH))
+
+from loadtest import free_port, git_rev, percentile, seed  # noqa: E402
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--database-url", help="default: a fresh SQLite file in a temp dir")
+    ap.add_argument("--users", type=int, default=100)
+    ap.add_argument("--slots", type=int, default=5, help="contended slots")
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    return ap.parse_args()
+
+
+def fire(base_url, fx, args):
+    """Returns [(slot_id, status, ms)] and the wall time of the burst."""
+    import httpx
+
+    users = fx["users"]
+    cid = fx["counselors"][0]
+    slot_ids = fx["slots"][cid]
+    per_client = max(1, args.requests // args.concurrency)
+    barrier = threading.Barrier(args.concurrency)
+    results, lock = [], threading.Lock()
+
+    def client(n):
+        rng = random.Random(args.seed + n)
+        out = []
+        with httpx.Client(base_url=base_url, timeout=60) as http:
+            barrier.wait()
+            for _ in range(per_client):
+                user = rng.choice(users)
+                slot_id = rng.choice(slot_ids)
+                start = time.perf_counter()
+                try:
+                    status = http.post("/bookings", json={"counselor_id": cid, "slot_id": slot_id},
+                                       headers={"Authorization": f"Bearer {user['token']}"}).status_code
+                except Exception as e:
+                    status = type(e).__name__
+                out.append((slot_id, status, (time.perf_counter() - start) * 1000))
+        with lock:
+            results.extend(out)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(args.concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - start
+
+
+def check(results, fx):
+    from sqlalchemy import func
+
+    from database import SessionLocal
+    from models import AvailabilitySlot, Booking
+
+    cid = fx["counselors"][0]
+    slot_ids = fx["slots"][cid]
+    wins = Counter(slot for slot, status, _ in results if status == 200)
+    requested = {slot for slot, _, _ in results}
+    bad = Counter(str(status) for _, status, _ in results if status not in (200, 409))
+
+    db = SessionLocal()
+    try:
+        per_slot = dict(
+            db.query(Booking.slot_id, func.count(Booking.id))
+            .filter(Booking.slot_id.in_(slot_ids))
+            .group_by(Booking.slot_id)
+            .all()
+        )
+        booked = {sid for (sid,) in db.query(AvailabilitySlot.id)
+                  .filter(AvailabilitySlot.id.in_(slot_ids), AvailabilitySlot.is_booked == True)}
+    finally:
+        db.close()
+
+    checks = {
+        "one_winner_per_requested_slot": all(wins.get(s) == 1 for s in requested),
+        "no_unexpected_statuses": not bad,
+        "db_one_booking_per_slot": all(n == 1 for n in per_slot.values()),
+        "db_booked_flags_match_bookings": booked == set(per_slot),
+        "db_bookings_match_successes": sum(per_slot.values()) == sum(wins.values()),
+    }
+    return checks, dict(bad)
+
+
+def main():
+    args = parse_args()
+    if not args.database_url:
+        tmp = tempfile.mkdtemp(prefix="mindcare-race-")
+        args.database_url = f"sqlite:///{tmp}/race.db"
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("JWT_SECRET", "loadtest-only-secret-0123456789abcdef")
+
+    fx = seed(argparse.Namespace(users=args.users, premium_ratio=1.0, checkins_per_user=0, sessions_per_user=0,
+                                 messages_per_session=0, counselors=1, days=args.slots, slots_per_day=1),
+              random.Random(args.seed))
+
+    import uvicorn
+    import main as app_module
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port,
+                                           log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    print(f"[race] {args.concurrency} clients x {args.requests // args.concurrency} bookings "
+          f"over {args.slots} slots", file=sys.stderr)
+    results, seconds = fire(f"http://127.0.0.1:{port}", fx, args)
+    server.should_exit = True
+
+    checks, unexpected = check(results, fx)
+    latencies = [ms for _, _, ms in results]
+    report = {
+        "meta": {"git_rev": git_rev(), "cpus": os.cpu_count(),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("database_url", "out")}},
+        "requests": len(results),
+        "seconds": round(seconds, 3),
+        "rps": round(len(results) / seconds, 1),
+        "statuses": dict(Counter(str(status) for _, status, _ in results)),
+        "unexpected": unexpected,
+        "latency_ms": {p: round(percentile(latencies, q), 2) for p, q in (("p50", 50), ("p95", 95), ("p99", 99))},
+        "checks": checks,
+        "ok": all(checks.values()),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text)
+    if not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
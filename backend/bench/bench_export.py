@@ -0,0 +1,161 @@
+"""
+Session export memory and throughput as the history grows.
+
+For each of --sizes, adds a session with that many messages to one user, then
+requests it through the ASGI app (nothing collected client-side) as
+
+- GET /chat/sessions/{sid}/export              (NDJSON)
+- GET /chat/sessions/{sid}/export?format=ndjson.gz
+- GET /chat/sessions/{sid}/messages            (unpaged list, for comparison)
+
+and reports tracemalloc's peak per request, time, body size and throughput
+(times are with tracemalloc on, so slower than in production).
+Exits 1 unless every export has one line per message (plus the export and
+session lines) and the export's peak at the largest size stays within
+--max-growth times its peak at the smallest, i.e. memory doesn't follow the
+history size.
+
+Run from backend/:  python bench/bench_export.py --sizes 2000,10000,40000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from pathlib import Path
+from urllib.parse import urlencode
+
+import anyio
+
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH.parent))
+sys.path.insert(0, str(BENCH))
+
+from bench_list_memory import add_large_session  # noqa: E402
+from loadtest import git_rev, seed  # noqa: E402
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--database-url", help="default: a fresh SQLite file in a temp dir")
+    ap.add_argument("--sizes", default="2000,10000,40000", help="messages per exported session")
+    ap.add_argument("--max-growth", type=float, default=2.0)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    return ap.parse_args()
+
+
+async def asgi_get(app, path: str, params: dict, token: str) -> dict:
+    """GET through the ASGI app; body chunks are counted (and gunzipped to count
+    lines) as they are sent, then dropped."""
+    stats = {"status": None, "bytes": 0, "lines": 0, "chunks": 0}
+    gunzip = None
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": urlencode(params).encode(), "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+             "headers": [(b"host", b"testserver"), (b"authorization", f"Bearer {token}".encode())]}
+
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            await anyio.sleep_forever()  # StreamingResponse listens for a disconnect while it streams
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal gunzip
+        if message["type"] == "http.response.start":
+            stats["status"] = message["status"]
+            if (b"content-type", b"application/gzip") in message["headers"]:
+                gunzip = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            stats["bytes"] += len(body)
+            stats["chunks"] += bool(body)
+            stats["lines"] += (gunzip.decompress(body) if gunzip else body).count(b"\n")
+
+    await app(scope, receive, send)
+    if stats["status"] != 200:
+        raise RuntimeError(f"GET {path} -> {stats['status']}")
+    return stats
+
+
+def main():
+    args = parse_args()
+    if not args.database_url:
+        tmp = tempfile.mkdtemp(prefix="mindcare-export-")
+        args.database_url = f"sqlite:///{tmp}/export.db"
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("JWT_SECRET", "loadtest-only-secret-0123456789abcdef")
+    os.environ["SQL_PROFILE_SAMPLE_RATE"] = "0"
+
+    rng = random.Random(args.seed)
+    fx = seed(argparse.Namespace(users=1, premium_ratio=1.0, checkins_per_user=0, sessions_per_user=0,
+                                 messages_per_session=0, counselors=0, days=0, slots_per_day=0,
+                                 rules_per_counselor=0), rng)
+    user = fx["users"][0]
+    sizes = [int(s) for s in args.sizes.split(",")]
+    sessions = {n: add_large_session(user["id"], n, rng) for n in sizes}
+
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    kinds = {
+        "export": lambda sid: (f"/chat/sessions/{sid}/export", {}),
+        "export_gzip": lambda sid: (f"/chat/sessions/{sid}/export", {"format": "ndjson.gz"}),
+        "list_messages": lambda sid: (f"/chat/sessions/{sid}/messages", {}),
+    }
+    results = {kind: {} for kind in kinds}
+    problems = []
+    with TestClient(app_module.app) as client:
+        client.get("/health")
+        tracemalloc.start()
+        for n, sid in sessions.items():
+            for kind, target in kinds.items():
+                path, params = target(sid)
+                client.portal.call(asgi_get, app_module.app, path, params, user["token"])  # warm
+                tracemalloc.reset_peak()
+                base, _ = tracemalloc.get_traced_memory()
+                t0 = time.perf_counter()
+                stats = client.portal.call(asgi_get, app_module.app, path, params, user["token"])
+                elapsed = time.perf_counter() - t0
+                peak = tracemalloc.get_traced_memory()[1] - base
+                results[kind][n] = {
+                    "peak_kb": round(peak / 1024, 1),
+                    "ms": round(elapsed * 1000, 1),
+                    "bytes": stats["bytes"],
+                    "chunks": stats["chunks"],
+                    "mb_per_s": round(stats["bytes"] / elapsed / 1e6, 1),
+                }
+                if kind.startswith("export") and stats["lines"] != n + 2:
+                    problems.append(f"{kind} of {n} messages: {stats['lines']} lines")
+        tracemalloc.stop()
+
+    for kind in ("export", "export_gzip"):
+        small, large = results[kind][sizes[0]]["peak_kb"], results[kind][sizes[-1]]["peak_kb"]
+        if large > small * args.max_growth:
+            problems.append(f"{kind} peak grew {small} -> {large} KB")
+
+    report = {
+        "meta": {"git_rev": git_rev(), "cpus": os.cpu_count(),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("database_url", "out")}},
+        "results": results,
+        "problems": problems,
+        "ok": not problems,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text)
+    if not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
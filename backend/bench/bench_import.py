@@ -0,0 +1,112 @@
+"""
+Bulk import throughput: import_availability.py on a generated partner file.
+
+Writes --counselors counselors (CSV) and --days x --slots-per-day slots each
+(JSONL) to a temp dir, imports both into a fresh database, then imports the
+slot file a second time to check the upsert is idempotent (same row count,
+nothing duplicated). Reports rows/s per phase; exits 1 if the second run
+changed the row count.
+
+Run from backend/:  python bench/bench_import.py --counselors 10000 --days 90
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH.parent))
+sys.path.insert(0, str(BENCH))
+
+from loadtest import git_rev  # noqa: E402
+
+SPECIALTIES = ["anxiety", "stress", "students", "trauma", "cbt", "mindfulness", "grief", "family"]
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--database-url", help="default: a fresh SQLite file in a temp dir")
+    ap.add_argument("--counselors", type=int, default=10000)
+    ap.add_argument("--days", type=int, default=90)
+    ap.add_argument("--slots-per-day", type=int, default=1)
+    ap.add_argument("--batch", type=int, default=1000)
+    ap.add_argument("--commit-every", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    return ap.parse_args()
+
+
+def write_files(tmp: str, args) -> tuple:
+    rng = random.Random(args.seed)
+    counselors_path, slots_path = os.path.join(tmp, "counselors.csv"), os.path.join(tmp, "slots.jsonl")
+    with open(counselors_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["external_id", "full_name", "bio", "specialties", "price_cents", "currency", "is_active"])
+        for i in range(args.counselors):
+            w.writerow([f"clinic-{i}", f"Counselor {i}", "Imported for the benchmark.",
+                        ",".join(rng.sample(SPECIALTIES, 3)), rng.choice([3000, 4500, 6000]), "BND", 1])
+    day0 = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    with open(slots_path, "w", encoding="utf-8") as f:
+        for i in range(args.counselors):
+            for d in range(args.days):
+                for k in range(args.slots_per_day):
+                    start = day0 + timedelta(days=d, hours=1 + 4 * k)
+                    f.write(json.dumps({"counselor": f"clinic-{i}", "start_time": start.isoformat(),
+                                        "duration_minutes": 50}) + "\n")
+    return counselors_path, slots_path
+
+
+def main():
+    args = parse_args()
+    tmp = tempfile.mkdtemp(prefix="mindcare-import-")
+    if not args.database_url:
+        args.database_url = f"sqlite:///{tmp}/import.db"
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import func, select
+
+    from database import engine
+    from import_availability import import_counselors, import_slots, read_rows
+    from migrations import migrate
+    from models import AvailabilitySlot
+
+    migrate(engine)
+    t0 = time.perf_counter()
+    counselors_path, slots_path = write_files(tmp, args)
+    generate_seconds = time.perf_counter() - t0
+
+    def count_slots():
+        with engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(AvailabilitySlot)).scalar()
+
+    phases = {}
+    phases["counselors"] = import_counselors(engine, read_rows(counselors_path), args.batch, args.commit_every)
+    phases["slots"] = import_slots(engine, read_rows(slots_path), args.batch, args.commit_every)
+    first = count_slots()
+    phases["slots_again"] = import_slots(engine, read_rows(slots_path), args.batch, args.commit_every)
+    second = count_slots()
+
+    report = {
+        "meta": {"git_rev": git_rev(), "cpus": os.cpu_count(), "dialect": engine.dialect.name,
+                 "args": {k: v for k, v in vars(args).items() if k not in ("database_url", "out")}},
+        "generate_seconds": round(generate_seconds, 2),
+        "phases": {name: {k: v for k, v in p.items() if k != "errors"} for name, p in phases.items()},
+        "slot_rows": {"after_first_import": first, "after_second_import": second},
+        "ok": first == second == args.counselors * args.days * args.slots_per_day,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text)
+    if not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+List-heavy routes with the default JSON encoder vs FAST_JSON (orjson).
+
+Seeds one user with --sessions chat sessions of --messages messages each,
+--checkins check-ins and --bookings bookings (plus a few rows with non-ASCII
+text, control characters and whole-second timestamps), then calls each of
+
+    GET /chat/sessions, GET /chat/sessions/{sid}/messages, GET /checkins,
+    GET /bookings/my, GET /analytics/checkins
+
+--requests times in-process with fast_json.FAST_JSON off and on, interleaved.
+Reports latency percentiles per route and mode, and exits 1 unless both
+modes returned byte-identical bodies and the same X-Next-Cursor.
+
+Run from backend/:  python bench/bench_json.py --messages 2000 --checkins 1000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH.parent))
+sys.path.insert(0, str(BENCH))
+
+from loadtest import chunked_insert, git_rev, percentile, seed  # noqa: E402
+
+# strings the two encoders must escape the same way
+AWKWARD = ['naïve café — 日本語 😊', 'tab\tnewline\n"quoted" \\ back', 'ctrl \x01\x1f line sep ', '</script>']
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--database-url", help="default: a fresh SQLite file in a temp dir")
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--messages", type=int, default=2000, help="per session")
+    ap.add_argument("--checkins", type=int, default=1000)
+    ap.add_argument("--bookings", type=int, default=200)
+    ap.add_argument("--checkin-page", type=int, default=50, help="limit for GET /checkins (at most 50)")
+    ap.add_argument("--requests", type=int, default=50, help="per route and mode")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    return ap.parse_args()
+
+
+def add_fixtures(user_id: int, session_ids: list, slot_ids: list, n_bookings: int, now: datetime):
+    """Rows the load test seed doesn't make: awkward text, whole-second timestamps, bookings."""
+    from database import SessionLocal
+    from models import AICheckIn, AvailabilitySlot, Booking, ChatMessage, ChatSession
+
+    db = SessionLocal()
+    whole = now.replace(microsecond=0)
+    for i, text in enumerate(AWKWARD):
+        db.add(AICheckIn(user_id=user_id, mood=text, stress_level=i, notes=text, created_at=whole - timedelta(minutes=i)))
+        db.add(ChatMessage(user_id=user_id, session_id=session_ids[0], role="user", content=text,
+                           created_at=whole + timedelta(seconds=i)))
+    db.query(ChatSession).filter(ChatSession.id == session_ids[0]).update({"title": AWKWARD[0]})
+    slots = db.query(AvailabilitySlot).filter(AvailabilitySlot.id.in_(slot_ids[:n_bookings])).all()
+    chunked_insert(db, Booking, [
+        {"user_id": user_id, "counselor_id": s.counselor_id, "slot_id": s.id, "status": "confirmed",
+         "created_at": now - timedelta(minutes=k)}
+        for k, s in enumerate(slots)
+    ])
+    for s in slots:
+        s.is_booked = True
+    db.commit()
+    db.close()
+
+
+def main():
+    args = parse_args()
+    if not args.database_url:
+        tmp = tempfile.mkdtemp(prefix="mindcare-json-")
+        args.database_url = f"sqlite:///{tmp}/json.db"
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("JWT_SECRET", "loadtest-only-secret-0123456789abcdef")
+    os.environ["SQL_PROFILE_SAMPLE_RATE"] = "0"
+
+    rng = random.Random(args.seed)
+    counselors = max(1, -(-args.bookings // 30))
+    fx = seed(argparse.Namespace(users=1, premium_ratio=1.0, checkins_per_user=args.checkins,
+                                 sessions_per_user=args.sessions, messages_per_session=args.messages,
+                                 counselors=counselors, days=30, slots_per_day=1, rules_per_counselor=0), rng)
+    user = fx["users"][0]
+    now = datetime.utcnow()
+    add_fixtures(user["id"], user["sessions"], [s for ids in fx["slots"].values() for s in ids],
+                 args.bookings, now)
+
+    from fastapi.testclient import TestClient
+    import fast_json
+    import main as app_module
+
+    if fast_json.orjson is None:
+        sys.exit("orjson is not installed")
+    app_module.utcnow = lambda: now  # /analytics/checkins echoes the time in its range
+
+    routes = {
+        "list_sessions": ("/chat/sessions", {}),
+        "list_messages": (f"/chat/sessions/{user['sessions'][0]}/messages", {}),
+        "list_checkins": ("/checkins", {"limit": args.checkin_page}),
+        "my_bookings": ("/bookings/my", {}),
+        "analytics_checkins": ("/analytics/checkins", {"days": 180}),
+    }
+    headers = {"Authorization": f"Bearer {user['token']}"}
+    timings = {name: {"default": [], "fast": []} for name in routes}
+    sizes, mismatches = {}, []
+    with TestClient(app_module.app) as client:
+        for name, (path, params) in routes.items():
+            for i in range(args.requests):
+                got = {}
+                for mode in ("default", "fast") if i % 2 == 0 else ("fast", "default"):
+                    fast_json.FAST_JSON = mode == "fast"
+                    t0 = time.perf_counter()
+                    r = client.get(path, params=params, headers=headers)
+                    timings[name][mode].append((time.perf_counter() - t0) * 1000)
+                    r.raise_for_status()
+                    got[mode] = (r.content, r.headers.get("X-Next-Cursor"), r.headers["content-type"])
+                if got["default"] != got["fast"] and name not in mismatches:
+                    mismatches.append(name)
+                sizes[name] = len(got["default"][0])
+    fast_json.FAST_JSON = False
+
+    report = {
+        "meta": {"git_rev": git_rev(), "cpus": os.cpu_count(),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("database_url", "out")}},
+        "data": {k: fx["counts"][k] for k in ("checkins", "sessions", "messages")} | {"bookings": args.bookings},
+        "routes": {
+            name: {
+                "bytes": sizes[name],
+                **{f"{mode}_ms": {p: round(percentile(values, q), 2) for p, q in (("p50", 50), ("p95", 95))}
+                   for mode, values in modes.items()},
+                "speedup_p50": round(percentile(modes["default"], 50) / percentile(modes["fast"], 50), 2),
+            }
+            for name, modes in timings.items()
+        },
+        "mismatches": mismatches,
+        "ok": not mismatches,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text)
+    if not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Memory per request of the list routes: column projections vs ORM entities.
+
+Seeds one user with a --messages message session (plus --sessions more
+sessions, --checkins check-ins, and a counselor with --rules weekly rules),
+then measures
+
+    GET /chat/sessions/{sid}/messages (unpaged), GET /chat/sessions (unpaged),
+    GET /checkins?limit=50, GET /counselors/{cid}/slots?days=60
+
+two ways, each in a fresh subprocess:
+
+- columns: the app as it is (column projections, unpaged lists streamed
+  with yield_per)
+- entities: the same routes with the earlier helpers patched in, which
+  loaded full ORM instances (kept below for the comparison)
+
+Per route and mode it reports the peak RSS growth over --requests requests
+(ru_maxrss, so mostly the first request's peak), tracemalloc's peak bytes per
+request (query, items and the encoded body; the client side is left out),
+and the peak of the load alone (the route's query helper: rows fetched and
+turned into items). Exits 1 if the two modes return different bodies.
+
+Run from backend/:  python bench/bench_list_memory.py --messages 10000
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlencode
+
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH.parent))
+sys.path.insert(0, str(BENCH))
+
+from loadtest import chunked_insert, git_rev, seed  # noqa: E402
+
+MODES = ("entities", "columns")
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--database-url", help="default: a fresh SQLite file in a temp dir")
+    ap.add_argument("--messages", type=int, default=10000, help="in the one large session")
+    ap.add_argument("--sessions", type=int, default=500)
+    ap.add_argument("--checkins", type=int, default=1000)
+    ap.add_argument("--rules", type=int, default=14, help="weekly rules of the benchmarked counselor")
+    ap.add_argument("--requests", type=int, default=10, help="per route and mode")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    ap.add_argument("--child", help=argparse.SUPPRESS)  # JSON job for one route and mode
+    return ap.parse_args()
+
+
+# ---- the helpers as they were before the projections, for the entities mode ----
+
+def patch_entity_helpers(app_module):
+    import availability
+    from fastapi import HTTPException
+    from models import AICheckIn, AvailabilityRule, ChatMessage, ChatSession
+    from pagination import keyset_page, page_size
+
+    def session_page(db, user_id, limit, cursor):
+        rows = (db.query(ChatSession).filter(ChatSession.user_id == user_id)
+                .order_by(ChatSession.created_at.desc(), ChatSession.id.desc()).all())
+        return [{"id": r.id, "title": r.title, "created_at": r.created_at, "checkin_id": r.checkin_id,
+                 "mood_at_start": r.mood_at_start, "stress_at_start": r.stress_at_start} for r in rows], None
+
+    def message_page(db, sid, user_id, limit, cursor):
+        if not app_module._find_session(db, sid, user_id):
+            raise HTTPException(status_code=404, detail="Session not found")
+        msgs = (db.query(ChatMessage).filter(ChatMessage.session_id == sid)
+                .order_by(ChatMessage.created_at.asc(), ChatMessage.id.asc()).all())
+        return [app_module._message_item(m) for m in msgs], None
+
+    def checkin_page(db, user_id, limit, cursor):
+        q = db.query(AICheckIn).filter(AICheckIn.user_id == user_id, AICheckIn.deleted == False)
+        rows, next_cursor = keyset_page(q, AICheckIn.created_at, AICheckIn.id, cursor,
+                                        page_size(limit, maximum=app_module.CHECKIN_PAGE_MAX))
+        return [{"id": r.id, "mood": r.mood, "stress_level": r.stress_level, "notes": r.notes,
+                 "created_at": r.created_at} for r in rows], next_cursor
+
+    def load_rules(db, counselor_id=None):
+        q = db.query(AvailabilityRule)
+        if counselor_id is not None:
+            q = q.filter(AvailabilityRule.counselor_id == counselor_id)
+        return q.all()
+
+    app_module._session_page = session_page
+    app_module._message_page = message_page
+    app_module._checkin_page = checkin_page
+    availability.load_rules = load_rules
+
+
+def maxrss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+
+
+async def asgi_get(app, path: str, params: dict, token: str) -> tuple:
+    """GET straight through the ASGI app, hashing body chunks as they are sent, so
+    the client side (TestClient collects the whole body) stays out of the numbers."""
+    digest, size, status = hashlib.sha256(), 0, None
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": urlencode(params).encode(), "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+             "headers": [(b"host", b"testserver"), (b"authorization", f"Bearer {token}".encode())]}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            digest.update(message.get("body", b""))
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    if status != 200:
+        raise RuntimeError(f"GET {path} -> {status}")
+    return size, digest.hexdigest()
+
+
+def load(app_module, job: dict, db):
+    """The route's query helper on its own."""
+    if job["route"] == "list_messages":
+        return app_module._message_page(db, job["sid"], job["user_id"], None, None)
+    if job["route"] == "list_sessions":
+        return app_module._session_page(db, job["user_id"], None, None)
+    if job["route"] == "list_checkins":
+        return app_module._checkin_page(db, job["user_id"], 50, None)
+    now = app_module.utcnow()
+    return app_module._counselor_open_slots(db, job["cid"], now, now + timedelta(days=60))
+
+
+def run_child(job: dict):
+    """One route in one mode, in this (fresh) process; prints a JSON result line."""
+    from fastapi.testclient import TestClient
+    from database import SessionLocal
+    import main as app_module
+
+    if job["mode"] == "entities":
+        patch_entity_helpers(app_module)
+
+    with TestClient(app_module.app) as client:  # runs startup; requests go through its portal
+        def get():
+            return client.portal.call(asgi_get, app_module.app, job["path"], job["params"], job["token"])
+
+        client.get("/health")
+        client.get("/checkins", params={"limit": 1}, headers={"Authorization": f"Bearer {job['token']}"})
+        rss0 = maxrss_kb()
+        t0 = time.perf_counter()
+        for _ in range(job["requests"]):
+            get()
+        elapsed = time.perf_counter() - t0
+        rss1 = maxrss_kb()
+
+        peaks, load_peaks = [], []
+        tracemalloc.start()
+        for _ in range(job["requests"]):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            size, digest = get()
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        for _ in range(job["requests"]):
+            db = SessionLocal()
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            load(app_module, job, db)
+            load_peaks.append(tracemalloc.get_traced_memory()[1] - base)
+            db.close()
+        tracemalloc.stop()
+
+    print(json.dumps({
+        "bytes": size,
+        "body_sha256": digest,
+        "ms_per_request": round(elapsed / job["requests"] * 1000, 2),
+        "rss_growth_kb": rss1 - rss0,
+        "request_peak_kb": round(sorted(peaks)[len(peaks) // 2] / 1024, 1),
+        "load_peak_kb": round(sorted(load_peaks)[len(load_peaks) // 2] / 1024, 1),
+    }))
+
+
+def add_large_session(user_id: int, n: int, rng: random.Random) -> int:
+    from database import SessionLocal
+    from models import ChatMessage, ChatSession
+
+    db = SessionLocal()
+    now = datetime.utcnow()
+    sess = ChatSession(user_id=user_id, title="Long session", created_at=now - timedelta(days=90))
+    db.add(sess)
+    db.flush()
+    chunked_insert(db, ChatMessage, [
+        {"user_id": user_id, "session_id": sess.id, "role": "user" if m % 2 == 0 else "assistant",
+         "content": f"message {m} " + "lorem ipsum " * rng.randint(5, 60),
+         "created_at": sess.created_at + timedelta(seconds=20 * m)}
+        for m in range(n)
+    ])
+    db.commit()
+    sid = sess.id
+    db.close()
+    return sid
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        run_child(json.loads(args.child))
+        return
+    if not args.database_url:
+        tmp = tempfile.mkdtemp(prefix="mindcare-listmem-")
+        args.database_url = f"sqlite:///{tmp}/listmem.db"
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("JWT_SECRET", "loadtest-only-secret-0123456789abcdef")
+    os.environ["SQL_PROFILE_SAMPLE_RATE"] = "0"
+
+    rng = random.Random(args.seed)
+    fx = seed(argparse.Namespace(users=1, premium_ratio=1.0, checkins_per_user=args.checkins,
+                                 sessions_per_user=args.sessions, messages_per_session=2,
+                                 counselors=1, days=60, slots_per_day=2, rules_per_counselor=args.rules), rng)
+    user = fx["users"][0]
+    sid = add_large_session(user["id"], args.messages, rng)
+    cid = fx["counselors"][0]
+
+    routes = {
+        "list_messages": (f"/chat/sessions/{sid}/messages", {}),
+        "list_sessions": ("/chat/sessions", {}),
+        "list_checkins": ("/checkins", {"limit": 50}),
+        "counselor_slots": (f"/counselors/{cid}/slots", {"days": 60}),
+    }
+    results, mismatches = {}, []
+    for name, (path, params) in routes.items():
+        results[name] = {}
+        for mode in MODES:
+            job = {"route": name, "mode": mode, "path": path, "params": params, "token": user["token"],
+                   "user_id": user["id"], "sid": sid, "cid": cid, "requests": args.requests}
+            out = subprocess.run([sys.executable, __file__, "--child", json.dumps(job)], env=os.environ.copy(),
+                                 capture_output=True, text=True, check=True)
+            results[name][mode] = json.loads(out.stdout.strip().splitlines()[-1])
+        if len({r.pop("body_sha256") for r in results[name].values()}) != 1:
+            mismatches.append(name)
+
+    report = {
+        "meta": {"git_rev": git_rev(), "cpus": os.cpu_count(),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("database_url", "out", "child")}},
+        "data": {"large_session_messages": args.messages, "sessions": fx["counts"]["sessions"] + 1,
+                 "checkins": fx["counts"]["checkins"], "rules": fx["counts"]["rules"]},
+        "routes": results,
+        "mismatches": mismatches,
+        "ok": not mismatches,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text)
+    if not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Login-storm benchmark: bcrypt login throughput and its effect on other routes.
+
+For each --pool-sizes value (BCRYPT_POOL_SIZE; 0 = hash in the server
+threadpool) a fresh server is started in a subprocess, then --login-clients
+hammer POST /auth/login while --other-clients keep polling GET /resources and
+GET /counselors. Reports per-route throughput and latency per configuration.
+
+Run from backend/:  python bench/bench_login.py --pool-sizes 0,4 --duration 10 --out login.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH.parent))
+sys.path.insert(0, str(BENCH))
+
+from loadtest import Recorder, free_port, git_rev, report  # noqa: E402
+
+
+def parse_args():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pool-sizes", default=f"0,{min(4, os.cpu_count() or 1)}")
+    ap.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--login-clients", type=int, default=16)
+    ap.add_argument("--other-clients", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=10)
+    ap.add_argument("--out")
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    return ap.parse_args()
+
+
+def run_worker(args):
+    """One configuration; BCRYPT_POOL_SIZE/BCRYPT_ROUNDS/DATABASE_URL are set by the parent."""
+    import httpx
+    import uvicorn
+    from sqlalchemy import insert
+
+    import main as app_module
+    from auth import hash_password
+    from database import SessionLocal
+    from models import User
+
+    db = SessionLocal()
+    pw_hash = hash_password("benchpass")
+    db.execute(insert(User), [
+        {"email": f"login{i}@example.com", "password_hash": pw_hash, "plan": "free", "deleted": False}
+        for i in range(args.users)
+    ])
+    db.commit()
+    db.close()
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port,
+                                           log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}"
+    stop_at = time.monotonic() + args.duration
+    recorders = []
+
+    def login_client(n: int):
+        rec = Recorder()
+        recorders.append(rec)
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            i = n
+            while time.monotonic() < stop_at:
+                email = f"login{i % args.users}@example.com"
+                rec.timed("POST /auth/login", lambda: client.post(
+                    "/auth/login", json={"email": email, "password": "benchpass"}).status_code)
+                i += args.login_clients
+
+    def other_client(n: int):
+        rec = Recorder()
+        recorders.append(rec)
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            while time.monotonic() < stop_at:
+                path = "/resources" if n % 2 else "/counselors"
+                rec.timed(f"GET {path}", lambda: client.get(path).status_code)
+
+    threads = [threading.Thread(target=login_client, args=(n,)) for n in range(args.login_clients)]
+    threads += [threading.Thread(target=other_client, args=(n,)) for n in range(args.other_clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    server.should_exit = True
+
+    total = Recorder()
+    for r in recorders:
+        total.merge(r)
+    print(json.dumps(report(total, args.duration)))
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        return run_worker(args)
+
+    results = {}
+    for size in [int(s) for s in args.pool_sizes.split(",")]:
+        tmp = tempfile.mkdtemp(prefix="mindcare-login-")
+        env = {**os.environ, "BCRYPT_POOL_SIZE": str(size), "BCRYPT_ROUNDS": str(args.rounds),
+               "DATABASE_URL": f"sqlite:///{tmp}/login.db",
+               "JWT_SECRET": "loadtest-only-secret-0123456789abcdef"}
+        cmd = [sys.executable, __file__, "--worker", "--users", str(args.users),
+               "--login-clients", str(args.login_clients), "--other-clients", str(args.other_clients),
+               "--duration", str(args.duration)]
+        print(f"[login] BCRYPT_POOL_SIZE={size} ...", file=sys.stderr)
+        out = subprocess.run(cmd, env=env, cwd=BENCH.parent, capture_output=True, text=True, check=True)
+        results[f"pool_size={size}"] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    text = json.dumps({
+        "meta": {"git_rev": git_rev(), "cpus": os.cpu_count(), "args": vars(args)},
+        "configs": results,
+    }, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text)
+
+
+if __name__ == "__main__":
+    main()
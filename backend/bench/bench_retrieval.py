@@ -0,0 +1,124 @@
+"""
+Retrieval benchmark: prompt-token reduction and query latency on a synthetic
+corpus (default 10 MB) grown from mindcare_context.txt.
+
+Run from backend/:  python bench/bench_retrieval.py [--mb 10] [--queries 500] [--out result.json]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from chat_history import estimate_tokens  # noqa: E402
+from retrieval import BM25Index, split_paragraphs, SENTENCE_RE  # noqa: E402
+
+QUERIES = [
+    "how do I book a counselor",
+    "is this anonymous",
+    "I feel stressed about exams",
+    "how much does therapy cost in Brunei",
+    "what is the premium plan",
+    "burnout at work as a nurse",
+    "stigma about seeing a psychologist",
+    "mindfulness resources",
+    "can I talk to someone tonight",
+    "anxiety statistics",
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def synth_corpus(seed_text: str, target_bytes: int, rng: random.Random) -> str:
+    """Paragraphs of shuffled real sentences with some made-up topic words mixed in,
+    so the vocabulary keeps growing the way a real knowledge base would."""
+    sentences = [s for s in SENTENCE_RE.split(" ".join(seed_text.split())) if s]
+    filler = [f"topic{i}" for i in range(20000)]
+    out, size = [], 0
+    while size < target_bytes:
+        para = " ".join(rng.sample(sentences, k=min(4, len(sentences))))
+        para += " " + " ".join(rng.choices(filler, k=8)) + "."
+        out.append(para)
+        size += len(para) + 2
+    return "\n\n".join(out)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=float, default=10.0)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--top-k", type=int, default=4)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", help="write JSON results here as well as stdout")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    seed_text = (BACKEND / "mindcare_context.txt").read_text(encoding="utf-8")
+    corpus = synth_corpus(seed_text, int(args.mb * 1024 * 1024), rng)
+
+    t0 = time.perf_counter()
+    chunks = split_paragraphs(corpus)
+    t1 = time.perf_counter()
+    index = BM25Index(chunks)
+    t2 = time.perf_counter()
+
+    # Zero-hit queries fall back to the whole file in knowledge_for, so they are
+    # reported on their own rather than counted as (cheap, tiny) retrievals
+    hit_latencies, zero_latencies, prompt_tokens, zero_hit = [], [], [], set()
+    for i in range(args.queries):
+        q = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        picked = index.top_chunks(q, args.top_k)
+        elapsed = (time.perf_counter() - start) * 1000
+        if picked:
+            hit_latencies.append(elapsed)
+            prompt_tokens.append(estimate_tokens("\n\n".join(picked)))
+        else:
+            zero_latencies.append(elapsed)
+            zero_hit.add(q)
+
+    def latency(values):
+        if not values:
+            return None
+        return {
+            "p50": round(percentile(values, 50), 3),
+            "p95": round(percentile(values, 95), 3),
+            "p99": round(percentile(values, 99), 3),
+            "max": round(max(values), 3),
+        }
+
+    full_tokens = estimate_tokens(corpus)
+    avg_tokens = sum(prompt_tokens) / len(prompt_tokens) if prompt_tokens else None
+    result = {
+        "corpus_bytes": len(corpus.encode("utf-8")),
+        "chunks": len(chunks),
+        "vocab": len(index.vocab),
+        "split_s": round(t1 - t0, 3),
+        "index_build_s": round(t2 - t1, 3),
+        "queries": args.queries,
+        "top_k": args.top_k,
+        "hit_queries": len(hit_latencies),
+        "latency_ms": latency(hit_latencies),
+        "context_tokens_full": full_tokens,
+        "context_tokens_retrieved_avg": round(avg_tokens, 1) if avg_tokens is not None else None,
+        "context_token_reduction": round(1 - avg_tokens / full_tokens, 6) if avg_tokens is not None else None,
+        "zero_hit": {
+            "queries": len(zero_latencies),
+            "distinct": sorted(zero_hit),
+            "latency_ms": latency(zero_latencies),
+        },
+    }
+    print(json.dumps(result, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Slot search: GET /slots/search vs the per-counselor fan-out it replaces.
+
+Seeds --counselors counselors with --days x --slots-per-day open slots (and
+--rules-per-counselor weekly availability rules) each, then runs --queries
+random searches (time window, specialty, price ceiling, minimum length) two
+ways in-process:
+
+- fanout: GET /counselors, then GET /counselors/{cid}/slots for every match,
+  filtered and merged client-side (what the frontend did before)
+- search: one GET /slots/search
+
+Reports latency percentiles for both, the index load time, and whether both
+ways returned the same slots (exits 1 if not).
+
+Run from backend/:  python bench/bench_slot_search.py --counselors 300 --days 30 --slots-per-day 4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH.parent))
+sys.path.insert(0, str(BENCH))
+
+from loadtest import git_rev, percentile, seed  # noqa: E402
+
+SPECIALTIES = ["anxiety", "stress", "students", "trauma", "cbt", "mindfulness", "grief", "family"]
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--database-url", help="default: a fresh SQLite file in a temp dir")
+    ap.add_argument("--counselors", type=int, default=300)
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--slots-per-day", type=int, default=4)
+    ap.add_argument("--rules-per-counselor", type=int, default=0, help="weekly rules, expanded on read")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    return ap.parse_args()
+
+
+def random_query(rng: random.Random, days: int) -> dict:
+    start = datetime.utcnow() + timedelta(days=rng.randint(0, max(0, days - 2)), hours=rng.randint(0, 23))
+    q = {"start": start.isoformat(), "end": (start + timedelta(hours=rng.choice([4, 12, 24]))).isoformat(),
+         "limit": 200}
+    if rng.random() < 0.8:
+        q["specialty"] = rng.choice(SPECIALTIES)
+    if rng.random() < 0.5:
+        q["max_price"] = rng.choice([3000, 4500])
+    if rng.random() < 0.3:
+        q["min_minutes"] = 45
+    return q
+
+
+def fanout(client, q: dict, days: int) -> list:
+    """Client-side equivalent of /slots/search over the older endpoints."""
+    start, end = datetime.fromisoformat(q["start"]), datetime.fromisoformat(q["end"])
+    hits = []
+    for c in client.get("/counselors").json():
+        names = [s.strip().lower() for s in c["specialties"].split(",") if s.strip()]
+        if "specialty" in q and q["specialty"] not in names:
+            continue
+        if "max_price" in q and c["price_cents"] > q["max_price"]:
+            continue
+        for s in client.get(f"/counselors/{c['id']}/slots", params={"days": days}).json():
+            s_start, s_end = datetime.fromisoformat(s["start_time"]), datetime.fromisoformat(s["end_time"])
+            if not start <= s_start < end:
+                continue
+            if "min_minutes" in q and s_end - s_start < timedelta(minutes=q["min_minutes"]):
+                continue
+            hits.append((s_start, c["id"], s["id"]))
+    return [slot_id for _, _, slot_id in sorted(hits, key=lambda h: h[:2])[:q["limit"]]]
+
+
+def main():
+    args = parse_args()
+    if not args.database_url:
+        tmp = tempfile.mkdtemp(prefix="mindcare-slots-")
+        args.database_url = f"sqlite:///{tmp}/slots.db"
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("JWT_SECRET", "loadtest-only-secret-0123456789abcdef")
+    os.environ["SQL_PROFILE_SAMPLE_RATE"] = "0"
+
+    rng = random.Random(args.seed)
+    fx = seed(argparse.Namespace(users=1, premium_ratio=0.0, checkins_per_user=0, sessions_per_user=0,
+                                 messages_per_session=0, counselors=args.counselors, days=args.days,
+                                 slots_per_day=args.slots_per_day,
+                                 rules_per_counselor=args.rules_per_counselor), rng)
+
+    from fastapi.testclient import TestClient
+    import main as app_module
+    from slot_index import slot_index
+
+    queries = [random_query(rng, args.days) for _ in range(args.queries)]
+    days = min(args.days + 1, 60)
+    timings = {"fanout": [], "search": []}
+    mismatches = 0
+    with TestClient(app_module.app) as client:
+        slot_index.load()
+        for q in queries:
+            t0 = time.perf_counter()
+            expected = fanout(client, q, days)
+            timings["fanout"].append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            got = [s["id"] for s in client.get("/slots/search", params=q).json()]
+            timings["search"].append((time.perf_counter() - t0) * 1000)
+            mismatches += got != expected
+
+    report = {
+        "meta": {"git_rev": git_rev(), "cpus": os.cpu_count(),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("database_url", "out")}},
+        "data": {k: fx["counts"][k] for k in ("counselors", "slots", "rules")},
+        "index": slot_index.stats(),
+        "latency_ms": {
+            way: {p: round(percentile(values, q), 2) for p, q in (("p50", 50), ("p95", 95), ("p99", 99))}
+            for way, values in timings.items()
+        },
+        "mismatches": mismatches,
+        "ok": mismatches == 0,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text)
+    if not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
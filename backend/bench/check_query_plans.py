@@ -0,0 +1,225 @@
+"""
+Query-plan regression check: fails when a route's SQL does a full table scan.
+
+Seeds a small data set with loadtest.py's seeder, calls every route once
+in-process (chat goes to a local fake Groq server) while recording the SQL
+each one issues, then runs EXPLAIN QUERY PLAN (SQLite) / EXPLAIN (MySQL) on
+every distinct SELECT / UPDATE / DELETE. A scan over a whole table outside
+SMALL_TABLES is a violation and the script exits 1; routes it did not call
+are listed so new endpoints get added here.
+
+Run from backend/:
+  python bench/check_query_plans.py
+  python bench/check_query_plans.py --database-url mysql://user:pw@host/scratch --verbose
+(--database-url must point at a throwaway database: it is seeded.)
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH.parent))
+sys.path.insert(0, str(BENCH))
+
+# Catalog tables that stay small by design; scanning them is fine.
+SMALL_TABLES = {"counselors", "counselor_specialties", "specialties", "availability_rules", "resources",
+                "schema_migrations"}
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--database-url", help="default: a fresh SQLite file in a temp dir")
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--verbose", action="store_true", help="print every statement with its plan")
+    ap.add_argument("--out", help="write the JSON report here as well as stdout")
+    return ap.parse_args()
+
+
+def seed_args(users: int) -> argparse.Namespace:
+    return argparse.Namespace(users=users, premium_ratio=0.5, checkins_per_user=20, sessions_per_user=2,
+                              messages_per_session=30, counselors=10, days=7, slots_per_day=3,
+                              rules_per_counselor=7)
+
+
+def drive_routes(client, fx, record):
+    """Call each route once; record(label) tags the SQL issued until the next call."""
+    premium = next(u for u in fx["users"] if u["premium"])
+    h = {"Authorization": f"Bearer {premium['token']}"}
+    sid = premium["sessions"][0]
+    cid = fx["counselors"][0]
+
+    def call(label, method, url, **kw):
+        record(label)
+        r = client.request(method, url, **kw)
+        if r.status_code >= 400:
+            print(f"[plans] {label} -> {r.status_code} {r.text[:200]}", file=sys.stderr)
+        return r
+
+    creds = {"email": "plans@example.com", "password": "plans-password"}
+    call("POST /auth/register", "POST", "/auth/register", json=creds)
+    new = call("POST /auth/login", "POST", "/auth/login", json=creds).json()
+    h_new = {"Authorization": f"Bearer {new['token']}"}
+    call("GET /me", "GET", "/me", headers=h_new)
+    call("POST /billing/upgrade", "POST", "/billing/upgrade", json={"code": "plans"}, headers=h_new)
+
+    ci = call("POST /checkin", "POST", "/checkin", json={"mood": "calm", "stress_level": 3}, headers=h).json()
+    call("POST /checkins/batch", "POST", "/checkins/batch", headers=h, json={"checkins": [
+        {"client_id": "plan-1", "mood": "calm", "stress_level": 2},
+        {"client_id": "plan-2", "mood": "tired", "stress_level": 6},
+    ]})
+    page = call("GET /checkins", "GET", "/checkins", headers=h)
+    call("GET /checkins", "GET", "/checkins", params={"cursor": page.headers["X-Next-Cursor"]}, headers=h)
+    call("DELETE /checkins/{cid}", "DELETE", f"/checkins/{ci['id']}", headers=h)
+    call("GET /analytics/overview", "GET", "/analytics/overview", headers=h)
+    call("GET /analytics/checkins", "GET", "/analytics/checkins?days=90", headers=h)
+
+    new_sid = call("POST /chat/sessions", "POST", "/chat/sessions", json={"title": "plans"}, headers=h).json()["id"]
+    call("GET /chat/sessions", "GET", "/chat/sessions", headers=h)
+    page = call("GET /chat/sessions", "GET", "/chat/sessions?limit=1", headers=h)
+    call("GET /chat/sessions", "GET", "/chat/sessions", params={"cursor": page.headers["X-Next-Cursor"]}, headers=h)
+    call("PATCH /chat/sessions/{sid}", "PATCH", f"/chat/sessions/{new_sid}", json={"title": "renamed"}, headers=h)
+    call("POST /chat/sessions/{sid}/send", "POST", f"/chat/sessions/{sid}/send",
+         json={"message": "I have been feeling anxious before exams"}, headers=h)
+    call("POST /chat/sessions/{sid}/send", "POST", f"/chat/sessions/{sid}/send?stream=true",
+         json={"message": "Any tips for sleeping better?"}, headers=h)
+    call("GET /chat/sessions/{sid}/messages", "GET", f"/chat/sessions/{sid}/messages", headers=h)
+    page = call("GET /chat/sessions/{sid}/messages", "GET", f"/chat/sessions/{sid}/messages?limit=10", headers=h)
+    call("GET /chat/sessions/{sid}/messages", "GET", f"/chat/sessions/{sid}/messages",
+         params={"cursor": page.headers["X-Next-Cursor"]}, headers=h)
+    call("DELETE /chat/sessions/{sid}", "DELETE", f"/chat/sessions/{new_sid}", headers=h)
+    call("POST /chat", "POST", "/chat", json={"message": "How do I book a counselor?"})
+
+    call("GET /counselors", "GET", "/counselors")
+    listed = call("GET /counselors/{cid}/slots", "GET", f"/counselors/{cid}/slots").json()
+    call("GET /slots/search", "GET", "/slots/search",
+         params={"specialty": "anxiety", "max_price": 4500, "min_minutes": 45})
+    call("POST /bookings", "POST", "/bookings", json={"counselor_id": cid, "slot_id": fx["slots"][cid][0]}, headers=h)
+    virtual = next(s["id"] for s in listed if isinstance(s["id"], str))
+    call("POST /bookings", "POST", "/bookings", json={"counselor_id": cid, "slot_id": virtual}, headers=h)
+    call("GET /bookings/my", "GET", "/bookings/my", headers=h)
+    call("GET /bookings/my", "GET", "/bookings/my?limit=10", headers=h)
+    call("GET /me/export", "GET", "/me/export", headers=h)
+    call("GET /me/export", "GET", "/me/export", params={"since": "2020-01-01T00:00:00", "format": "ndjson.gz"},
+         headers=h)
+    call("GET /chat/sessions/{sid}/export", "GET", f"/chat/sessions/{sid}/export", headers=h)
+    call("GET /resources", "GET", "/resources")
+    call("GET /healthz", "GET", "/healthz")
+    h_debug = {"X-Debug-Token": os.environ["DEBUG_TOKEN"]}
+    call("GET /debug/stats", "GET", "/debug/stats", headers=h_debug)
+    call("GET /debug/sql", "GET", "/debug/sql", headers=h_debug)
+    record(None)
+
+
+def base_table(name: str, tables: set):
+    """Map ORM aliases (users_1) back to table names; None for derived tables."""
+    if name in tables:
+        return name
+    stripped = re.sub(r"_\d+$", "", name or "")
+    return stripped if stripped in tables else None
+
+
+def full_scans(conn, dialect: str, statement: str, parameters, tables: set):
+    """(plan lines, [scanned tables]) for one statement."""
+    if dialect == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        plan = [r[3] for r in rows]
+        scans = []
+        for detail in plan:
+            m = re.match(r"SCAN (\w+)", detail)
+            if m:
+                scans.append(base_table(m.group(1), tables))
+        return plan, [t for t in scans if t]
+    rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).mappings().all()
+    plan = [f"{r['table']}: type={r['type']} key={r['key']} rows={r['rows']} {r['Extra'] or ''}".strip()
+            for r in rows]
+    scans = [base_table(r["table"], tables) for r in rows if r["type"] in ("ALL", "index")]
+    return plan, [t for t in scans if t]
+
+
+def main():
+    args = parse_args()
+    tmp = None
+    if not args.database_url:
+        tmp = tempfile.mkdtemp(prefix="mindcare-plans-")
+        args.database_url = f"sqlite:///{tmp}/plans.db"
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("JWT_SECRET", "loadtest-only-secret-0123456789abcdef")
+    os.environ["BCRYPT_POOL_SIZE"] = "0"
+    os.environ["ANSWER_CACHE_ENABLED"] = "0"
+    os.environ["DEBUG_ROUTES"] = "1"
+    os.environ["DEBUG_TOKEN"] = "plans-debug-token"
+
+    from fake_groq import FakeGroqConfig, start_fake_groq
+    fake, fake_url = start_fake_groq(config=FakeGroqConfig(latency_ms=0, tokens_per_sec=0, reply_tokens=20))
+    os.environ["GROQ_BASE_URL"] = fake_url
+    os.environ["GROQ_API_KEY"] = "fake-key"
+
+    from fastapi.routing import APIRoute
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    import main as app_module
+    from database import ENGINES, Base, engine
+    from loadtest import seed
+
+    fx = seed(seed_args(args.users), random.Random(7))
+    tables = set(Base.metadata.tables)
+    current = {"route": None}
+    called = set()
+    captured = {}  # statement -> (route, parameters)
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        route = current["route"]
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        if route and not executemany and verb in ("SELECT", "UPDATE", "DELETE", "WITH"):
+            captured.setdefault(statement, (route, parameters))
+
+    for captured_engine in ENGINES.values():  # sync, async and replica routes
+        event.listen(captured_engine, "before_cursor_execute", capture)
+
+    def record(label):
+        current["route"] = label
+        if label:
+            called.add(label)
+
+    with TestClient(app_module.app) as client:
+        drive_routes(client, fx, record)
+    fake.shutdown()
+
+    violations, report_plans = [], []
+    with engine.connect() as conn:
+        for statement, (route, parameters) in captured.items():
+            plan, scanned = full_scans(conn, engine.dialect.name, statement, parameters, tables)
+            bad = sorted({t for t in scanned if t not in SMALL_TABLES})
+            entry = {"route": route, "sql": " ".join(statement.split()), "plan": plan}
+            if bad:
+                violations.append({**entry, "full_scan": bad})
+            if args.verbose:
+                report_plans.append(entry)
+
+    app_routes = {f"{m} {r.path}" for r in app_module.app.routes if isinstance(r, APIRoute) for m in r.methods}
+    report = {
+        "dialect": engine.dialect.name,
+        "statements": len(captured),
+        "violations": violations,
+        "routes_not_called": sorted(app_routes - called),
+    }
+    if args.verbose:
+        report["plans"] = report_plans
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text)
+    if violations:
+        print(f"[plans] {len(violations)} statement(s) scan a whole table", file=sys.stderr)
+        sys.exit(1)
+    print(f"[plans] ok: {len(captured)} statements, no full table scans", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Compare two loadtest.py JSON reports route by route.
+
+Run:  python bench/compare.py before.json after.json
+"""
+import json
+import sys
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def delta(before, after):
+    if before in (None, 0) or after is None:
+        return "   n/a"
+    return f"{(after - before) / before * 100:+6.1f}%"
+
+
+def main():
+    if len(sys.argv) != 3:
+        raise SystemExit(__doc__)
+    with open(sys.argv[1]) as f:
+        before = json.load(f)
+    with open(sys.argv[2]) as f:
+        after = json.load(f)
+
+    print(f"before: {before['meta']['git_rev']}  after: {after['meta']['git_rev']}")
+    print(f"total rps {before['rps']} -> {after['rps']} ({delta(before['rps'], after['rps']).strip()}), "
+          f"errors {before['errors']} -> {after['errors']}\n")
+    width = max(len(r) for r in {**before["routes"], **after["routes"]})
+    print(f"{'route':<{width}}  " + "  ".join(f"{m:>22}" for m in METRICS))
+    for route in sorted({**before["routes"], **after["routes"]}):
+        b, a = before["routes"].get(route, {}), after["routes"].get(route, {})
+        cells = []
+        for m in METRICS:
+            bv, av = b.get(m), a.get(m)
+            cells.append(f"{bv if bv is not None else '-':>7} -> {av if av is not None else '-':>7} {delta(bv, av)}")
+        print(f"{route:<{width}}  " + "  ".join(f"{c:>22}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Local stand-in for the Groq chat completions API, for load tests.
+
+Serves POST /openai/v1/chat/completions (blocking and stream=true) with a
+configurable time to first token, token rate and error rate. Point the
+backend at it with GROQ_BASE_URL=http://127.0.0.1:<port> and any GROQ_API_KEY.
+
+Run standalone:  python bench/fake_groq.py --port 8900 --latency-ms 300 --tokens-per-sec 200
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("it sounds like you have a lot on your mind right now and that is okay "
+         "try to take a slow breath and notice what you are feeling").split()
+
+
+class FakeGroqConfig:
+    def __init__(self, latency_ms: float = 300, tokens_per_sec: float = 200,
+                 reply_tokens: int = 120, error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = FakeGroqConfig()
+    requests_served = 0
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        req = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/") != "/openai/v1/chat/completions":
+            return self._json(404, {"error": {"message": "not found"}})
+        FakeGroqHandler.requests_served += 1
+
+        cfg = self.config
+        time.sleep(cfg.latency_ms / 1000)
+        if random.random() < cfg.error_rate:
+            return self._json(500, {"error": {"message": "fake upstream error", "type": "server_error"}})
+
+        n = min(cfg.reply_tokens, int(req.get("max_tokens") or cfg.reply_tokens))
+        words = [WORDS[i % len(WORDS)] for i in range(n)]
+        per_token = 1.0 / cfg.tokens_per_sec if cfg.tokens_per_sec > 0 else 0.0
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()),
+                "model": req.get("model", "fake")}
+
+        if not req.get("stream"):
+            time.sleep(per_token * n)
+            return self._json(200, {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": n, "total_tokens": n},
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(data: str):
+            chunk = data.encode("utf-8")
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+
+        try:
+            for i, word in enumerate(words):
+                delta = {"role": "assistant", "content": word if i == 0 else " " + word}
+                send("data: " + json.dumps({**base, "object": "chat.completion.chunk",
+                                            "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}) + "\n\n")
+                time.sleep(per_token)
+            send("data: " + json.dumps({**base, "object": "chat.completion.chunk",
+                                        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}) + "\n\n")
+            send("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_fake_groq(port: int = 0, config: FakeGroqConfig = None):
+    """Start the server on a daemon thread; returns (server, base_url)."""
+    FakeGroqHandler.config = config or FakeGroqConfig()
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeGroqHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    ap.add_argument("--tokens-per-sec", type=float, default=200)
+    ap.add_argument("--reply-tokens", type=int, default=120)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    cfg = FakeGroqConfig(args.latency_ms, args.tokens_per_sec, args.reply_tokens, args.error_rate)
+    FakeGroqHandler.config = cfg
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), FakeGroqHandler)
+    print(f"[fake-groq] listening on http://127.0.0.1:{args.port} "
+          f"(ttft {cfg.latency_ms} ms, {cfg.tokens_per_sec} tok/s, {cfg.reply_tokens} tokens)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
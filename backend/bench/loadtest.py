@@ -0,0 +1,450 @@
+"""
+Load test for the FastAPI backend against a local fake Groq server.
+
+Seeds users, check-ins, chat sessions/messages, counselors and slots at scale,
+starts the app under uvicorn (unless --base-url points at a running server),
+drives a weighted mix of chat / booking / analytics / listing requests from
+concurrent clients and reports per-route p50/p95/p99 latency and throughput
+as JSON (compare two runs with bench/compare.py).
+
+Run from backend/:
+  python bench/loadtest.py --duration 30 --concurrency 32 --out before.json
+  python bench/loadtest.py --mix chat=1,listing=4 --llm-latency-ms 800 --out after.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+DEFAULT_MIX = "chat=1,chat_stream=1,booking=1,analytics=2,listing=5"
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--database-url", help="default: a fresh SQLite file in a temp dir")
+    ap.add_argument("--base-url", help="drive an already running server instead of starting one")
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--premium-ratio", type=float, default=0.5)
+    ap.add_argument("--checkins-per-user", type=int, default=60)
+    ap.add_argument("--sessions-per-user", type=int, default=3)
+    ap.add_argument("--messages-per-session", type=int, default=40)
+    ap.add_argument("--counselors", type=int, default=50)
+    ap.add_argument("--days", type=int, default=14)
+    ap.add_argument("--slots-per-day", type=int, default=3)
+    ap.add_argument("--rules-per-counselor", type=int, default=0,
+                    help="weekly availability rules per counselor, on top of the concrete slots")
+    ap.add_argument("--duration", type=float, default=30, help="seconds of measured load")
+    ap.add_argument("--warmup", type=float, default=3, help="seconds of unmeasured load first")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="weighted workloads, e.g. chat=1,listing=4")
+    ap.add_argument("--llm-latency-ms", type=float, default=300)
+    ap.add_argument("--llm-tokens-per-sec", type=float, default=200)
+    ap.add_argument("--llm-reply-tokens", type=int, default=80)
+    ap.add_argument("--llm-error-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="write the JSON report here as well as stdout")
+    return ap.parse_args()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+# -------------------- Seeding --------------------
+
+def chunked_insert(db, model, rows, size=5000):
+    from sqlalchemy import insert
+    for i in range(0, len(rows), size):
+        db.execute(insert(model), rows[i:i + size])
+
+
+def seed(args, rng: random.Random) -> dict:
+    """Bulk-insert the fixture data and return ids/tokens the workloads need."""
+    from database import engine, SessionLocal
+    from models import (User, AICheckIn, ChatSession, ChatMessage, Counselor, AvailabilityRule,
+                        AvailabilitySlot, Resource)
+    from auth import hash_password, make_jwt
+    from migrations import migrate
+    from rollups import rebuild_checkin_daily, reconcile_user_counters
+    from specialties import sync_from_csv
+
+    migrate(engine)
+    db = SessionLocal()
+    now = datetime.utcnow()
+    password_hash = hash_password("loadtest")  # bcrypt once, shared by every seeded user
+    moods = ["calm", "anxious", "tired", "happy", "stressed", "sad"]
+
+    base_uid = (db.query(User.id).order_by(User.id.desc()).limit(1).scalar() or 0) + 1
+    n_premium = int(args.users * args.premium_ratio)
+    chunked_insert(db, User, [
+        {"id": base_uid + i, "email": f"load{base_uid + i}@example.com", "password_hash": password_hash,
+         "plan": "premium" if i < n_premium else "free", "deleted": False, "created_at": now}
+        for i in range(args.users)
+    ])
+    uids = [base_uid + i for i in range(args.users)]
+
+    checkins = []
+    for uid in uids:
+        for _ in range(args.checkins_per_user):
+            checkins.append({"user_id": uid, "mood": rng.choice(moods), "stress_level": rng.randint(0, 10),
+                             "notes": "", "deleted": False,
+                             "created_at": now - timedelta(minutes=rng.randint(0, 90 * 24 * 60))})
+    chunked_insert(db, AICheckIn, checkins)
+    db.commit()
+    rebuild_checkin_daily(db)
+
+    base_sid = (db.query(ChatSession.id).order_by(ChatSession.id.desc()).limit(1).scalar() or 0) + 1
+    sessions, messages, sessions_by_user = [], [], defaultdict(list)
+    sid = base_sid
+    for uid in uids:
+        for s in range(args.sessions_per_user):
+            start = now - timedelta(days=rng.randint(1, 60))
+            sessions.append({"id": sid, "user_id": uid, "title": f"Session {s + 1}", "created_at": start})
+            for m in range(args.messages_per_session):
+                messages.append({"user_id": uid, "session_id": sid,
+                                 "role": "user" if m % 2 == 0 else "assistant",
+                                 "content": f"seeded message {m} " + "lorem ipsum " * rng.randint(2, 30),
+                                 "created_at": start + timedelta(seconds=30 * m)})
+            sessions_by_user[uid].append(sid)
+            sid += 1
+    chunked_insert(db, ChatSession, sessions)
+    chunked_insert(db, ChatMessage, messages)
+    db.commit()
+    reconcile_user_counters(db)
+
+    base_cid = (db.query(Counselor.id).order_by(Counselor.id.desc()).limit(1).scalar() or 0) + 1
+    specialties = ["anxiety", "stress", "students", "trauma", "cbt", "mindfulness", "grief", "family"]
+    chunked_insert(db, Counselor, [
+        {"id": base_cid + i, "full_name": f"Bench Counselor {base_cid + i}", "bio": "Seeded for load tests.",
+         "specialties": ",".join(rng.sample(specialties, 3)), "price_cents": rng.choice([3000, 4500, 6000]),
+         "currency": "BND", "is_active": True, "created_at": now}
+        for i in range(args.counselors)
+    ])
+    cids = [base_cid + i for i in range(args.counselors)]
+    sync_from_csv(db, cids)
+    day0 = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    slots = []
+    for cid in cids:
+        for d in range(args.days):
+            for k in range(args.slots_per_day):
+                start = day0 + timedelta(days=d, hours=1 + 4 * k)
+                slots.append({"counselor_id": cid, "start_time": start, "end_time": start + timedelta(minutes=50),
+                              "is_booked": False, "created_at": now})
+    chunked_insert(db, AvailabilitySlot, slots)
+    n_rules = getattr(args, "rules_per_counselor", 0)
+    chunked_insert(db, AvailabilityRule, [
+        {"counselor_id": cid, "weekday": k % 7, "start_minute": (18 + k // 7) * 60 + 30, "duration_minutes": 50,
+         "utc_offset_minutes": 480, "valid_from": now.date(), "created_at": now}
+        for cid in cids for k in range(n_rules)
+    ])
+    if not db.query(Resource).first():
+        db.add(Resource(title="Brunei Healthline (MOH)", desc="Official health services", url="https://www.moh.gov.bn"))
+    db.commit()
+
+    slot_rows = (
+        db.query(AvailabilitySlot.id, AvailabilitySlot.counselor_id)
+        .filter(AvailabilitySlot.counselor_id.in_(cids))
+        .all()
+    )
+    db.close()
+    slots_by_counselor = defaultdict(list)
+    for slot_id, cid in slot_rows:
+        slots_by_counselor[cid].append(slot_id)
+
+    return {
+        "users": [
+            {"id": uid, "token": make_jwt(str(uid), f"load{uid}@example.com"),
+             "premium": i < n_premium, "sessions": sessions_by_user[uid]}
+            for i, uid in enumerate(uids)
+        ],
+        "counselors": cids,
+        "slots": dict(slots_by_counselor),
+        "counts": {"users": len(uids), "checkins": len(checkins), "sessions": len(sessions),
+                   "messages": len(messages), "counselors": len(cids), "slots": len(slots),
+                   "rules": n_rules * len(cids)},
+    }
+
+
+# -------------------- Workloads --------------------
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def timed(self, route: str, fn):
+        start = time.perf_counter()
+        try:
+            status = fn()
+        except Exception as e:
+            status = type(e).__name__
+        self.latencies[route].append((time.perf_counter() - start) * 1000)
+        self.statuses[route][str(status)] += 1
+
+    def merge(self, other: "Recorder"):
+        for route, values in other.latencies.items():
+            self.latencies[route].extend(values)
+        for route, counts in other.statuses.items():
+            self.statuses[route].update(counts)
+
+
+def auth(user):
+    return {"Authorization": f"Bearer {user['token']}"}
+
+
+def wl_chat(client, fx, rng, rec):
+    user = rng.choice(fx["users"])
+    sid = rng.choice(user["sessions"])
+    rec.timed("POST /chat/sessions/{sid}/send",
+              lambda: client.post(f"/chat/sessions/{sid}/send", headers=auth(user),
+                                  json={"message": f"I feel stressed about work today ({rng.random():.4f})"}).status_code)
+
+
+def wl_chat_stream(client, fx, rng, rec):
+    user = rng.choice(fx["users"])
+    sid = rng.choice(user["sessions"])
+    start = time.perf_counter()
+    first = None
+    status = "error"
+    try:
+        with client.stream("POST", f"/chat/sessions/{sid}/send?stream=true", headers=auth(user),
+                           json={"message": f"Can you help me sleep better? ({rng.random():.4f})"}) as r:
+            status = r.status_code
+            for line in r.iter_lines():
+                if first is None and line.startswith("event: token"):
+                    first = time.perf_counter()
+    except Exception as e:
+        status = type(e).__name__
+    end = time.perf_counter()
+    route = "POST /chat/sessions/{sid}/send?stream"
+    rec.latencies[route].append((end - start) * 1000)
+    rec.statuses[route][str(status)] += 1
+    if first is not None:
+        rec.latencies[route + " (ttft)"].append((first - start) * 1000)
+        rec.statuses[route + " (ttft)"][str(status)] += 1
+
+
+def wl_booking(client, fx, rng, rec):
+    premium = [u for u in fx["users"] if u["premium"]]
+    if not premium or not fx["counselors"]:
+        return
+    user = rng.choice(premium)
+    cid = rng.choice(fx["counselors"])
+    slot_id = rng.choice(fx["slots"][cid])
+    rec.timed("POST /bookings",
+              lambda: client.post("/bookings", headers=auth(user),
+                                  json={"counselor_id": cid, "slot_id": slot_id}).status_code)
+
+
+def wl_analytics(client, fx, rng, rec):
+    user = rng.choice(fx["users"])
+    if rng.random() < 0.5:
+        rec.timed("GET /analytics/overview", lambda: client.get("/analytics/overview", headers=auth(user)).status_code)
+    else:
+        rec.timed("GET /analytics/checkins",
+                  lambda: client.get("/analytics/checkins?days=30", headers=auth(user)).status_code)
+
+
+def wl_listing(client, fx, rng, rec):
+    user = rng.choice(fx["users"])
+    pick = rng.randrange(7)
+    if pick == 0:
+        rec.timed("GET /chat/sessions", lambda: client.get("/chat/sessions", headers=auth(user)).status_code)
+    elif pick == 1:
+        sid = rng.choice(user["sessions"])
+        rec.timed("GET /chat/sessions/{sid}/messages",
+                  lambda: client.get(f"/chat/sessions/{sid}/messages", headers=auth(user)).status_code)
+    elif pick == 2:
+        rec.timed("GET /checkins", lambda: client.get("/checkins?limit=20", headers=auth(user)).status_code)
+    elif pick == 3:
+        rec.timed("GET /counselors", lambda: client.get("/counselors").status_code)
+    elif pick == 4:
+        cid = rng.choice(fx["counselors"])
+        rec.timed("GET /counselors/{cid}/slots", lambda: client.get(f"/counselors/{cid}/slots").status_code)
+    elif pick == 5:
+        rec.timed("GET /resources", lambda: client.get("/resources").status_code)
+    else:
+        rec.timed("GET /bookings/my", lambda: client.get("/bookings/my", headers=auth(user)).status_code)
+
+
+WORKLOADS = {
+    "chat": wl_chat,
+    "chat_stream": wl_chat_stream,
+    "booking": wl_booking,
+    "analytics": wl_analytics,
+    "listing": wl_listing,
+}
+
+
+def parse_mix(spec: str):
+    names, weights = [], []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in WORKLOADS:
+            raise SystemExit(f"unknown workload {name!r}; choose from {', '.join(WORKLOADS)}")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+def run_load(base_url: str, fx: dict, args) -> tuple:
+    import httpx
+
+    names, weights = parse_mix(args.mix)
+    recorders = []
+    warm_until = time.monotonic() + args.warmup
+    stop_at = warm_until + args.duration
+
+    def worker(n: int):
+        rng = random.Random(args.seed * 1000 + n)
+        measured, scratch = Recorder(), Recorder()
+        recorders.append(measured)
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            while True:
+                now = time.monotonic()
+                if now >= stop_at:
+                    break
+                rec = scratch if now < warm_until else measured
+                WORKLOADS[rng.choices(names, weights)[0]](client, fx, rng, rec)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = Recorder()
+    for r in recorders:
+        total.merge(r)
+    return total, args.duration
+
+
+def report(rec: Recorder, seconds: float) -> dict:
+    routes = {}
+    all_count = all_errors = 0
+    for route in sorted(rec.latencies):
+        lat = rec.latencies[route]
+        statuses = dict(rec.statuses[route])
+        errors = sum(c for s, c in statuses.items() if not (s.isdigit() and int(s) < 500))
+        routes[route] = {
+            "count": len(lat),
+            "errors": errors,
+            "status": statuses,
+            "rps": round(len(lat) / seconds, 2),
+            "mean_ms": round(sum(lat) / len(lat), 2),
+            "p50_ms": round(percentile(lat, 50), 2),
+            "p95_ms": round(percentile(lat, 95), 2),
+            "p99_ms": round(percentile(lat, 99), 2),
+            "max_ms": round(max(lat), 2),
+        }
+        if not route.endswith("(ttft)"):
+            all_count += len(lat)
+            all_errors += errors
+    return {"requests": all_count, "errors": all_errors, "rps": round(all_count / seconds, 2), "routes": routes}
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    tmpdir = None
+    fake = None
+
+    if not args.database_url:
+        tmpdir = tempfile.mkdtemp(prefix="mindcare-load-")
+        args.database_url = f"sqlite:///{tmpdir}/load.db"
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("JWT_SECRET", "loadtest-only-secret-0123456789abcdef")
+    # server stats come from /debug/stats; against --base-url, export that server's DEBUG_TOKEN
+    os.environ.setdefault("DEBUG_ROUTES", "1")
+    os.environ.setdefault("DEBUG_TOKEN", "loadtest-only-debug-token")
+
+    if not args.base_url:
+        from fake_groq import FakeGroqConfig, start_fake_groq
+        fake, fake_url = start_fake_groq(config=FakeGroqConfig(
+            args.llm_latency_ms, args.llm_tokens_per_sec, args.llm_reply_tokens, args.llm_error_rate))
+        os.environ["GROQ_BASE_URL"] = fake_url
+        os.environ["GROQ_API_KEY"] = "fake-key"
+
+    t0 = time.perf_counter()
+    fx = seed(args, rng)
+    seed_seconds = time.perf_counter() - t0
+    print(f"[load] seeded {fx['counts']} in {seed_seconds:.1f}s", file=sys.stderr)
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        import uvicorn
+        import main as app_module
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port,
+                                               log_level="warning", access_log=False))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+        base_url = f"http://127.0.0.1:{port}"
+
+    print(f"[load] {args.concurrency} clients for {args.warmup}s warmup + {args.duration}s "
+          f"against {base_url} (mix {args.mix})", file=sys.stderr)
+    rec, seconds = run_load(base_url, fx, args)
+
+    import httpx
+    try:
+        server_stats = httpx.get(f"{base_url}/debug/stats", headers={"X-Debug-Token": os.environ["DEBUG_TOKEN"]},
+                                 timeout=5)
+        server_stats = server_stats.json() if server_stats.status_code == 200 else None
+    except Exception:
+        server_stats = None
+
+    result = {
+        "meta": {
+            "git_rev": git_rev(),
+            "started_at": datetime.utcnow().isoformat(),
+            "database_url": args.database_url if "@" not in args.database_url else "(redacted)",
+            "args": {k: v for k, v in vars(args).items() if k not in ("database_url", "out")},
+        },
+        "seed": {**fx["counts"], "seconds": round(seed_seconds, 2)},
+        **report(rec, seconds),
+        "server_stats": server_stats,
+    }
+    if server:
+        server.should_exit = True
+    if fake:
+        fake.shutdown()
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Cached, versioned response bodies for the public catalogs (/resources, /counselors).
+
+- catalog_versions holds one counter per catalog. Every write to its table
+  bumps it in the same transaction: ORM writes through the session hooks at
+  the bottom of this file, Core writes (bulk import, specialty sync) by
+  calling bump_catalog_version() themselves.
+- Each worker keeps the serialized body it built and the version it was built
+  at. The counter is re-read (one primary-key lookup) at most every
+  CATALOG_VERSION_CHECK_SECONDS; a commit that bumped it on this worker marks
+  the local copy stale at once, other workers converge within the interval.
+- Bodies carry a strong ETag (a hash of the bytes, so every worker agrees on
+  it). A matching If-None-Match is answered 304 from memory, no DB access.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from database import ReadSessionLocal
+from models import CatalogVersion, Counselor, Resource
+
+CATALOG_VERSION_CHECK_SECONDS = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", "5"))
+CATALOG_MAX_AGE_SECONDS = int(os.getenv("CATALOG_MAX_AGE_SECONDS", "60"))
+CATALOG_CACHE_CONTROL = f"public, max-age={CATALOG_MAX_AGE_SECONDS}"
+
+CATALOG_MODELS = {Resource: "resources", Counselor: "counselors"}
+CATALOGS = tuple(CATALOG_MODELS.values())
+
+
+def bump_catalog_version(conn, *names):
+    """Mark catalogs changed, inside the caller's transaction. conn: Session or Connection."""
+    t = CatalogVersion.__table__
+    conn.execute(update(t).where(t.c.name.in_(names)).values(version=t.c.version + 1, updated_at=datetime.utcnow()))
+    if isinstance(conn, Session):
+        conn.info.setdefault("catalogs_changed", set()).update(names)
+
+
+def current_version(db, name: str) -> int:
+    return db.execute(select(CatalogVersion.version).where(CatalogVersion.name == name)).scalar() or 0
+
+
+def serialize(rows) -> bytes:
+    # byte-for-byte what JSONResponse renders
+    return json.dumps(rows, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class CatalogEntry:
+    __slots__ = ("version", "body", "etag")
+
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class CatalogCache:
+    def __init__(self, session_factory, check_seconds: float = CATALOG_VERSION_CHECK_SECONDS):
+        self.session_factory = session_factory
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._loaders = {}     # name -> fn(db) -> list of dicts
+        self._entries = {}     # name -> CatalogEntry
+        self._checked_at = {}  # name -> monotonic time of the last version check
+        self.hits = 0
+        self.version_checks = 0
+        self.rebuilds = 0
+
+    def register(self, name: str, loader):
+        self._loaders[name] = loader
+
+    def fresh(self, name: str):
+        """The cached entry if its version was checked recently enough, else None."""
+        with self._lock:
+            entry = self._entries.get(name)
+            checked = self._checked_at.get(name)
+            if entry is None or checked is None or time.monotonic() - checked >= self.check_seconds:
+                return None
+            self.hits += 1
+            return entry
+
+    def get(self, name: str) -> CatalogEntry:
+        """Check the version and rebuild the body if it moved. Blocking (queries the DB)."""
+        db = self.session_factory()
+        try:
+            # version first: a write landing in between makes the body newer than
+            # the version, which the next check corrects; the reverse order could
+            # cache an old body under the new version
+            version = current_version(db, name)
+            entry = self._entries.get(name)
+            rebuilt = entry is None or entry.version != version
+            if rebuilt:
+                entry = CatalogEntry(version, serialize(self._loaders[name](db)))
+        finally:
+            db.close()
+        with self._lock:
+            self.version_checks += 1
+            self.rebuilds += rebuilt
+            self._entries[name] = entry
+            self._checked_at[name] = time.monotonic()
+        return entry
+
+    def invalidate(self, name: str):
+        """Re-check the version on the next request (this worker only)."""
+        with self._lock:
+            self._checked_at.pop(name, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "catalogs": {name: {"version": e.version, "bytes": len(e.body)} for name, e in self._entries.items()},
+                "hits": self.hits,
+                "version_checks": self.version_checks,
+                "rebuilds": self.rebuilds,
+            }
+
+
+catalog_cache = CatalogCache(ReadSessionLocal)
+
+
+# ---- version bumps on ORM writes to resources / counselors ----
+
+@event.listens_for(Session, "before_flush")
+def _bump_changed_catalogs(session, flush_context, instances):
+    names = {
+        CATALOG_MODELS[type(obj)]
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if type(obj) in CATALOG_MODELS and (obj not in session.dirty or session.is_modified(obj))
+    }
+    if names:
+        bump_catalog_version(session.connection(), *sorted(names))
+        session.info.setdefault("catalogs_changed", set()).update(names)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_catalogs(session):
+    for name in session.info.pop("catalogs_changed", ()):
+        catalog_cache.invalidate(name)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_catalog_changes(session):
+    session.info.pop("catalogs_changed", None)
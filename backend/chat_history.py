@@ -0,0 +1,289 @@
+"""
+Token-budgeted history window for persisted chat sessions.
+
+Each send only puts the most recent turns (verbatim) into the prompt, up to
+CHAT_HISTORY_TOKEN_BUDGET. Older turns are folded into ChatSession.summary, a
+rolling summary that is only extended when turns fall out of the window;
+ChatSession.summary_upto_id marks the last message already folded in.
+
+The unsummarized tail of recently active sessions is kept in an in-process
+LRU (history_cache), so a warm send does not read chat_messages at all.
+"""
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import ChatMessage, ChatSession, ChatRole
+from rollups import bump_counters
+
+# Tokens available for summary + recent turns + the new user message
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+# Hard cap on rows read per send, whatever their size
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "40"))
+SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "2000"))
+# One fold sends at most CHAT_HISTORY_MAX_MESSAGES turns / CHAT_HISTORY_TOKEN_BUDGET tokens
+# per summary call, and makes at most this many calls; later sends fold the rest
+SUMMARY_MAX_CHUNKS = int(os.getenv("CHAT_SUMMARY_MAX_CHUNKS", "8"))
+HISTORY_CACHE_MAX_SESSIONS = int(os.getenv("HISTORY_CACHE_MAX_SESSIONS", "1000"))
+HISTORY_CACHE_MAX_BYTES = int(os.getenv("HISTORY_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+SUMMARY_PROMPT = (
+    "You maintain the memory of a MindCare+ support conversation. "
+    "Merge the previous summary and the new turns into one short summary (under 150 words) "
+    "written in third person. Keep what the user shared about their situation, feelings, "
+    "goals and anything that was suggested or agreed. Reply with the summary only."
+)
+
+
+Turn = namedtuple("Turn", "id role content")
+
+
+class HistoryCache:
+    """
+    Bounded LRU of per-session history tails: sid -> (last_id, rows newest first).
+    Entries are validated against ChatSession.last_message_id, which every send
+    updates, so a session written by another worker is simply a miss here.
+    Size is capped by entry count and by approximate content bytes.
+    """
+
+    ROW_OVERHEAD = 100  # rough per-row bytes on top of the content itself
+
+    def __init__(self, max_sessions: int, max_bytes: int):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _size(self, rows) -> int:
+        return sum(len(r.content) + self.ROW_OVERHEAD for r in rows)
+
+    def _drop(self, sid: int):
+        entry = self._entries.pop(sid, None)
+        if entry:
+            self._bytes -= entry[2]
+
+    def _store(self, sid: int, last_id: int, rows: list):
+        self._drop(sid)
+        size = self._size(rows)
+        if size > self.max_bytes:
+            return
+        self._entries[sid] = (last_id, rows, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_sessions or self._bytes > self.max_bytes):
+            _, (_, _, dropped) = self._entries.popitem(last=False)
+            self._bytes -= dropped
+            self.evictions += 1
+
+    def get(self, sess: ChatSession):
+        """Cached rows newer than the session summary, newest first, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(sess.id)
+            if entry is None or entry[0] != (sess.last_message_id or 0):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(sess.id)
+            self.hits += 1
+            upto = sess.summary_upto_id or 0
+            return [r for r in entry[1] if r.id > upto]
+
+    def put(self, sess: ChatSession, rows: list):
+        with self._lock:
+            self._store(sess.id, sess.last_message_id or 0, list(rows))
+
+    def append(self, sid: int, prev_last_id: int, new_rows: list):
+        """Add just-committed rows (oldest first). If the entry isn't the one they
+        follow on from (concurrent send, other worker), drop it instead."""
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return
+            if entry[0] != (prev_last_id or 0):
+                self._drop(sid)
+                return
+            rows = list(reversed(new_rows)) + entry[1]
+            self._store(sid, rows[0].id, rows[:CHAT_HISTORY_MAX_MESSAGES + 1])
+
+    def invalidate(self, sid: int):
+        with self._lock:
+            self._drop(sid)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._entries),
+                "bytes": self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+
+history_cache = HistoryCache(HISTORY_CACHE_MAX_SESSIONS, HISTORY_CACHE_MAX_BYTES)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars/token plus per-message overhead); no tokenizer needed."""
+    return len(text or "") // 4 + 4
+
+
+def load_window(db: Session, sess: ChatSession, message: str, budget: int = None):
+    """
+    Return (window, fold_before_id).
+      - window: recent (id, role, content) rows, oldest first, that fit the budget
+      - fold_before_id: set when unsummarized turns older than the window exist;
+        everything with summary_upto_id < id < fold_before_id should be folded.
+    On a cache miss only rows newer than the summary are read, newest first,
+    capped at CHAT_HISTORY_MAX_MESSAGES (+1 to detect that older rows exist).
+    """
+    budget = CHAT_HISTORY_TOKEN_BUDGET if budget is None else budget
+    rows = history_cache.get(sess)
+    if rows is None:
+        rows = [
+            Turn(*r) for r in
+            db.query(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+            .filter(ChatMessage.session_id == sess.id, ChatMessage.id > (sess.summary_upto_id or 0))
+            .order_by(ChatMessage.id.desc())
+            .limit(CHAT_HISTORY_MAX_MESSAGES + 1)
+            .all()
+        ]
+        history_cache.put(sess, rows)
+    return fit_window(rows, budget - estimate_tokens(sess.summary) - estimate_tokens(message))
+
+
+def fit_window(rows_newest_first, budget: int):
+    """Keep the newest rows that fit `budget`; see load_window for the return value."""
+    window = []
+    used = 0
+    for r in rows_newest_first[:CHAT_HISTORY_MAX_MESSAGES]:
+        cost = estimate_tokens(r.content)
+        if window and used + cost > budget:
+            break
+        window.append(r)
+        used += cost
+    window.reverse()
+    overflow = len(window) < len(rows_newest_first)
+    return window, (window[0].id if overflow and window else None)
+
+
+def record_turns(db: Session, sess: ChatSession, turns: list):
+    """Add ChatMessage rows for one exchange, bump sess.last_message_id and commit;
+    then extend the cached tail so the next send starts warm."""
+    sid, prev_last_id = sess.id, sess.last_message_id
+    for m in turns:
+        db.add(m)
+    db.flush()
+    bump_counters(db, sess.user_id, messages=len(turns))
+    # capture before commit expires the instances
+    rows = [Turn(m.id, m.role, m.content) for m in turns]
+    sess.last_message_id = rows[-1].id
+    db.commit()
+    history_cache.append(sid, prev_last_id, rows)
+
+
+def format_turns(rows) -> str:
+    return "\n".join(
+        f"{'User' if r.role == ChatRole.user else 'Assistant'}: {r.content}" for r in rows
+    )
+
+
+def extractive_summary(previous: str, rows) -> str:
+    """Fallback when the LLM is unavailable: keep the gist of each user turn."""
+    notes = [f"- User said: {r.content[:200]}" for r in rows if r.role == ChatRole.user]
+    text = "\n".join(p for p in [previous or "", *notes] if p)
+    return text[-SUMMARY_MAX_CHARS:]
+
+
+def fold_chunk(rows, budget: int = None) -> list:
+    """The oldest rows (at least one) that fit `budget` tokens, at most CHAT_HISTORY_MAX_MESSAGES."""
+    budget = CHAT_HISTORY_TOKEN_BUDGET if budget is None else budget
+    chunk = []
+    used = 0
+    for r in rows[:CHAT_HISTORY_MAX_MESSAGES]:
+        cost = estimate_tokens(r.content)
+        if chunk and used + cost > budget:
+            break
+        chunk.append(r)
+        used += cost
+    return chunk
+
+
+def _read_fold_chunk(sid: int, before_id: int):
+    """(summary_upto_id, summary, next chunk of turns to fold) on a short read, or None."""
+    db = SessionLocal()
+    try:
+        sess = (db.query(ChatSession.summary_upto_id, ChatSession.summary)
+                .filter(ChatSession.id == sid).first())
+        if not sess:
+            return None
+        upto = sess.summary_upto_id or 0
+        rows = fold_chunk([
+            Turn(*r) for r in
+            db.query(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+            .filter(ChatMessage.session_id == sid, ChatMessage.id > upto, ChatMessage.id < before_id)
+            .order_by(ChatMessage.id.asc())
+            .limit(CHAT_HISTORY_MAX_MESSAGES)
+            .all()
+        ])
+        return upto, sess.summary, rows
+    finally:
+        db.close()
+
+
+def _store_fold(sid: int, upto: int, summary: str, last_id: int) -> bool:
+    """Write a folded summary if nobody else has moved summary_upto_id since it was read."""
+    db = SessionLocal()
+    try:
+        updated = (
+            db.query(ChatSession)
+            .filter(ChatSession.id == sid, ChatSession.summary_upto_id == upto)
+            .update({"summary": summary, "summary_upto_id": last_id}, synchronize_session=False)
+        )
+        db.commit()
+        return bool(updated)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def fold_summary(sid: int, before_id: int, complete):
+    """
+    Fold turns that fell out of the window into the session's rolling summary.
+    `complete(messages) -> str` is the LLM call; runs after the response is sent.
+    Turns are folded oldest first in chunks (fold_chunk), one summary call and
+    commit per chunk, so a long backlog never goes out as one prompt; at most
+    SUMMARY_MAX_CHUNKS per fold. No connection is held during the LLM call: each
+    chunk is read in one short session and its summary written in another, with
+    a conditional UPDATE so concurrent folds can't overwrite each other (the
+    loser stops, and its turns are simply folded next time).
+    """
+    try:
+        for _ in range(SUMMARY_MAX_CHUNKS):
+            chunk = _read_fold_chunk(sid, before_id)
+            if not chunk or not chunk[2]:
+                return
+            upto, summary, rows = chunk
+            folded = (complete([
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": (
+                    f"Previous summary:\n{summary or '(none)'}\n\nNew turns:\n{format_turns(rows)}"
+                )},
+            ]) or extractive_summary(summary, rows))[:SUMMARY_MAX_CHARS]
+            if not _store_fold(sid, upto, folded, rows[-1].id):
+                print(f"[history] session {sid}: summary changed concurrently; skipped fold")
+                return
+        print(f"[history] session {sid}: folded {SUMMARY_MAX_CHUNKS} chunks; the rest is left for later sends")
+    except Exception as e:
+        print("[history] fold failed:", e)
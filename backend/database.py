@@ -1,31 +1,221 @@
+from collections import deque
+import time
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlalchemy import event
 import os
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./mindcare.db")
 
-# Railway provides plain mysql:// URLs; SQLAlchemy needs the pymysql dialect
-if DATABASE_URL.startswith("mysql://"):
-    DATABASE_URL = DATABASE_URL.replace("mysql://", "mysql+pymysql://", 1)
+def normalize_url(url: str) -> str:
+    # Railway provides plain mysql:// URLs; SQLAlchemy needs the pymysql dialect
+    if url.startswith("mysql://"):
+        return url.replace("mysql://", "mysql+pymysql://", 1)
+    return url
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine: Engine = create_engine(DATABASE_URL, echo=False, future=True, connect_args=connect_args)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-Base = declarative_base()
 
-# Ensure SQLite foreign keys
-if DATABASE_URL.startswith("sqlite"):
-    @event.listens_for(engine, "connect")
+DATABASE_URL = normalize_url(os.getenv("DATABASE_URL", "sqlite:///./mindcare.db"))
+# Optional read-only replica; read-only routes (listings, analytics, resources,
+# the slot index) query it through get_read_db / get_async_read_db. Replication
+# lag applies: a row written a moment ago may not be listed yet.
+DATABASE_REPLICA_URL = normalize_url(os.getenv("DATABASE_REPLICA_URL", ""))
+
+# Async routes use the same database through an asyncio driver
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "mysql+pymysql": "mysql+aiomysql"}
+
+
+def async_url(url: str) -> str:
+    """The asyncio-driver URL for `url`. Fails at startup for a database without
+    a mapped driver, rather than on the first async query."""
+    scheme, rest = url.split("://", 1)
+    if scheme in ASYNC_DRIVERS.values():
+        return url
+    if scheme not in ASYNC_DRIVERS:
+        raise RuntimeError(
+            f"no async driver for database URL scheme {scheme!r}; supported: "
+            f"{', '.join(ASYNC_DRIVERS)} (mysql:// too), or set ASYNC_DATABASE_URL explicitly"
+        )
+    return f"{ASYNC_DRIVERS[scheme]}://{rest}"
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+
+# -------------------- Engine profiles --------------------
+
+# DB_PROFILE picks one. "mysql" is the pool config for a database server,
+# "sqlite" the pool for a SQLite file, "pragmas" run on every new SQLite connection.
+ENGINE_PROFILES = {
+    # library defaults, as before profiles existed (for comparison runs)
+    "legacy": {"mysql": {}, "sqlite": {}, "pragmas": {}},
+    "default": {
+        # pre-ping + recycle: no "MySQL server has gone away" after idle periods
+        "mysql": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 10,
+                  "pool_pre_ping": True, "pool_recycle": 1800},
+        # SQLite has one writer: more connections only add writers spinning on
+        # busy_timeout while the one holding the lock waits for the event loop
+        "sqlite": {"pool_size": 5, "max_overflow": 5, "pool_timeout": 10},
+        # WAL: readers never block the writer; writers queue on busy_timeout
+        # instead of failing with "database is locked"
+        "pragmas": {"journal_mode": "WAL", "busy_timeout": 5000, "synchronous": "NORMAL",
+                    "mmap_size": 256 * 1024 * 1024, "cache_size": -64 * 1024},
+    },
+    "high-concurrency": {
+        "mysql": {"pool_size": 30, "max_overflow": 60, "pool_timeout": 10,
+                  "pool_pre_ping": True, "pool_recycle": 1800},
+        "sqlite": {"pool_size": 8, "max_overflow": 8, "pool_timeout": 20},
+        "pragmas": {"journal_mode": "WAL", "busy_timeout": 10000, "synchronous": "NORMAL",
+                    "mmap_size": 1024 * 1024 * 1024, "cache_size": -256 * 1024},
+    },
+}
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+if DB_PROFILE not in ENGINE_PROFILES:
+    raise RuntimeError(f"unknown DB_PROFILE {DB_PROFILE!r}; one of: {', '.join(ENGINE_PROFILES)}")
+# per-deployment overrides of the profile's pool size
+POOL_OVERRIDES = {key: int(os.environ[env]) for key, env in (("pool_size", "DB_POOL_SIZE"),
+                                                            ("max_overflow", "DB_MAX_OVERFLOW"))
+                  if os.getenv(env)}
+
+
+class _TimedCheckout:
+    """Pool mixin: records how long each checkout took (waiting for a free
+    connection, or opening an overflow one) and how many timed out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_ms = deque(maxlen=1000)
+        self.checkout_timeouts = 0
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeout:
+            self.checkout_timeouts += 1
+            raise
+        self.checkout_ms.append((time.perf_counter() - t0) * 1000)
+        return conn
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(url: str, is_async: bool) -> dict:
+    profile = ENGINE_PROFILES[DB_PROFILE]
+    poolclass = TimedAsyncQueuePool if is_async else TimedQueuePool
+    if not url.startswith("sqlite"):
+        return {"poolclass": poolclass, **profile["mysql"], **POOL_OVERRIDES}
+    options = {} if is_async else {"connect_args": {"check_same_thread": False}}
+    if make_url(url).database not in (None, "", ":memory:"):  # in-memory keeps its single-connection pool
+        options.update(poolclass=poolclass, **{**profile["sqlite"], **POOL_OVERRIDES})
+    return options
+
+
+def _on_sqlite_connect(sync_engine: Engine):
+    pragmas = {"foreign_keys": "ON", **ENGINE_PROFILES[DB_PROFILE]["pragmas"]}
+
+    @event.listens_for(sync_engine, "connect")
     def set_sqlite_pragma(dbapi_connection, connection_record):
         cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
         cursor.close()
 
+
+def make_engine(url: str) -> Engine:
+    eng = create_engine(url, echo=False, future=True, **_engine_options(url, is_async=False))
+    if url.startswith("sqlite"):
+        _on_sqlite_connect(eng)
+    return eng
+
+
+def make_async_engine(url: str) -> AsyncEngine:
+    eng = create_async_engine(url, echo=False, **_engine_options(url, is_async=True))
+    if url.startswith("sqlite"):
+        _on_sqlite_connect(eng.sync_engine)
+    return eng
+
+# -------------------- Engines and sessions --------------------
+
+engine: Engine = make_engine(DATABASE_URL)
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+async_engine: AsyncEngine = make_async_engine(ASYNC_DATABASE_URL)
+# expire_on_commit=False: rows stay readable after commit without another (awaited) load
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+Base = declarative_base()
+
+if DATABASE_REPLICA_URL:
+    read_engine: Engine = make_engine(DATABASE_REPLICA_URL)
+    async_read_engine: AsyncEngine = make_async_engine(async_url(DATABASE_REPLICA_URL))
+    ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
+    AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
+else:
+    read_engine, async_read_engine = engine, async_engine
+    ReadSessionLocal, AsyncReadSessionLocal = SessionLocal, AsyncSessionLocal
+
+# Every engine the app queries, by name (sync side; an async engine's events and
+# pool live on its .sync_engine)
+ENGINES = {"primary": engine, "primary_async": async_engine.sync_engine}
+if DATABASE_REPLICA_URL:
+    ENGINES.update(replica=read_engine, replica_async=async_read_engine.sync_engine)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Request-scoped AsyncSession. Routes run their (sync) query helpers on it
+    with `await db.run_sync(fn, ...)` and can close it early, e.g. before an LLM call."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+if DATABASE_REPLICA_URL:
+    def get_read_db():
+        db = ReadSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_read_db():
+        async with AsyncReadSessionLocal() as db:
+            yield db
+else:
+    # Same callables as the primary ones, so a route that depends on both gets
+    # one (cached) session instead of two connections
+    get_read_db, get_async_read_db = get_db, get_async_db
+
+
+def pool_stats() -> dict:
+    """Connection pool usage and checkout times per engine (this worker)."""
+    out = {}
+    for name, eng in ENGINES.items():
+        pool = eng.pool
+        entry = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        if isinstance(pool, _TimedCheckout):
+            waits = sorted(pool.checkout_ms)
+            entry.update(
+                checkouts_sampled=len(waits),
+                checkout_ms_p50=round(waits[len(waits) // 2], 2) if waits else None,
+                checkout_ms_p95=round(waits[int(len(waits) * 0.95)], 2) if waits else None,
+                checkout_ms_max=round(waits[-1], 2) if waits else None,
+                checkout_timeouts=pool.checkout_timeouts,
+            )
+        out[name] = entry
+    return out
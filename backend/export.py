@@ -0,0 +1,162 @@
+"""
+Streaming NDJSON export of a user's history: GET /me/export (the whole
+account), GET /chat/sessions/{sid}/export (one session), and this script for
+exports on a user's behalf (clinical handover).
+
+One JSON object per line, each with a "type":
+  export    first line: user_id, session_id (session exports), since, until
+  user      the account (account exports)
+  session   id, title, created_at, checkin_id, mood_at_start, stress_at_start
+  message   id, session_id, role, content, created_at
+  checkin   id, mood, stress_level, notes, created_at (live ones)
+  booking   id, status, created_at, counselor_id, counselor_name, slot_id, slot_start, slot_end
+Sections come in that order, rows oldest first.
+
+since/until select rows by created_at, since <= created_at < until; until
+defaults to the time of the request and is echoed in the export line, so
+passing it back as the next since picks up exactly where the last export
+stopped. A session export always starts with its session line.
+
+Rows come off a server-side cursor EXPORT_YIELD_PER at a time and leave in
+chunks of about EXPORT_CHUNK_BYTES (gzip-compressed on request), so memory
+doesn't grow with the history. An export holds one read connection for as
+long as it streams.
+
+  python export.py --user-id ID [--session-id SID] [--since T] [--until T] [--gzip] --out FILE
+"""
+import argparse
+import asyncio
+import os
+import zlib
+from datetime import datetime
+
+import anyio
+from sqlalchemy import select
+
+from database import AsyncReadSessionLocal
+from fast_json import dumps
+from models import AICheckIn, AvailabilitySlot, Booking, ChatMessage, ChatSession, Counselor, User
+
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+EXPORT_FORMAT_VERSION = 1
+
+# format query value -> (media type, file extension)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", ".ndjson"),
+    "ndjson.gz": ("application/gzip", ".ndjson.gz"),
+}
+
+SESSION_COLUMNS = (ChatSession.id, ChatSession.title, ChatSession.created_at,
+                   ChatSession.checkin_id, ChatSession.mood_at_start, ChatSession.stress_at_start)
+MESSAGE_COLUMNS = (ChatMessage.id, ChatMessage.session_id, ChatMessage.role, ChatMessage.content,
+                   ChatMessage.created_at)
+CHECKIN_COLUMNS = (AICheckIn.id, AICheckIn.mood, AICheckIn.stress_level, AICheckIn.notes, AICheckIn.created_at)
+BOOKING_COLUMNS = (Booking.id, Booking.status, Booking.created_at, Booking.counselor_id,
+                   Counselor.full_name.label("counselor_name"), Booking.slot_id,
+                   AvailabilitySlot.start_time.label("slot_start"), AvailabilitySlot.end_time.label("slot_end"))
+
+
+def _in_range(stmt, created_col, id_col, since, until):
+    if since is not None:
+        stmt = stmt.where(created_col >= since)
+    return stmt.where(created_col < until).order_by(created_col.asc(), id_col.asc())
+
+
+def account_sections(user_id: int, since, until) -> list:
+    """[(type, statement)] for everything of one user created in [since, until)."""
+    return [
+        ("user", select(User.id, User.email, User.plan, User.created_at).where(User.id == user_id)),
+        ("session", _in_range(select(*SESSION_COLUMNS).where(ChatSession.user_id == user_id),
+                              ChatSession.created_at, ChatSession.id, since, until)),
+        ("message", _in_range(select(*MESSAGE_COLUMNS).where(ChatMessage.user_id == user_id),
+                              ChatMessage.created_at, ChatMessage.id, since, until)),
+        ("checkin", _in_range(select(*CHECKIN_COLUMNS).where(AICheckIn.user_id == user_id,
+                                                            AICheckIn.deleted == False),
+                              AICheckIn.created_at, AICheckIn.id, since, until)),
+        ("booking", _in_range(select(*BOOKING_COLUMNS)
+                              .join(Counselor, Counselor.id == Booking.counselor_id)
+                              .join(AvailabilitySlot, AvailabilitySlot.id == Booking.slot_id)
+                              .where(Booking.user_id == user_id),
+                              Booking.created_at, Booking.id, since, until)),
+    ]
+
+
+def session_sections(user_id: int, session_id: int, since, until) -> list:
+    """[(type, statement)] for one of the user's sessions and its messages created in [since, until)."""
+    # ownership checked on the session row, so the messages are read off their session's index
+    owned = select(ChatSession.id).where(ChatSession.id == session_id, ChatSession.user_id == user_id)
+    return [
+        ("session", select(*SESSION_COLUMNS).where(ChatSession.id == session_id, ChatSession.user_id == user_id)),
+        ("message", _in_range(select(*MESSAGE_COLUMNS).where(ChatMessage.session_id == owned.scalar_subquery()),
+                              ChatMessage.created_at, ChatMessage.id, since, until)),
+    ]
+
+
+async def export_lines(user_id: int, since, until, session_id: int = None,
+                       session_factory=AsyncReadSessionLocal):
+    """NDJSON lines (bytes) of the account, or of one of its sessions."""
+    header = {"type": "export", "format_version": EXPORT_FORMAT_VERSION, "user_id": user_id}
+    if session_id is not None:
+        header["session_id"] = session_id
+    header.update(since=since, until=until, generated_at=datetime.utcnow())
+    yield dumps(header) + b"\n"
+
+    if session_id is None:
+        sections = account_sections(user_id, since, until)
+    else:
+        sections = session_sections(user_id, session_id, since, until)
+    db = session_factory()
+    try:
+        for kind, stmt in sections:
+            result = await db.stream(stmt.execution_options(yield_per=EXPORT_YIELD_PER))
+            async for rows in result.partitions():
+                for row in rows:
+                    yield dumps({"type": kind, **row._asdict()}) + b"\n"
+    finally:
+        # a client disconnect cancels the stream; the connection still goes back to the pool
+        with anyio.CancelScope(shield=True):
+            await db.close()
+
+
+async def chunked(lines, compress: bool = False, chunk_bytes: int = EXPORT_CHUNK_BYTES):
+    """Join lines into ~chunk_bytes pieces, gzip-compressed (one gzip member) if asked."""
+    gz = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    buf = bytearray()
+    async for line in lines:
+        buf += line
+        if len(buf) >= chunk_bytes:
+            out = gz.compress(bytes(buf)) if gz else bytes(buf)
+            buf.clear()
+            if out:
+                yield out
+    out = gz.compress(bytes(buf)) + gz.flush() if gz else bytes(buf)
+    if out:
+        yield out
+
+
+async def _write_export(args):
+    since = datetime.fromisoformat(args.since) if args.since else None
+    until = datetime.fromisoformat(args.until) if args.until else datetime.utcnow()
+    size = 0
+    with open(args.out, "wb") as f:
+        async for chunk in chunked(export_lines(args.user_id, since, until, args.session_id), args.gzip):
+            f.write(chunk)
+            size += len(chunk)
+    print(f"[export] user {args.user_id}: {size} bytes to {args.out} (until {until.isoformat()})")
+
+
+if __name__ == "__main__":
+    from migrations import migrate
+
+    ap = argparse.ArgumentParser(description="Export a user's history as NDJSON")
+    ap.add_argument("--user-id", type=int, required=True)
+    ap.add_argument("--session-id", type=int, help="one session instead of the whole account")
+    ap.add_argument("--since", help="naive UTC ISO time, inclusive")
+    ap.add_argument("--until", help="naive UTC ISO time, exclusive (default: now)")
+    ap.add_argument("--gzip", action="store_true")
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+
+    migrate()
+    asyncio.run(_write_export(args))
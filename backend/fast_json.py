@@ -0,0 +1,59 @@
+"""
+Opt-in fast JSON path for the list-heavy routes (FAST_JSON=1).
+
+Those routes build their items with datetimes left as datetime objects and
+hand them to json_body(). By default the value is returned as-is and FastAPI
+encodes it as for any route (jsonable_encoder walks every value, then
+json.dumps; datetimes become isoformat()). With FAST_JSON=1 it is returned as
+a FastJSONResponse: orjson writes the dicts, and the datetimes natively, in
+one pass. Both give the same bytes (bench/bench_json.py checks every route).
+
+dumps() is the same choice for code that writes JSON itself (export.py).
+
+orjson is only needed with the flag on; without it the default path is used.
+"""
+import json
+import os
+from datetime import date
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+if FAST_JSON and orjson is None:
+    print("[json] FAST_JSON=1 but orjson is not installed; using the default encoder")
+    FAST_JSON = False
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        # no options: naive datetimes come out exactly as isoformat() writes them
+        return orjson.dumps(content)
+
+
+def _isoformat(value):
+    if isinstance(value, date):  # and datetime
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> bytes:
+    """Compact JSON bytes, dates and datetimes as isoformat(); orjson with FAST_JSON=1."""
+    if FAST_JSON:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_isoformat).encode("utf-8")
+
+
+def json_body(content, response: Response = None):
+    """Return value for a list-heavy route. `response` is the route's injected Response,
+    whose headers (X-Next-Cursor) FastAPI drops when a route returns its own."""
+    if not FAST_JSON:
+        return content
+    return FastJSONResponse(content, headers=dict(response.headers) if response is not None else None)
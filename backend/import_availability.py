@@ -0,0 +1,340 @@
+"""
+Bulk import of counselors and availability slots from CSV or JSONL.
+
+Files are read as a stream and written --batch rows at a time with one
+prepared upsert statement (executemany: SQLite reuses the prepared statement,
+PyMySQL rewrites it into multi-row INSERTs), committed every --commit-every
+rows, so memory stays flat and an interrupted import can simply be run again:
+
+- counselors are keyed on external_id (the partner's id); an existing row
+  gets the new name / bio / specialties / price / currency / is_active
+- slots are keyed on (counselor, start_time); an existing unbooked slot gets
+  the new end_time, a booked one is left alone
+
+Counselor rows: external_id, full_name, bio, specialties ("a,b" in CSV, a
+list or string in JSONL), price_cents, currency, is_active.
+Slot rows: counselor (an external_id) or counselor_id, start_time (ISO 8601;
+an offset is converted to UTC, no offset means UTC), and end_time or
+duration_minutes.
+
+Rows that fail validation are counted and skipped (the first few are
+printed with their line numbers). Running API workers pick the new slots up
+when their slot-search index next reloads (SLOT_INDEX_TTL_SECONDS), and the
+counselor changes when /counselors next checks its catalog version.
+
+Run:
+  python import_availability.py --counselors clinic.csv --slots slots.jsonl
+  python import_availability.py --slots - --format jsonl < slots.jsonl
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from sqlalchemy import case, select
+from sqlalchemy.engine import Engine
+
+from catalog_cache import bump_catalog_version
+from models import AvailabilitySlot, Counselor
+from specialties import split_specialties, sync_from_csv
+
+IMPORT_BATCH = 1000
+IMPORT_COMMIT_EVERY = 20000
+MAX_REPORTED_ERRORS = 20
+
+
+# ---- reading ----
+
+def detect_format(path: str, fmt: str = None) -> str:
+    if fmt:
+        return fmt
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"can't tell the format of {path}; pass --format csv|jsonl")
+
+
+def read_rows(path: str, fmt: str = None):
+    """Yield (line number, dict) from a CSV (header row) or JSONL file; '-' is stdin."""
+    fmt = detect_format(path, fmt)
+    if path == "-":
+        f = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    else:
+        f = open(path, encoding="utf-8", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for n, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield n, json.loads(line)
+                    except ValueError as e:
+                        yield n, e
+    finally:
+        if path != "-":
+            f.close()
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _parse_dt(value) -> datetime:
+    dt = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _parse_bool(value, default: bool) -> bool:
+    if _blank(value):
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "y"):
+        return True
+    if text in ("0", "false", "no", "n"):
+        return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+# ---- validation ----
+
+def counselor_values(row: dict, now: datetime) -> dict:
+    external_id = str(row.get("external_id") or "").strip()
+    full_name = str(row.get("full_name") or "").strip()
+    if not external_id or not full_name:
+        raise ValueError("external_id and full_name are required")
+    names = row.get("specialties")
+    names = split_specialties(",".join(names) if isinstance(names, list) else names or "")
+    return {
+        "external_id": external_id[:100],
+        "full_name": full_name[:255],
+        "bio": row.get("bio") or None,
+        "specialties": ",".join(names),
+        "price_cents": int(row.get("price_cents") or 0),
+        "currency": str(row.get("currency") or "BND").strip()[:10],
+        "is_active": _parse_bool(row.get("is_active"), True),
+        "created_at": now,
+    }
+
+
+def slot_values(row: dict, counselor_id: int, now: datetime) -> dict:
+    start = _parse_dt(row["start_time"])
+    if not _blank(row.get("end_time")):
+        end = _parse_dt(row["end_time"])
+    elif not _blank(row.get("duration_minutes")):
+        end = start + timedelta(minutes=int(row["duration_minutes"]))
+    else:
+        raise ValueError("end_time or duration_minutes is required")
+    if end <= start:
+        raise ValueError("end_time must be after start_time")
+    return {"counselor_id": counselor_id, "start_time": start, "end_time": end,
+            "is_booked": False, "created_at": now}
+
+
+# ---- writing ----
+
+def upsert_statement(dialect: str, table, keys: list, update: dict):
+    """INSERT that updates the row whose keys already exist instead of failing.
+    update: {column: fn(proposed row) -> new value}."""
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table)
+        return stmt.on_duplicate_key_update({col: fn(stmt.inserted) for col, fn in update.items()})
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(table)
+        return stmt.on_conflict_do_update(index_elements=keys,
+                                          set_={col: fn(stmt.excluded) for col, fn in update.items()})
+    raise RuntimeError(f"no upsert for dialect {dialect}")
+
+
+def _proposed(col: str):
+    return lambda new: new[col]
+
+
+COUNSELOR_UPDATE = {col: _proposed(col)
+                    for col in ("full_name", "bio", "specialties", "price_cents", "currency", "is_active")}
+# booked slots keep their end time
+SLOT_UPDATE = {
+    "end_time": lambda new: case((AvailabilitySlot.is_booked == True, AvailabilitySlot.end_time),
+                                 else_=new.end_time),
+}
+
+
+class ImportStats:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.read = 0
+        self.written = 0
+        self.skipped = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def skip(self, line: int, reason):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line}: {reason}")
+            print(f"[import] {self.kind} line {line} skipped: {reason}", file=sys.stderr)
+
+    def rate(self) -> float:
+        return self.written / max(time.perf_counter() - self.started, 1e-9)
+
+    def summary(self) -> dict:
+        seconds = time.perf_counter() - self.started
+        return {"kind": self.kind, "read": self.read, "written": self.written, "skipped": self.skipped,
+                "seconds": round(seconds, 2), "rows_per_sec": round(self.written / max(seconds, 1e-9), 1),
+                "errors": self.errors}
+
+
+def _chunks(rows, size: int):
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _commit_if_due(conn, stats: ImportStats, pending: int, commit_every: int) -> int:
+    if pending < commit_every:
+        return pending
+    conn.commit()
+    print(f"[import] {stats.kind}: {stats.written} rows ({stats.rate():.0f} rows/s)", flush=True)
+    return 0
+
+
+def import_counselors(bind: Engine, rows, batch: int = IMPORT_BATCH,
+                      commit_every: int = IMPORT_COMMIT_EVERY) -> dict:
+    stats = ImportStats("counselors")
+    stmt = upsert_statement(bind.dialect.name, Counselor.__table__, ["external_id"], COUNSELOR_UPDATE)
+    with bind.connect() as conn:
+        pending = 0
+        for chunk in _chunks(rows, batch):
+            now = datetime.utcnow()
+            values = {}
+            for line, row in chunk:
+                stats.read += 1
+                try:
+                    if isinstance(row, Exception):
+                        raise row
+                    v = counselor_values(row, now)
+                except (KeyError, TypeError, ValueError) as e:
+                    stats.skip(line, e)
+                    continue
+                values[v["external_id"]] = v  # last one wins within a batch
+            if not values:
+                continue
+            conn.execute(stmt, list(values.values()))
+            ids = [cid for (cid,) in conn.execute(
+                select(Counselor.id).where(Counselor.external_id.in_(list(values))))]
+            sync_from_csv(conn, ids)
+            bump_catalog_version(conn, "counselors")  # running workers rebuild /counselors
+            stats.written += len(values)
+            pending = _commit_if_due(conn, stats, pending + len(values), commit_every)
+        conn.commit()
+    return stats.summary()
+
+
+class CounselorIds:
+    """Resolves a slot row's counselor / counselor_id to a row id, one query per batch of unknowns."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.by_external = {}
+        self.known_ids = set()
+
+    def prefetch(self, rows):
+        refs = {str(r["counselor"]).strip() for _, r in rows
+                if isinstance(r, dict) and not _blank(r.get("counselor"))} - set(self.by_external)
+        if refs:
+            found = dict(self.conn.execute(
+                select(Counselor.external_id, Counselor.id).where(Counselor.external_id.in_(list(refs)))).all())
+            for ref in refs:
+                self.by_external[ref] = found.get(ref)
+        ids = set()
+        for _, r in rows:
+            if isinstance(r, dict) and _blank(r.get("counselor")) and not _blank(r.get("counselor_id")):
+                try:
+                    ids.add(int(r["counselor_id"]))
+                except (TypeError, ValueError):
+                    pass
+        ids -= self.known_ids
+        if ids:
+            self.known_ids.update(self.conn.execute(select(Counselor.id).where(Counselor.id.in_(list(ids)))).scalars())
+
+    def resolve(self, row: dict) -> int:
+        if not _blank(row.get("counselor")):
+            cid = self.by_external.get(str(row["counselor"]).strip())
+            if cid is None:
+                raise ValueError(f"unknown counselor {row['counselor']!r}")
+            return cid
+        if _blank(row.get("counselor_id")):
+            raise ValueError("counselor or counselor_id is required")
+        cid = int(row["counselor_id"])
+        if cid not in self.known_ids:
+            raise ValueError(f"unknown counselor_id {cid}")
+        return cid
+
+
+def import_slots(bind: Engine, rows, batch: int = IMPORT_BATCH,
+                 commit_every: int = IMPORT_COMMIT_EVERY) -> dict:
+    stats = ImportStats("slots")
+    stmt = upsert_statement(bind.dialect.name, AvailabilitySlot.__table__, ["counselor_id", "start_time"], SLOT_UPDATE)
+    with bind.connect() as conn:
+        counselors = CounselorIds(conn)
+        pending = 0
+        for chunk in _chunks(rows, batch):
+            now = datetime.utcnow()
+            counselors.prefetch(chunk)
+            values = {}
+            for line, row in chunk:
+                stats.read += 1
+                try:
+                    if isinstance(row, Exception):
+                        raise row
+                    v = slot_values(row, counselors.resolve(row), now)
+                except (KeyError, TypeError, ValueError) as e:
+                    stats.skip(line, e)
+                    continue
+                values[(v["counselor_id"], v["start_time"])] = v
+            if not values:
+                continue
+            conn.execute(stmt, list(values.values()))
+            stats.written += len(values)
+            pending = _commit_if_due(conn, stats, pending + len(values), commit_every)
+        conn.commit()
+    return stats.summary()
+
+
+if __name__ == "__main__":
+    from database import engine
+    from migrations import migrate
+
+    ap = argparse.ArgumentParser(description="Import counselors and availability slots from CSV / JSONL")
+    ap.add_argument("--counselors", metavar="FILE", help="counselor rows ('-' for stdin)")
+    ap.add_argument("--slots", metavar="FILE", help="slot rows ('-' for stdin)")
+    ap.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    ap.add_argument("--batch", type=int, default=IMPORT_BATCH, help="rows per executemany")
+    ap.add_argument("--commit-every", type=int, default=IMPORT_COMMIT_EVERY, help="rows per transaction")
+    args = ap.parse_args()
+    if not args.counselors and not args.slots:
+        ap.error("nothing to import: pass --counselors and/or --slots")
+
+    migrate()
+    if args.counselors:
+        result = import_counselors(engine, read_rows(args.counselors, args.format), args.batch, args.commit_every)
+        print(json.dumps(result))
+    if args.slots:
+        result = import_slots(engine, read_rows(args.slots, args.format), args.batch, args.commit_every)
+        print(json.dumps(result))
@@ -0,0 +1,248 @@
+"""
+Admission control in front of the Groq API.
+
+- at most LLM_MAX_IN_FLIGHT upstream calls at once; the rest wait in a bounded
+  priority queue (premium users first, then free, then anonymous /chat, then
+  background work such as summary folding), FIFO within a priority
+- when the queue is full, a new request displaces the lowest-priority waiter
+  (the most recently queued one among equals) if it outranks it; only a request
+  that ranks no higher than every waiter is turned away
+- a full queue, being displaced, or a wait longer than LLM_QUEUE_TIMEOUT_SECONDS
+  sheds the request with SchedulerBusy (the app turns it into 503 + Retry-After)
+- a circuit breaker stops calling upstream for LLM_BREAKER_COOLDOWN_SECONDS
+  after LLM_BREAKER_FAILURES consecutive failures, then lets a single trial
+  call through before closing again. Only interactive calls count: background
+  calls (UNCOUNTED_PRIORITIES) neither trip nor reset it, so a failing summary
+  prompt can't turn chat away for everyone
+
+acquire() blocks the calling thread; async routes use acquire_async(), which
+takes a free slot inline and otherwise waits in a worker thread of its own
+limiter, so queued chat requests don't occupy the app's threadpool.
+"""
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import anyio
+
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+LLM_RETRY_AFTER_SECONDS = int(os.getenv("LLM_RETRY_AFTER_SECONDS", "2"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+
+class Priority:
+    premium    = 0
+    free       = 1
+    anonymous  = 2
+    background = 3
+
+    names = {0: "premium", 1: "free", 2: "anonymous", 3: "background"}
+
+
+# Priorities whose outcomes the breaker ignores
+UNCOUNTED_PRIORITIES = frozenset({Priority.background})
+
+
+class SchedulerBusy(Exception):
+    """Request shed before reaching upstream; retry_after is in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Slot:
+    """One admitted upstream call. release() is idempotent; mark failed() before
+    releasing if the call failed so the breaker can count it."""
+
+    def __init__(self, scheduler: "LLMScheduler", trial: bool = False, counted: bool = True):
+        self._scheduler = scheduler
+        self._trial = trial
+        self._counted = counted
+        self._ok = True
+        self._released = False
+
+    def failed(self):
+        self._ok = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._scheduler._release(self._ok, self._trial, self._counted)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._ok = False
+        self.release()
+
+    def __del__(self):
+        # safety net for streams that were never iterated (client gone before the first byte)
+        self.release()
+
+
+class LLMScheduler:
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float,
+                 breaker_failures: int, breaker_cooldown: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self._cond = threading.Condition()
+        self._waiters = []            # heap of [priority, seq, displaced]
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._trial_running = False
+        self._waits_ms = deque(maxlen=1000)
+        self._wait_limiter = None     # anyio.CapacityLimiter for acquire_async waiters
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_displaced = 0
+        self.shed_timeout = 0
+        self.shed_circuit_open = 0
+
+    # ---- breaker ----
+
+    def _breaker_state(self, now: float) -> str:
+        if self._consecutive_failures < self.breaker_failures:
+            return "closed"
+        return "open" if now < self._open_until else "half_open"
+
+    def _check_breaker(self, now: float):
+        state = self._breaker_state(now)
+        if state == "open":
+            self.shed_circuit_open += 1
+            raise SchedulerBusy("circuit open", max(1, math.ceil(self._open_until - now)))
+        if state == "half_open" and self._trial_running:
+            self.shed_circuit_open += 1
+            raise SchedulerBusy("circuit half-open", LLM_RETRY_AFTER_SECONDS)
+
+    # ---- admission ----
+
+    def acquire(self, priority: int = Priority.free) -> Slot:
+        start = time.monotonic()
+        with self._cond:
+            self._check_breaker(time.time())
+            if self._in_flight >= self.max_in_flight or self._waiters:
+                if len(self._waiters) >= self.max_queue:
+                    self._displace(priority)
+                ticket = [priority, next(self._seq), False]
+                heapq.heappush(self._waiters, ticket)
+                deadline = start + self.queue_timeout
+                while not (self._waiters[0] is ticket and self._in_flight < self.max_in_flight):
+                    if ticket[2]:
+                        raise SchedulerBusy("queue full", LLM_RETRY_AFTER_SECONDS)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._waiters.remove(ticket)
+                        heapq.heapify(self._waiters)
+                        self.shed_timeout += 1
+                        self._cond.notify_all()
+                        raise SchedulerBusy("queue wait timed out", LLM_RETRY_AFTER_SECONDS)
+                    self._cond.wait(remaining)
+                heapq.heappop(self._waiters)
+                # breaker may have opened while we waited
+                try:
+                    self._check_breaker(time.time())
+                except SchedulerBusy:
+                    self._cond.notify_all()
+                    raise
+            return self._admit(start, priority)
+
+    def _displace(self, priority: int):
+        """Make room in a full queue for `priority` by dropping the worst waiter
+        (lowest priority, latest queued), or raise if nobody ranks below it."""
+        # caller holds self._cond
+        worst = max(self._waiters, default=None)
+        if worst is None or worst[0] <= priority:
+            self.shed_queue_full += 1
+            raise SchedulerBusy("queue full", LLM_RETRY_AFTER_SECONDS)
+        self._waiters.remove(worst)
+        heapq.heapify(self._waiters)
+        worst[2] = True
+        self.shed_displaced += 1
+        self._cond.notify_all()
+
+    def _admit(self, start: float, priority: int) -> Slot:
+        # caller holds self._cond
+        counted = priority not in UNCOUNTED_PRIORITIES
+        trial = counted and self._breaker_state(time.time()) == "half_open"
+        if trial:
+            self._trial_running = True
+        self._in_flight += 1
+        self.admitted += 1
+        self._waits_ms.append((time.monotonic() - start) * 1000)
+        self._cond.notify_all()
+        return Slot(self, trial, counted)
+
+    async def acquire_async(self, priority: int = Priority.free) -> Slot:
+        """acquire() for coroutines. The common case (a slot is free, nobody queued)
+        doesn't leave the event loop; a queued wait blocks a thread from a limiter
+        sized to the queue, never one of the threadpool's."""
+        start = time.monotonic()
+        with self._cond:
+            self._check_breaker(time.time())
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                return self._admit(start, priority)
+        if self._wait_limiter is None:
+            self._wait_limiter = anyio.CapacityLimiter(max(1, self.max_queue + self.max_in_flight))
+        return await anyio.to_thread.run_sync(self.acquire, priority, limiter=self._wait_limiter)
+
+    def _release(self, ok: bool, trial: bool, counted: bool = True):
+        with self._cond:
+            self._in_flight -= 1
+            if trial:
+                self._trial_running = False
+            if counted and ok:
+                self._consecutive_failures = 0
+            elif counted:
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= self.breaker_failures:
+                    self._open_until = time.time() + self.breaker_cooldown
+                    print(f"[llm] circuit open for {self.breaker_cooldown:.0f}s "
+                          f"after {self._consecutive_failures} failures")
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            waits = sorted(self._waits_ms)
+            queued = {}
+            for prio, _, _ in self._waiters:
+                name = Priority.names.get(prio, str(prio))
+                queued[name] = queued.get(name, 0) + 1
+            return {
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queue_depth": len(self._waiters),
+                "max_queue": self.max_queue,
+                "queued_by_priority": queued,
+                "admitted": self.admitted,
+                "shed_queue_full": self.shed_queue_full,
+                "shed_displaced": self.shed_displaced,
+                "shed_timeout": self.shed_timeout,
+                "shed_circuit_open": self.shed_circuit_open,
+                "wait_ms_p50": round(waits[len(waits) // 2], 2) if waits else None,
+                "wait_ms_p95": round(waits[int(len(waits) * 0.95)], 2) if waits else None,
+                "wait_ms_max": round(waits[-1], 2) if waits else None,
+                "breaker": self._breaker_state(time.time()),
+                "consecutive_failures": self._consecutive_failures,
+            }
+
+
+llm_scheduler = LLMScheduler(
+    LLM_MAX_IN_FLIGHT, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT_SECONDS,
+    LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN_SECONDS,
+)
@@ -1,31 +1,68 @@
 import os
+import hmac
+import json
+import inspect
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-from groq import Groq
+import anyio
+from groq import AsyncGroq, Groq
 
-from fastapi import FastAPI, Depends, HTTPException, Header
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Header, BackgroundTasks, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, JSONResponse
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from dotenv import load_dotenv
 
-from database import Base, engine, get_db
+from database import (
+    ENGINES, get_db, get_async_db, get_async_read_db, AsyncSessionLocal, pool_stats,
+)
 from models import (
     User, AICheckIn, ChatMessage, Resource, ChatRole, ChatSession,
-    Counselor, AvailabilitySlot, Booking, BookingStatus,
+    Counselor, AvailabilitySlot, Booking, BookingStatus, UserCounters,
 )
-from schema import RegisterIn, LoginIn, ChatTurn, ChatIn, ChatOut, CheckInIn
-from auth import hash_password, verify_password, make_jwt, decode_jwt
+from schema import RegisterIn, LoginIn, ChatTurn, ChatIn, ChatOut, CheckInIn, CheckInBatchIn
+from auth import make_jwt, hash_password_async, verify_and_update_password_async, shutdown_hash_pool
+from auth_cache import AuthUser, InvalidToken, token_user_id, load_user, invalidate_user
+from auth_cache import stats as auth_cache_stats
+from chat_history import load_window, fold_summary, record_turns, history_cache
+from retrieval import BM25Index, split_paragraphs
+from answer_cache import answer_cache, ANSWER_CACHE_ENABLED
+from llm_scheduler import llm_scheduler, Priority, SchedulerBusy
+from migrations import migrate
+from profiler import sql_profiler, SQLProfileMiddleware
+from pagination import keyset_page, page_size, NEXT_CURSOR_HEADER, LIST_YIELD_PER
+from availability import open_slots, resolve_slot
+from rollups import apply_checkin, apply_checkins, bump_counters, read_checkin_daily, read_user_counters
+from slot_index import slot_index, SLOT_INDEX_HORIZON_DAYS
+from specialties import normalize_specialty
+from catalog_cache import catalog_cache, etag_matches, CATALOG_CACHE_CONTROL
+from fast_json import json_body
+from export import EXPORT_FORMATS, chunked, export_lines
 
 # -------------------- App bootstrap --------------------
 
 # Load .env early so env vars (JWT secret, model, CORS, etc.) are present
 load_dotenv()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create tables and bring existing databases up to date
+migrate()
 
 app = FastAPI()
+app.router.on_shutdown.append(shutdown_hash_pool)
+
+
+@app.exception_handler(SchedulerBusy)
+def llm_busy_handler(request, exc: SchedulerBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Chat is busy right now ({exc.reason}). Please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 # CORS
 origins = os.getenv("CORS_ORIGINS", "*").split(",")
@@ -35,12 +72,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "X-DB-Queries", "X-DB-Time-ms", "ETag"],
 )
+# Sampled per-request SQL counts/timings (headers, JSON log line, /debug/sql)
+for _engine in ENGINES.values():
+    sql_profiler.install(_engine)
+app.add_middleware(SQLProfileMiddleware)
 
 # Load context + model name
 MODEL = os.getenv("GROQ_MODEL", "llama3-8b-8192")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
-groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+# GROQ_BASE_URL lets load tests point at a local stand-in (bench/fake_groq.py)
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+groq_client = Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL) if GROQ_API_KEY else None
+# Chat routes await the upstream call on the event loop; the blocking client is
+# kept for background work (summary folding) that already runs in a thread
+groq_async_client = AsyncGroq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL) if GROQ_API_KEY else None
 
 CONTEXT_PATH = Path(__file__).parent / "mindcare_context.txt"
 try:
@@ -49,53 +96,206 @@ except FileNotFoundError:
     print(f"[context] {CONTEXT_PATH} not found; using empty context")
     MINDCARE_CONTEXT = ""
 
+# Retrieval: only the top-k relevant paragraphs go into each prompt.
+# CONTEXT_RETRIEVAL=0 restores the old behaviour of sending the whole file.
+CONTEXT_RETRIEVAL = os.getenv("CONTEXT_RETRIEVAL", "1") != "0"
+CONTEXT_TOP_K = int(os.getenv("CONTEXT_TOP_K", "4"))
+context_index = BM25Index(split_paragraphs(MINDCARE_CONTEXT))
+print(f"[context] indexed {len(context_index.chunks)} chunks")
+
 # -------------------- Helpers --------------------
 
-def call_groq(messages: list, timeout_sec: int = 30) -> str:
+def call_groq(messages: list, timeout_sec: int = 30, priority: int = Priority.free) -> str:
+    """Blocking completion. Raises SchedulerBusy if shed by the scheduler;
+    other upstream errors are logged and return ""."""
     if not groq_client:
         print("[groq] client not initialized — check GROQ_API_KEY")
         return ""
-    try:
-        completion = groq_client.chat.completions.create(
-            model=MODEL,
-            messages=messages,
-            max_tokens=1024,
-            timeout=timeout_sec,
-        )
-        return completion.choices[0].message.content.strip()
-    except Exception as e:
-        print("[groq] error:", e)
+    with llm_scheduler.acquire(priority) as slot:
+        try:
+            completion = groq_client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                max_tokens=1024,
+                timeout=timeout_sec,
+            )
+            return completion.choices[0].message.content.strip()
+        except Exception as e:
+            slot.failed()
+            print("[groq] error:", e)
+            return ""
+
+
+async def call_groq_async(messages: list, timeout_sec: int = 30, priority: int = Priority.free) -> str:
+    """call_groq() for async routes: neither the wait for a scheduler slot nor the
+    upstream call holds a threadpool thread."""
+    if not groq_async_client:
+        print("[groq] client not initialized — check GROQ_API_KEY")
         return ""
+    with await llm_scheduler.acquire_async(priority) as slot:
+        try:
+            completion = await groq_async_client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                max_tokens=1024,
+                timeout=timeout_sec,
+            )
+            return completion.choices[0].message.content.strip()
+        except Exception as e:
+            slot.failed()
+            print("[groq] error:", e)
+            return ""
+
+
+class GroqStream:
+    """
+    Async iterator over reply deltas as Groq produces them; yields nothing on error.
+    The scheduler slot is taken by open() (so SchedulerBusy surfaces before any
+    response is started) and held until aclose().
+    """
+
+    def __init__(self, slot, messages: list, timeout_sec: int = 30):
+        self._slot = slot
+        self._deltas = self._generate(messages, timeout_sec)
+
+    @classmethod
+    async def open(cls, messages: list, priority: int = Priority.free, timeout_sec: int = 30) -> "GroqStream":
+        slot = await llm_scheduler.acquire_async(priority) if groq_async_client else None
+        return cls(slot, messages, timeout_sec)
+
+    async def _generate(self, messages: list, timeout_sec: int):
+        if not groq_async_client:
+            print("[groq] client not initialized — check GROQ_API_KEY")
+            return
+        try:
+            stream = await groq_async_client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                max_tokens=1024,
+                timeout=timeout_sec,
+                stream=True,
+            )
+        except Exception as e:
+            self._slot.failed()
+            print("[groq] error:", e)
+            return
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        except Exception as e:
+            self._slot.failed()
+            print("[groq] stream error:", e)
+        finally:
+            await stream.close()
+
+    def __aiter__(self):
+        return self._deltas
+
+    async def aclose(self):
+        await self._deltas.aclose()
+        if self._slot:
+            self._slot.release()
+
+
+def user_priority(u: AuthUser) -> int:
+    return Priority.premium if getattr(u, "plan", "free") == "premium" else Priority.free
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def wants_stream(stream: bool, accept: str) -> bool:
+    """Clients opt into SSE with ?stream=true or an Accept: text/event-stream header."""
+    return stream or "text/event-stream" in (accept or "").lower()
+
+
+async def iter_once(text: str):
+    yield text
+
+
+def sse_reply(tokens, fallback: str, on_finish=None) -> StreamingResponse:
+    """
+    Relay LLM deltas as server-sent events:
+      event: token  data: {"delta": "..."}   (one per upstream chunk)
+      event: done   data: {"reply": "..."}   (full reply, same text ChatOut would carry)
+    tokens is an async iterator with aclose() (GroqStream, iter_once).
+    on_finish(reply, completed) runs exactly once, also when the client disconnects
+    mid-stream (completed=False, reply = partial output so far); it may be a coroutine.
+    """
+    async def events():
+        parts = []
+        completed = False
+        try:
+            async for delta in tokens:
+                parts.append(delta)
+                yield sse_event("token", {"delta": delta})
+            reply = "".join(parts).strip()
+            if not reply or reply in {".", "...", "…"}:
+                reply = fallback
+                yield sse_event("token", {"delta": reply})
+            completed = True
+            yield sse_event("done", {"reply": reply})
+        finally:
+            # a disconnect cancels this task; shield the cleanup so the turns still get saved
+            with anyio.CancelScope(shield=True):
+                await tokens.aclose()
+                if on_finish:
+                    result = on_finish(reply if completed else "".join(parts).strip(), completed)
+                    if inspect.isawaitable(result):
+                        await result
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 def utcnow() -> datetime:
     return datetime.utcnow()
 
+
+def catalog_response(entry, if_none_match: str) -> Response:
+    """A cached catalog body, or 304 when the client already has this ETag."""
+    headers = {"ETag": entry.etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
 # -------------------- Auth helpers --------------------
 
-def auth_user(authorization: str = Header(None), db: Session = Depends(get_db)) -> User:
+# Methods that may authenticate from a cached user record; anything else writes and
+# reads the user's plan / deleted flag as committed (the cache can lag other workers)
+CACHED_AUTH_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+async def auth_user(request: Request, authorization: str = Header(None),
+                    db: AsyncSession = Depends(get_async_db)) -> AuthUser:
+    """Signed-in user as a detached AuthUser. Verified tokens are cached, and so are
+    user records for reads (see auth_cache.py), so most GETs authenticate without a
+    DB query; write requests read the user row every time."""
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing bearer token")
     token = authorization.split(" ", 1)[1]
     try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        # TEMP logging to diagnose token issues
-        print("[auth] decode error:", repr(e))
+        user_id = token_user_id(token)
+    except InvalidToken:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
-    # PATCH: ensure we use int user_id after decoding (and accept str sub)
-    try:
-        user_id = int(payload["sub"])  # <-- normalize to int for DB lookup
-    except (KeyError, TypeError, ValueError) as e:
-        print("[auth] bad token sub:", e)
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    user = db.query(User).filter(User.id == user_id, User.deleted == False).first()
+    user = await db.run_sync(load_user, user_id, request.method not in CACHED_AUTH_METHODS)
+    # End the read now so the pooled connection isn't held while the request waits
+    # for a threadpool slot to run the endpoint (under a burst that wait can starve the pool)
+    await db.rollback()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
 
-def require_premium(u: User = Depends(auth_user)) -> User:
+async def require_premium(u: AuthUser = Depends(auth_user)) -> AuthUser:
     """Dependency: allow only premium users; returns HTTP 402 for upsell handling."""
     if getattr(u, "plan", "free") != "premium":
         raise HTTPException(status_code=402, detail="Premium required")
@@ -103,60 +303,113 @@ def require_premium(u: User = Depends(auth_user)) -> User:
 
 # -------------------- Routes: Auth --------------------
 
-@app.post("/auth/register")
-def register(body: RegisterIn, db: Session = Depends(get_db)):
-    exists = db.query(User).filter(User.email == body.email).first()
-    if exists:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    user = User(email=body.email, password_hash=hash_password(body.password))
+# Register/login are async so bcrypt runs in the hashing process pool without pinning
+# a threadpool thread; the short DB steps still run in the threadpool.
+
+def _email_taken(db: Session, email: str) -> bool:
+    return db.query(User.id).filter(User.email == email).first() is not None
+
+
+def _create_user(db: Session, email: str, password_hash: str) -> User:
+    user = User(email=email, password_hash=password_hash)
     db.add(user)
     db.commit()
     db.refresh(user)
+    return user
+
+
+def _find_login_user(db: Session, email: str):
+    return (
+        db.query(User.id, User.email, User.plan, User.password_hash)
+        .filter(User.email == email, User.deleted == False)
+        .first()
+    )
+
+
+def _rehash_password(db: Session, user_id: int, password_hash: str):
+    db.query(User).filter(User.id == user_id).update({"password_hash": password_hash}, synchronize_session=False)
+    db.commit()
+
+
+@app.post("/auth/register")
+async def register(body: RegisterIn, db: Session = Depends(get_db)):
+    if await run_in_threadpool(_email_taken, db, body.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    password_hash = await hash_password_async(body.password)
+    user = await run_in_threadpool(_create_user, db, body.email, password_hash)
     token = make_jwt(str(user.id), user.email)  # PATCH: cast sub to str
     return {"token": token, "user": {"id": user.id, "email": user.email, "plan": getattr(user, 'plan', 'free')}}
 
 
 @app.post("/auth/login")
-def login(body: LoginIn, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == body.email, User.deleted == False).first()
-    if not user or not verify_password(body.password, user.password_hash):
+async def login(body: LoginIn, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_find_login_user, db, body.email)
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    ok, new_hash = await verify_and_update_password_async(body.password, user.password_hash)
+    if not ok:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made: upgrade it transparently
+        await run_in_threadpool(_rehash_password, db, user.id, new_hash)
     token = make_jwt(str(user.id), user.email)  # PATCH: cast sub to str
-    return {"token": token, "user": {"id": user.id, "email": user.email, "plan": getattr(user, 'plan', 'free')}}
+    return {"token": token, "user": {"id": user.id, "email": user.email, "plan": user.plan or 'free'}}
 
 
 @app.get("/me")
-def me(u: User = Depends(auth_user)):
+def me(u: AuthUser = Depends(auth_user)):
     return {"id": u.id, "email": u.email, "plan": getattr(u, 'plan', 'free')}
 
 # -------------------- Routes: Billing / Upgrade (MVP) --------------------
 
 @app.post("/billing/upgrade")
-def billing_upgrade(body: dict, u: User = Depends(auth_user), db: Session = Depends(get_db)):
+def billing_upgrade(body: dict, u: AuthUser = Depends(auth_user), db: Session = Depends(get_db)):
     """MVP upgrade endpoint. Accepts {"code": "..."}. Any non-empty code upgrades the user.
     Replace later with a real payment flow/webhook."""
     code = (body or {}).get("code", "").strip()
     if not code:
         raise HTTPException(status_code=400, detail="Missing code")
-    u.plan = "premium"
-    db.add(u); db.commit(); db.refresh(u)
-    return {"ok": True, "plan": u.plan}
+    user = db.query(User).filter(User.id == u.id).first()
+    user.plan = "premium"
+    db.add(user); db.commit(); db.refresh(user)
+    invalidate_user(user.id)  # also done on commit by auth_cache; explicit for plan gating
+    return {"ok": True, "plan": user.plan}
 
 # -------------------- Chat prompt builder --------------------
 
-def build_messages(message: str, history=None) -> list:
+def turn_field(turn, name: str):
+    return turn[name] if isinstance(turn, dict) else getattr(turn, name)
+
+
+def knowledge_for(message: str, history=None) -> str:
+    """Context paragraphs relevant to this message (plus the previous user turn,
+    so short follow-ups like "tell me more" still match). Falls back to the whole
+    file when nothing matches, so the prompt never goes out without knowledge."""
+    if not CONTEXT_RETRIEVAL:
+        return MINDCARE_CONTEXT
+    query = message
+    for turn in reversed(history or []):
+        if str(turn_field(turn, "role")) == ChatRole.user:
+            query = f"{message} {turn_field(turn, 'content')}"
+            break
+    return "\n\n".join(context_index.top_chunks(query, CONTEXT_TOP_K)) or MINDCARE_CONTEXT
+
+
+def build_messages(message: str, history=None, summary: str = None) -> list:
     msgs = [{
         "role": "system",
         "content": (
             "You are MindCare+, an AI chatbot for mental health in Brunei. "
             "Use the following knowledge when answering. "
             "If the topic is unrelated, gently redirect to mental health support.\n\n"
-            f"Knowledge:\n{MINDCARE_CONTEXT}"
+            f"Knowledge:\n{knowledge_for(message, history)}"
         ),
     }]
+    if summary:
+        msgs.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
     for turn in (history or []):
-        role = turn["role"] if isinstance(turn, dict) else turn.role
-        content = turn["content"] if isinstance(turn, dict) else turn.content
+        role = turn_field(turn, "role")
+        content = turn_field(turn, "content")
         role_str = role.value if hasattr(role, "value") else str(role)
         msgs.append({"role": role_str, "content": content})
     msgs.append({"role": "user", "content": message})
@@ -164,18 +417,39 @@ def build_messages(message: str, history=None) -> list:
 
 # -------------------- Routes: Public Chat (stateless demo) --------------------
 
+CHAT_FALLBACK = "I couldn’t generate a reply right now. Please try again shortly."
+
+
 @app.post("/chat", response_model=ChatOut)
-def chat(body: ChatIn, db: Session = Depends(get_db)):
-    messages = build_messages(body.message, body.history)
-    reply = call_groq(messages)
+async def chat(body: ChatIn, stream: bool = False, accept: str = Header(None)):
+    # FAQ-style questions without history may be answered from the near-duplicate cache
+    use_cache = ANSWER_CACHE_ENABLED and not body.history and answer_cache.cacheable(body.message)
+    cached = answer_cache.get(body.message) if use_cache else None
+
+    def remember(reply: str, completed: bool):
+        if use_cache and completed and reply and reply != CHAT_FALLBACK:
+            answer_cache.put(body.message, reply)
+
+    if wants_stream(stream, accept):
+        if cached:
+            return sse_reply(iter_once(cached), fallback=cached)
+        return sse_reply(
+            await GroqStream.open(build_messages(body.message, body.history), Priority.anonymous),
+            fallback=CHAT_FALLBACK,
+            on_finish=remember,
+        )
+    if cached:
+        return {"reply": cached}
+    reply = await call_groq_async(build_messages(body.message, body.history), priority=Priority.anonymous)
     if not reply or reply.strip() in {".", "...", "…"}:
-        reply = "I couldn’t generate a reply right now. Please try again shortly."
+        reply = CHAT_FALLBACK
+    remember(reply, True)
     return {"reply": reply}
 
 # -------------------- Routes: Chat Sessions (multi-session, persisted) --------------------
 
 @app.post("/chat/sessions")
-def create_session(body: dict, u: User = Depends(auth_user), db: Session = Depends(get_db)):
+def create_session(body: dict, u: AuthUser = Depends(auth_user), db: Session = Depends(get_db)):
     """
     Create a new chat session. Optionally link to a check-in by id.
     Freemium rule: free users can have 1 session max; premium users unlimited (for now).
@@ -209,33 +483,48 @@ def create_session(body: dict, u: User = Depends(auth_user), db: Session = Depen
         mood_at_start=mood_at_start,
         stress_at_start=stress_at_start,
     )
-    db.add(sess); db.commit(); db.refresh(sess)
+    db.add(sess); db.flush()
+    bump_counters(db, u.id, sessions=1)
+    db.commit(); db.refresh(sess)
     return {"id": sess.id, "title": sess.title, "checkin_id": sess.checkin_id}
 
 
+# List routes select just the columns they return: plain rows, no identity map
+# or per-instance state, and nothing unused (chat_sessions.summary) comes over
+SESSION_LIST_COLUMNS = (ChatSession.id, ChatSession.title, ChatSession.created_at,
+                        ChatSession.checkin_id, ChatSession.mood_at_start, ChatSession.stress_at_start)
+MESSAGE_LIST_COLUMNS = (ChatMessage.role, ChatMessage.content, ChatMessage.created_at, ChatMessage.id)
+CHECKIN_LIST_COLUMNS = (AICheckIn.id, AICheckIn.mood, AICheckIn.stress_level, AICheckIn.notes, AICheckIn.created_at)
+
+
+def _session_page(db: Session, user_id: int, limit, cursor):
+    """(items, next_cursor). The unpaged list is streamed in LIST_YIELD_PER batches."""
+    q = db.query(*SESSION_LIST_COLUMNS).filter(ChatSession.user_id == user_id)
+    if limit is None and cursor is None:
+        q = q.order_by(ChatSession.created_at.desc(), ChatSession.id.desc()).yield_per(LIST_YIELD_PER)
+        return [r._asdict() for r in q], None
+    rows, next_cursor = keyset_page(q, ChatSession.created_at, ChatSession.id, cursor, page_size(limit))
+    return [r._asdict() for r in rows], next_cursor
+
+
 @app.get("/chat/sessions")
-def list_sessions(u: User = Depends(auth_user), db: Session = Depends(get_db)):
-    rows = (
-        db.query(ChatSession)
-        .filter(ChatSession.user_id == u.id)
-        .order_by(ChatSession.created_at.desc())
-        .all()
-    )
-    return [
-        {
-            "id": r.id,
-            "title": r.title,
-            "created_at": r.created_at.isoformat(),
-            "checkin_id": r.checkin_id,
-            "mood_at_start": r.mood_at_start,
-            "stress_at_start": r.stress_at_start,
-        }
-        for r in rows
-    ]
+async def list_sessions(
+    response: Response,
+    limit: int = None,
+    cursor: str = None,
+    u: AuthUser = Depends(auth_user),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Newest first. Pass limit and/or cursor to page (next page cursor in X-Next-Cursor);
+    without either the full list is returned, as before."""
+    items, next_cursor = await db.run_sync(_session_page, u.id, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return json_body(items, response)
 
 
 @app.patch("/chat/sessions/{sid}")
-def rename_session(sid: int, body: dict, u: User = Depends(auth_user), db: Session = Depends(get_db)):
+def rename_session(sid: int, body: dict, u: AuthUser = Depends(auth_user), db: Session = Depends(get_db)):
     sess = db.query(ChatSession).filter(ChatSession.id == sid, ChatSession.user_id == u.id).first()
     if not sess:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -247,62 +536,137 @@ def rename_session(sid: int, body: dict, u: User = Depends(auth_user), db: Sessi
 
 
 @app.delete("/chat/sessions/{sid}")
-def delete_session(sid: int, u: User = Depends(auth_user), db: Session = Depends(get_db)):
+def delete_session(sid: int, u: AuthUser = Depends(auth_user), db: Session = Depends(get_db)):
     sess = db.query(ChatSession).filter(ChatSession.id == sid, ChatSession.user_id == u.id).first()
     if not sess:
         raise HTTPException(status_code=404, detail="Session not found")
     # delete messages for this session (also covered by cascade if configured)
-    db.query(ChatMessage).filter(ChatMessage.session_id == sess.id).delete()
-    db.delete(sess); db.commit()
+    removed = db.query(ChatMessage).filter(ChatMessage.session_id == sess.id).delete()
+    db.delete(sess); db.flush()
+    bump_counters(db, u.id, sessions=-1, messages=-removed)
+    db.commit()
+    history_cache.invalidate(sid)
     return {"ok": True}
 
 
+def _find_session(db: Session, sid: int, user_id: int):
+    return db.query(ChatSession).filter(ChatSession.id == sid, ChatSession.user_id == user_id).first()
+
+
+def _message_item(m) -> dict:
+    return {"role": m.role, "content": m.content, "created_at": m.created_at}
+
+
+def _message_page(db: Session, sid: int, user_id: int, limit, cursor):
+    """(items, next_cursor), oldest first. The unpaged list is streamed in LIST_YIELD_PER batches."""
+    if not _find_session(db, sid, user_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    q = db.query(*MESSAGE_LIST_COLUMNS).filter(ChatMessage.session_id == sid)
+    if limit is None and cursor is None:
+        q = q.order_by(ChatMessage.created_at.asc(), ChatMessage.id.asc()).yield_per(LIST_YIELD_PER)
+        return [_message_item(m) for m in q], None
+    msgs, next_cursor = keyset_page(q, ChatMessage.created_at, ChatMessage.id, cursor, page_size(limit))
+    msgs.reverse()
+    return [_message_item(m) for m in msgs], next_cursor
+
+
 @app.get("/chat/sessions/{sid}/messages")
-def list_messages(sid: int, u: User = Depends(auth_user), db: Session = Depends(get_db)):
-    sess = db.query(ChatSession).filter(ChatSession.id == sid, ChatSession.user_id == u.id).first()
+async def list_messages(
+    sid: int,
+    response: Response,
+    limit: int = None,
+    cursor: str = None,
+    u: AuthUser = Depends(auth_user),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Messages oldest first. With limit and/or cursor, returns the latest page and
+    X-Next-Cursor points at the page of older messages before it (scrolling back);
+    without either the whole session is returned, as before."""
+    items, next_cursor = await db.run_sync(_message_page, sid, u.id, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return json_body(items, response)
+
+
+def summarize(messages: list) -> str:
+    """Summary folding is background work: lowest priority, never worth a 503."""
+    try:
+        return call_groq(messages, priority=Priority.background)
+    except SchedulerBusy:
+        return ""
+
+
+def _save_turns(db: Session, sid: int, user_id: int, message: str, reply: str):
+    """Store a user turn and (if any) the assistant reply. The session row is read
+    again here: the one the prompt was built from belonged to a session closed
+    before the LLM call."""
+    sess = db.query(ChatSession).filter(ChatSession.id == sid).first()
     if not sess:
-        raise HTTPException(status_code=404, detail="Session not found")
-    msgs = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.session_id == sid)
-        .order_by(ChatMessage.created_at.asc())
-        .all()
-    )
-    return [
-        {"role": m.role, "content": m.content, "created_at": m.created_at.isoformat()}
-        for m in msgs
-    ]
+        return
+    turns = [ChatMessage(user_id=user_id, session_id=sid, role=ChatRole.user, content=message)]
+    if reply:
+        turns.append(ChatMessage(user_id=user_id, session_id=sid, role=ChatRole.assistant, content=reply))
+    record_turns(db, sess, turns)
 
 
-@app.post("/chat/sessions/{sid}/send", response_model=ChatOut)
-def send_in_session(sid: int, body: ChatIn, u: User = Depends(auth_user), db: Session = Depends(get_db)):
-    sess = db.query(ChatSession).filter(ChatSession.id == sid, ChatSession.user_id == u.id).first()
+async def persist_turns(sid: int, user_id: int, message: str, reply: str):
+    """_save_turns() on a fresh DB session. Used by streaming responses, which
+    outlive the request-scoped session."""
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.run_sync(_save_turns, sid, user_id, message, reply)
+        except Exception as e:
+            print("[chat] failed to persist streamed turns:", e)
+            await db.rollback()
+
+
+def _prompt_for(db: Session, sid: int, user_id: int, message: str):
+    sess = _find_session(db, sid, user_id)
     if not sess:
         raise HTTPException(status_code=404, detail="Session not found")
+    # Recent turns within the token budget + rolling summary of everything older
+    window, fold_before_id = load_window(db, sess, message)
+    history = [{"role": m.role, "content": m.content} for m in window]
+    return build_messages(message, history, summary=sess.summary), fold_before_id
 
-    # Build history from DB
-    prev_msgs = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.session_id == sid)
-        .order_by(ChatMessage.created_at.asc())
-        .all()
-    )
-    history = [{"role": m.role, "content": m.content} for m in prev_msgs]
 
-    messages = build_messages(body.message, history)
-    reply = call_groq(messages) or "I couldn’t generate a reply right now."
+@app.post("/chat/sessions/{sid}/send", response_model=ChatOut)
+async def send_in_session(
+    sid: int,
+    body: ChatIn,
+    background_tasks: BackgroundTasks,
+    stream: bool = False,
+    accept: str = Header(None),
+    u: AuthUser = Depends(auth_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    messages, fold_before_id = await db.run_sync(_prompt_for, sid, u.id, body.message)
+    if fold_before_id:
+        # Turns fell out of the window: extend the summary after the reply is sent
+        background_tasks.add_task(fold_summary, sid, fold_before_id, summarize)
+    # Give the pooled connection back for the seconds the LLM takes; the reply is
+    # stored on a connection taken again afterwards
+    await db.close()
+
+    if wants_stream(stream, accept):
+        user_id = u.id
+        # Persist once the stream ends; partial output is kept if the client goes away.
+        return sse_reply(
+            await GroqStream.open(messages, user_priority(u)),
+            fallback="I couldn’t generate a reply right now.",
+            on_finish=lambda reply, completed: persist_turns(sid, user_id, body.message, reply),
+        )
+
+    reply = await call_groq_async(messages, priority=user_priority(u)) or "I couldn’t generate a reply right now."
 
     # Persist both turns
-    db.add(ChatMessage(user_id=u.id, session_id=sid, role=ChatRole.user, content=body.message))
-    db.add(ChatMessage(user_id=u.id, session_id=sid, role=ChatRole.assistant, content=reply))
-    db.commit()
+    await db.run_sync(_save_turns, sid, u.id, body.message, reply)
 
     return {"reply": reply}
 
 # -------------------- Routes: Therapist Booking --------------------
 
-@app.get("/counselors")
-def counselors_list(db: Session = Depends(get_db)):
+def _counselor_catalog(db: Session) -> list:
     rows = db.query(Counselor).filter(Counselor.is_active == True).order_by(Counselor.created_at.desc()).all()
     return [
         {
@@ -317,24 +681,30 @@ def counselors_list(db: Session = Depends(get_db)):
     ]
 
 
+catalog_cache.register("counselors", _counselor_catalog)
+
+
+@app.get("/counselors")
+async def counselors_list(if_none_match: str = Header(None)):
+    """Served from the versioned catalog cache (catalog_cache.py); ETag + 304 support."""
+    entry = catalog_cache.fresh("counselors") or await run_in_threadpool(catalog_cache.get, "counselors")
+    return catalog_response(entry, if_none_match)
+
+
+def _counselor_open_slots(db: Session, cid: int, start: datetime, end: datetime):
+    c = db.query(Counselor.id).filter(Counselor.id == cid, Counselor.is_active == True).first()
+    if not c:
+        raise HTTPException(404, "Counselor not found")
+    # concrete rows plus occurrences of the counselor's recurring rules
+    return open_slots(db, cid, start, end)
+
+
 @app.get("/counselors/{cid}/slots")
-def counselor_slots(cid: int, days: int = 14, db: Session = Depends(get_db)):
+async def counselor_slots(cid: int, days: int = 14, db: AsyncSession = Depends(get_async_read_db)):
     if days < 1 or days > 60:
         days = 14
     now = utcnow()
-    end = now + timedelta(days=days)
-    c = db.query(Counselor).filter(Counselor.id == cid, Counselor.is_active == True).first()
-    if not c:
-        raise HTTPException(404, "Counselor not found")
-    slots = (
-        db.query(AvailabilitySlot)
-        .filter(AvailabilitySlot.counselor_id == cid,
-                AvailabilitySlot.start_time >= now,
-                AvailabilitySlot.start_time <= end,
-                AvailabilitySlot.is_booked == False)
-        .order_by(AvailabilitySlot.start_time.asc())
-        .all()
-    )
+    slots = await db.run_sync(_counselor_open_slots, cid, now, now + timedelta(days=days))
     return [
         {
             "id": s.id,
@@ -345,19 +715,63 @@ def counselor_slots(cid: int, days: int = 14, db: Session = Depends(get_db)):
     ]
 
 
-@app.post("/bookings")
-def create_booking(body: dict, u: User = Depends(require_premium), db: Session = Depends(get_db)):
-    """Create a booking for a counselor slot. Premium required (freemium gating)."""
-    counselor_id = (body or {}).get("counselor_id")
-    slot_id = (body or {}).get("slot_id")
-    if not counselor_id or not slot_id:
-        raise HTTPException(400, "Missing counselor_id or slot_id")
+@app.get("/slots/search")
+def search_slots(
+    start: datetime = None,
+    end: datetime = None,
+    specialty: str = None,
+    min_price: int = None,
+    max_price: int = None,
+    min_minutes: int = None,
+    limit: int = None,
+):
+    """Free slots across all counselors, earliest first, starting in [start, end)
+    (naive UTC; default now .. +14 days). Filters: specialty, price_cents range,
+    minimum slot length in minutes. Served from the in-memory slot index."""
+    start = _naive_utc(start) if start else utcnow()
+    end = _naive_utc(end) if end else start + timedelta(days=14)
+    if end <= start:
+        raise HTTPException(400, "end must be after start")
+    end = min(end, utcnow() + timedelta(days=SLOT_INDEX_HORIZON_DAYS))
+    hits = slot_index.search(
+        start, end,
+        specialty=normalize_specialty(specialty) if specialty else None,
+        min_price=min_price,
+        max_price=max_price,
+        min_minutes=min_minutes,
+        limit=page_size(limit),
+    )
+    return [
+        {
+            "id": slot_id,
+            "start_time": slot_start.isoformat(),
+            "end_time": slot_end.isoformat(),
+            "counselor": {
+                "id": c.id,
+                "full_name": c.full_name,
+                "specialties": list(c.specialties),
+                "price_cents": c.price_cents,
+                "currency": c.currency,
+            },
+        }
+        for slot_id, slot_start, slot_end, c in hits
+    ]
 
+
+def _naive_utc(dt: datetime) -> datetime:
+    """Query datetimes may carry an offset; the database stores naive UTC."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _book_slot(db: Session, user_id: int, counselor_id, slot_id) -> dict:
     c = db.query(Counselor).filter(Counselor.id == counselor_id, Counselor.is_active == True).first()
     if not c:
         raise HTTPException(404, "Counselor not found")
 
-    s = db.query(AvailabilitySlot).filter(AvailabilitySlot.id == slot_id, AvailabilitySlot.counselor_id == counselor_id).first()
+    # a row id, or a rule occurrence's id (its row is inserted here, then claimed below)
+    s = resolve_slot(db, c.id, slot_id)
     if not s:
         raise HTTPException(404, "Slot not found")
     if s.is_booked:
@@ -365,11 +779,30 @@ def create_booking(body: dict, u: User = Depends(require_premium), db: Session =
     if s.start_time <= utcnow():
         raise HTTPException(400, "Slot is in the past")
 
-    # mark booked and create booking (confirm immediately for MVP)
-    s.is_booked = True
-    bk = Booking(user_id=u.id, counselor_id=c.id, slot_id=s.id, status=BookingStatus.confirmed)
+    # Claim the slot with one conditional UPDATE: of any number of concurrent requests
+    # exactly one sees rowcount == 1; the rest get a clean 409 without waiting or retrying.
+    claimed = db.execute(
+        update(AvailabilitySlot)
+        .where(AvailabilitySlot.id == s.id,
+               AvailabilitySlot.is_booked == False,
+               AvailabilitySlot.start_time > utcnow())
+        .values(is_booked=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        raise HTTPException(409, "Slot already booked")
 
-    db.add(s); db.add(bk); db.commit(); db.refresh(bk)
+    # confirm immediately for MVP
+    bk = Booking(user_id=user_id, counselor_id=c.id, slot_id=s.id, status=BookingStatus.confirmed)
+    db.add(bk)
+    try:
+        db.commit()
+    except IntegrityError:
+        # a stale booking row still holds this slot_id (unique); the claim rolls back with it
+        db.rollback()
+        raise HTTPException(409, "Slot already booked")
+    slot_index.discard(c.id, s.start_time)
     return {
         "id": bk.id,
         "status": bk.status,
@@ -378,32 +811,57 @@ def create_booking(body: dict, u: User = Depends(require_premium), db: Session =
     }
 
 
-@app.get("/bookings/my")
-def my_bookings(u: User = Depends(auth_user), db: Session = Depends(get_db)):
-    rows = (
+@app.post("/bookings")
+async def create_booking(body: dict, u: AuthUser = Depends(require_premium), db: AsyncSession = Depends(get_async_db)):
+    """Create a booking for a counselor slot. Premium required (freemium gating)."""
+    counselor_id = (body or {}).get("counselor_id")
+    slot_id = (body or {}).get("slot_id")
+    if not counselor_id or not slot_id:
+        raise HTTPException(400, "Missing counselor_id or slot_id")
+    return await db.run_sync(_book_slot, u.id, counselor_id, slot_id)
+
+
+def _booking_page(db: Session, user_id: int, limit, cursor):
+    q = (
         db.query(Booking)
-        .filter(Booking.user_id == u.id)
-        .order_by(Booking.created_at.desc())
-        .all()
+        .options(joinedload(Booking.counselor), joinedload(Booking.slot))  # one query, not 1 + 2 per booking
+        .filter(Booking.user_id == user_id)
     )
+    if limit is None and cursor is None:
+        return q.order_by(Booking.created_at.desc(), Booking.id.desc()).all(), None
+    return keyset_page(q, Booking.created_at, Booking.id, cursor, page_size(limit))
+
+
+@app.get("/bookings/my")
+async def my_bookings(
+    response: Response,
+    limit: int = None,
+    cursor: str = None,
+    u: AuthUser = Depends(auth_user),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Newest first. Pass limit and/or cursor to page (next page cursor in X-Next-Cursor);
+    without either the full list is returned, as before."""
+    rows, next_cursor = await db.run_sync(_booking_page, u.id, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     out = []
     for b in rows:
-        # join counselor & slot (SQLAlchemy relationships available)
         c = b.counselor
         s = b.slot
         out.append({
             "id": b.id,
             "status": b.status,
-            "created_at": b.created_at.isoformat(),
+            "created_at": b.created_at,
             "counselor": {"id": c.id, "full_name": c.full_name},
-            "slot": {"id": s.id, "start_time": s.start_time.isoformat(), "end_time": s.end_time.isoformat()},
+            "slot": {"id": s.id, "start_time": s.start_time, "end_time": s.end_time},
         })
-    return out
+    return json_body(out, response)
 
 # -------------------- Routes: Check-ins --------------------
 
 @app.post("/checkin")
-def create_checkin(body: CheckInIn, u: User = Depends(auth_user), db: Session = Depends(get_db)):
+def create_checkin(body: CheckInIn, u: AuthUser = Depends(auth_user), db: Session = Depends(get_db)):
     if body.stress_level < 0 or body.stress_level > 10:
         raise HTTPException(status_code=400, detail="stress_level must be 0–10")
     ci = AICheckIn(
@@ -413,69 +871,183 @@ def create_checkin(body: CheckInIn, u: User = Depends(auth_user), db: Session =
         notes=body.notes or "",
     )
     db.add(ci)
+    db.flush()
+    apply_checkin(db, ci)  # daily rollup, same transaction
     db.commit()
-    db.refresh(ci)
     return {"ok": True, "id": ci.id}
 
 
-@app.get("/checkins")
-def list_checkins(limit: int = 7, u: User = Depends(auth_user), db: Session = Depends(get_db)):
-    q = (
-        db.query(AICheckIn)
-        .filter(AICheckIn.user_id == u.id, AICheckIn.deleted == False)
-        .order_by(AICheckIn.created_at.desc())
-        .limit(max(1, min(limit, 50)))
+# POST /checkins/batch: queued offline check-ins, uploaded when the device is back online
+CHECKIN_BATCH_MAX = int(os.getenv("CHECKIN_BATCH_MAX", "500"))
+CHECKIN_BATCH_MAX_AGE_DAYS = int(os.getenv("CHECKIN_BATCH_MAX_AGE_DAYS", "30"))
+CHECKIN_CLOCK_SKEW = timedelta(minutes=5)  # device clocks run a little ahead
+
+
+def _batch_item_error(item, now: datetime):
+    """Why a queued check-in can't be stored, or None."""
+    if not 0 < len(item.client_id) <= 64:
+        return "client_id must be 1–64 characters"
+    if not item.mood.strip() or len(item.mood) > 100:
+        return "mood must be 1–100 characters"
+    if item.stress_level < 0 or item.stress_level > 10:
+        return "stress_level must be 0–10"
+    if item.created_at is not None:
+        at = _naive_utc(item.created_at)
+        if at > now + CHECKIN_CLOCK_SKEW:
+            return "created_at is in the future"
+        if at < now - timedelta(days=CHECKIN_BATCH_MAX_AGE_DAYS):
+            return f"created_at is more than {CHECKIN_BATCH_MAX_AGE_DAYS} days old"
+    return None
+
+
+def _checkins_by_client_id(db: Session, user_id: int, client_ids: list) -> list:
+    return (
+        db.query(AICheckIn.id, AICheckIn.client_id, AICheckIn.created_at, AICheckIn.mood, AICheckIn.stress_level)
+        .filter(AICheckIn.user_id == user_id, AICheckIn.client_id.in_(client_ids))
+        .all()
     )
-    return [
-        {
-            "id": r.id,
-            "mood": r.mood,
-            "stress_level": r.stress_level,
-            "notes": r.notes,
-            "created_at": r.created_at.isoformat(),
-        }
-        for r in q
-    ]
+
+
+def _insert_checkin_batch(db: Session, user_id: int, items: list, now: datetime) -> dict:
+    """Store the items not stored yet with one multi-row INSERT, roll them into the
+    analytics and commit. {client_id: ("created" | "duplicate", id)}"""
+    stored = {r.client_id: r.id for r in _checkins_by_client_id(db, user_id, [it.client_id for it in items])}
+    results = {cid: ("duplicate", ci_id) for cid, ci_id in stored.items()}
+    new = [it for it in items if it.client_id not in stored]
+    if not new:
+        return results
+    db.execute(insert(AICheckIn).values([
+        {"user_id": user_id, "client_id": it.client_id, "mood": it.mood, "stress_level": it.stress_level,
+         "notes": it.notes or "", "deleted": False,
+         "created_at": _naive_utc(it.created_at) if it.created_at else now}
+        for it in new
+    ]))
+    rows = _checkins_by_client_id(db, user_id, [it.client_id for it in new])
+    apply_checkins(db, user_id, rows)
+    db.commit()
+    results.update((r.client_id, ("created", r.id)) for r in rows)
+    return results
+
+
+@app.post("/checkins/batch")
+def sync_checkins(body: CheckInBatchIn, u: AuthUser = Depends(auth_user), db: Session = Depends(get_db)):
+    """Upload check-ins queued on the device, in one transaction. Each carries a
+    client-generated client_id; uploading one again (a retried sync) doesn't store
+    it twice. Results come back in request order, one per item:
+      - created:   stored now, with its id
+      - duplicate: stored before (or earlier in this batch), with that id
+      - invalid:   not stored, with the error; the rest of the batch still is
+    """
+    if len(body.checkins) > CHECKIN_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {CHECKIN_BATCH_MAX} check-ins per batch")
+    now = utcnow()
+    errors, valid = {}, {}
+    for i, item in enumerate(body.checkins):
+        error = _batch_item_error(item, now)
+        if error:
+            errors[i] = error
+        else:
+            valid.setdefault(item.client_id, item)  # first of any repeats in the batch
+
+    stored = {}
+    if valid:
+        try:
+            stored = _insert_checkin_batch(db, u.id, list(valid.values()), now)
+        except IntegrityError:
+            # a concurrent upload of the same queue stored some of them first
+            db.rollback()
+            stored = _insert_checkin_batch(db, u.id, list(valid.values()), now)
+
+    results = []
+    for i, item in enumerate(body.checkins):
+        if i in errors:
+            results.append({"client_id": item.client_id, "status": "invalid", "error": errors[i]})
+            continue
+        status, ci_id = stored[item.client_id]
+        if valid[item.client_id] is not item:
+            status = "duplicate"
+        results.append({"client_id": item.client_id, "status": status, "id": ci_id})
+    return {"results": results}
+
+
+@app.delete("/checkins/{cid}")
+def delete_checkin(cid: int, u: AuthUser = Depends(auth_user), db: Session = Depends(get_db)):
+    """Soft-delete a check-in (it stays in ai_checkins with deleted=true)."""
+    ci = db.query(AICheckIn).filter(
+        AICheckIn.id == cid, AICheckIn.user_id == u.id, AICheckIn.deleted == False
+    ).first()
+    if not ci:
+        raise HTTPException(status_code=404, detail="Check-in not found")
+    ci.deleted = True
+    db.flush()
+    apply_checkin(db, ci, sign=-1)
+    db.commit()
+    return {"ok": True}
+
+
+# /checkins pages stay within the cap the route had before it was paginated
+CHECKIN_PAGE_MAX = 50
+
+
+def _checkin_page(db: Session, user_id: int, limit, cursor):
+    q = db.query(*CHECKIN_LIST_COLUMNS).filter(AICheckIn.user_id == user_id, AICheckIn.deleted == False)
+    rows, next_cursor = keyset_page(q, AICheckIn.created_at, AICheckIn.id, cursor,
+                                    page_size(limit, maximum=CHECKIN_PAGE_MAX))
+    return [r._asdict() for r in rows], next_cursor
+
+
+@app.get("/checkins")
+async def list_checkins(
+    response: Response,
+    limit: int = 7,
+    cursor: str = None,
+    u: AuthUser = Depends(auth_user),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Newest first, `limit` (at most 50) per page; pass X-Next-Cursor back as `cursor` for older ones."""
+    items, next_cursor = await db.run_sync(_checkin_page, u.id, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return json_body(items, response)
 
 # -------------------- Routes: Analytics (basic reporting) --------------------
 
 @app.get("/analytics/overview")
-def analytics_overview(u: User = Depends(auth_user), db: Session = Depends(get_db)):
+async def analytics_overview(
+    u: AuthUser = Depends(auth_user),
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_async_read_db),
+):
     """High‑level usage stats for the signed‑in user.
-    Returns counts for sessions, messages, and check‑ins plus last check‑in snapshot."""
-    sessions_count = db.query(ChatSession).filter(ChatSession.user_id == u.id).count()
-    messages_count = db.query(ChatMessage).filter(ChatMessage.user_id == u.id).count()
-    checkins_count = db.query(AICheckIn).filter(AICheckIn.user_id == u.id, AICheckIn.deleted == False).count()
-
-    last_ci = (
-        db.query(AICheckIn)
-        .filter(AICheckIn.user_id == u.id, AICheckIn.deleted == False)
-        .order_by(AICheckIn.created_at.desc())
-        .first()
-    )
+    Returns counts for sessions, messages, and check‑ins plus last check‑in snapshot.
+    Served from the user_counters row the write routes keep up to date."""
+    # the row is built on first use, which has to happen on the primary
+    c = await read_db.get(UserCounters, u.id) or await db.run_sync(read_user_counters, u.id)
     last = None
-    if last_ci:
+    if c.last_checkin_id:
         last = {
-            "id": last_ci.id,
-            "mood": last_ci.mood,
-            "stress_level": last_ci.stress_level,
-            "created_at": last_ci.created_at.isoformat(),
+            "id": c.last_checkin_id,
+            "mood": c.last_checkin_mood,
+            "stress_level": c.last_checkin_stress,
+            "created_at": c.last_checkin_at.isoformat(),
         }
     return {
-        "sessions_count": sessions_count,
-        "messages_count": messages_count,
-        "checkins_count": checkins_count,
+        "sessions_count": c.sessions_count,
+        "messages_count": c.messages_count,
+        "checkins_count": c.checkins_count,
         "last_checkin": last,
     }
 
 
 @app.get("/analytics/checkins")
-def analytics_checkins(days: int = 30, u: User = Depends(auth_user), db: Session = Depends(get_db)):
+async def analytics_checkins(days: int = 30, u: AuthUser = Depends(auth_user), db: AsyncSession = Depends(get_async_read_db)):
     """Return simple trends for check‑ins over the last N days.
     Output:
       - buckets: list of { date: YYYY-MM-DD, count, avg_stress }
       - moods: histogram of mood counts in range
       - range: { start, end }
+    Buckets are whole UTC days read from the checkin_daily rollup, so the first
+    bucket covers that entire day rather than starting at range.start.
     """
     if days < 1:
         days = 1
@@ -485,54 +1057,83 @@ def analytics_checkins(days: int = 30, u: User = Depends(auth_user), db: Session
     end_dt = utcnow()
     start_dt = end_dt - timedelta(days=days)
 
-    rows = (
-        db.query(AICheckIn)
-        .filter(
-            AICheckIn.user_id == u.id,
-            AICheckIn.deleted == False,
-            AICheckIn.created_at >= start_dt,
-            AICheckIn.created_at <= end_dt,
-        )
-        .order_by(AICheckIn.created_at.asc())
-        .all()
-    )
+    # Pre-aggregated per-day rows (whole UTC days) maintained by create_checkin/delete_checkin
+    rows = await db.run_sync(read_checkin_daily, u.id, start_dt.date(), end_dt.date())
 
-    # Bucket by date (YYYY-MM-DD)
     buckets = {}
     mood_hist = {}
     for r in rows:
-        day = r.created_at.date().isoformat()
-        b = buckets.setdefault(day, {"date": day, "count": 0, "sum_stress": 0})
-        b["count"] += 1
-        try:
-            b["sum_stress"] += int(r.stress_level or 0)
-        except Exception:
-            pass
-        if r.mood:
-            mood_hist[r.mood] = mood_hist.get(r.mood, 0) + 1
+        buckets[r.day.isoformat()] = r
+        for mood, n in json.loads(r.mood_counts or "{}").items():
+            mood_hist[mood] = mood_hist.get(mood, 0) + n
 
     # Finalize averages and make a dense list for the full range
     out = []
     for i in range(days + 1):
         d = (start_dt.date() + timedelta(days=i)).isoformat()
-        if d in buckets:
-            b = buckets[d]
-            avg = (b["sum_stress"] / b["count"]) if b["count"] else 0
-            out.append({"date": d, "count": b["count"], "avg_stress": round(avg, 2)})
+        b = buckets.get(d)
+        if b and b.count:
+            out.append({"date": d, "count": b.count, "avg_stress": round(b.stress_sum / b.count, 2)})
         else:
             out.append({"date": d, "count": 0, "avg_stress": None})
 
-    return {
-        "range": {"start": start_dt.isoformat(), "end": end_dt.isoformat()},
+    return json_body({
+        "range": {"start": start_dt, "end": end_dt},
         "buckets": out,
         "moods": mood_hist,
-    }
+    })
+
+
+# -------------------- Routes: Export --------------------
+
+def export_response(user_id: int, since, until, fmt: str, session_id: int = None) -> StreamingResponse:
+    """Stream an export (see export.py) as an NDJSON download, gzip-compressed for ndjson.gz."""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(400, f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    since = _naive_utc(since) if since else None
+    until = _naive_utc(until) if until else utcnow()
+    if since is not None and until <= since:
+        raise HTTPException(400, "until must be after since")
+    media_type, ext = EXPORT_FORMATS[fmt]
+    name = f"mindcare-{user_id}" + (f"-session-{session_id}" if session_id else "") + f"-{until:%Y%m%dT%H%M%S}{ext}"
+    return StreamingResponse(
+        chunked(export_lines(user_id, since, until, session_id), compress=fmt == "ndjson.gz"),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}"', "Cache-Control": "no-store"},
+    )
 
 
+@app.get("/me/export")
+async def export_account(
+    since: datetime = None,
+    until: datetime = None,
+    fmt: str = Query("ndjson", alias="format"),
+    u: AuthUser = Depends(auth_user),
+):
+    """The signed-in user's sessions, messages, check-ins and bookings created in
+    [since, until), streamed as NDJSON (format=ndjson.gz for gzip). The first line
+    echoes until: pass it back as since for the next, incremental export."""
+    return export_response(u.id, since, until, fmt)
+
+
+@app.get("/chat/sessions/{sid}/export")
+async def export_session(
+    sid: int,
+    since: datetime = None,
+    until: datetime = None,
+    fmt: str = Query("ndjson", alias="format"),
+    u: AuthUser = Depends(auth_user),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """One session and its messages created in [since, until), as for /me/export."""
+    if not await db.run_sync(_find_session, sid, u.id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    await db.close()  # the stream reads on a session of its own
+    return export_response(u.id, since, until, fmt, session_id=sid)
+
 # -------------------- Routes: Resources & Health --------------------
 
-@app.get("/resources")
-def resources(db: Session = Depends(get_db)):
+def _resource_catalog(db: Session) -> list:
     rows = (
         db.query(Resource)
         .filter(Resource.deleted == False)
@@ -542,6 +1143,61 @@ def resources(db: Session = Depends(get_db)):
     return [{"title": r.title, "desc": r.desc, "url": r.url} for r in rows]
 
 
+catalog_cache.register("resources", _resource_catalog)
+
+
+@app.get("/resources")
+async def resources(if_none_match: str = Header(None)):
+    """Served from the versioned catalog cache (catalog_cache.py); ETag + 304 support."""
+    entry = catalog_cache.fresh("resources") or await run_in_threadpool(catalog_cache.get, "resources")
+    return catalog_response(entry, if_none_match)
+
+
 @app.get("/healthz")
 def healthz():
     return {"ok": True}
+
+
+# -------------------- Routes: Debug (opt-in) --------------------
+# Per-worker internals (SQL statement shapes, route timings, cache and scheduler
+# state). Only mounted with DEBUG_ROUTES=1 and a DEBUG_TOKEN, and then only
+# answered for requests that send that token as X-Debug-Token.
+
+DEBUG_ROUTES = os.getenv("DEBUG_ROUTES", "0") == "1"
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+
+
+def require_debug_token(x_debug_token: str = Header(None)):
+    if not x_debug_token or not hmac.compare_digest(x_debug_token.encode(), DEBUG_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Debug token required")
+
+
+debug_router = APIRouter(prefix="/debug", dependencies=[Depends(require_debug_token)])
+
+
+@debug_router.get("/stats")
+def debug_stats():
+    """In-process cache counters (per worker); no user data."""
+    return {
+        "auth_cache": auth_cache_stats(),
+        "history_cache": history_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "sql_profiler": sql_profiler.stats(),
+        "slot_index": slot_index.stats(),
+        "db_pools": pool_stats(),
+        "catalog_cache": catalog_cache.stats(),
+    }
+
+
+@debug_router.get("/sql")
+def debug_sql(limit: int = 20):
+    """Most recent sampled SQL profiles (statement shapes only, never parameters)."""
+    recent = list(sql_profiler.recent)[-max(1, min(limit, len(sql_profiler.recent) or 1)):]
+    return {"stats": sql_profiler.stats(), "recent": recent[::-1]}
+
+
+if DEBUG_ROUTES and DEBUG_TOKEN:
+    app.include_router(debug_router)
+elif DEBUG_ROUTES:
+    print("[debug] DEBUG_ROUTES=1 but DEBUG_TOKEN is not set; /debug routes stay off")
@@ -0,0 +1,180 @@
+"""
+Versioned schema changes for existing databases.
+
+create_all() builds missing tables with their current columns and indexes, but
+never alters a table that already exists. Each migration brings an older
+database forward; every step checks before it changes anything, so running
+one against a database create_all() just built is a no-op. Applied versions
+are recorded in schema_migrations and skipped on later runs.
+
+main.py calls migrate() at startup. Run by hand with:
+  python migrations.py [--list]
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import Base, engine
+import models  # noqa: F401  (registers the tables on Base.metadata)
+from catalog_cache import CATALOGS
+from models import CatalogVersion
+from rollups import rebuild_checkin_daily
+from specialties import sync_from_csv
+
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS = []  # [(version, name, fn(conn))], ascending
+
+
+def migration(version: int, name: str):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+
+def add_columns(conn, table: str, columns: dict):
+    """ALTER TABLE ... ADD COLUMN for each missing column.
+    columns: {name: "SQL type + constraints"}; must be nullable or have a default."""
+    insp = inspect(conn)
+    if not insp.has_table(table):
+        return
+    have = {c["name"] for c in insp.get_columns(table)}
+    for name, ddl in columns.items():
+        if name not in have:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+            print(f"[db] added column {table}.{name}")
+
+
+def create_indexes(conn, *names: str):
+    """Create the named indexes declared on the models, skipping ones that exist
+    (and ones whose ddl_if excludes this dialect)."""
+    by_name = {ix.name: ix for table in Base.metadata.tables.values() for ix in table.indexes}
+    for name in names:
+        by_name[name].create(conn, checkfirst=True)
+
+
+@migration(1, "chat session rolling summary columns")
+def _chat_session_summary(conn):
+    add_columns(conn, "chat_sessions", {
+        "summary": "TEXT",
+        "summary_upto_id": "INTEGER NOT NULL DEFAULT 0",
+        "last_message_id": "INTEGER",
+    })
+
+
+@migration(2, "composite and partial indexes for hot queries")
+def _hot_query_indexes(conn):
+    create_indexes(
+        conn,
+        "ix_ai_checkins_user_live_created",
+        "ix_ai_checkins_user_deleted_created",
+        "ix_chat_sessions_user_created",
+        "ix_chat_messages_session_created",
+        "ix_availability_slots_counselor_open_start",
+        "ix_bookings_user_created",
+    )
+
+
+@migration(3, "counselor specialties relation, open-slot index")
+def _counselor_specialties(conn):
+    # the tables themselves come from create_all(); fill them from the CSV column
+    n = sync_from_csv(conn)
+    print(f"[db] counselor_specialties filled for {n} counselors")
+    create_indexes(conn, "ix_availability_slots_open_start")
+
+
+@migration(4, "recurring availability rules, one slot row per counselor and start")
+def _availability_rules(conn):
+    # availability_rules / availability_exceptions come from create_all()
+    dupes = conn.execute(text(
+        "SELECT counselor_id, start_time FROM availability_slots "
+        "GROUP BY counselor_id, start_time HAVING COUNT(*) > 1"
+    )).fetchall()
+    if dupes:
+        raise RuntimeError(
+            f"availability_slots has {len(dupes)} duplicated (counselor_id, start_time) pairs, "
+            f"e.g. {tuple(dupes[0])}; remove the extra unbooked rows and run migrations again"
+        )
+    create_indexes(conn, "ux_availability_slots_counselor_start")
+
+
+@migration(5, "counselor external ids for bulk imports")
+def _counselor_external_id(conn):
+    add_columns(conn, "counselors", {"external_id": "VARCHAR(100)"})
+    create_indexes(conn, "ux_counselors_external_id")
+
+
+@migration(6, "version counters for the cached /resources and /counselors catalogs")
+def _catalog_versions(conn):
+    # catalog_versions comes from create_all(); one row per catalog, bumped on every write
+    have = set(conn.execute(select(CatalogVersion.name)).scalars())
+    missing = [name for name in CATALOGS if name not in have]
+    if missing:
+        conn.execute(insert(CatalogVersion), [{"name": name, "version": 1, "updated_at": datetime.utcnow()}
+                                              for name in missing])
+
+
+@migration(7, "client ids for check-ins uploaded in batches by offline clients")
+def _checkin_client_id(conn):
+    add_columns(conn, "ai_checkins", {"client_id": "VARCHAR(64)"})
+    create_indexes(conn, "ux_ai_checkins_user_client")
+
+
+@migration(8, "user/time index on chat messages for account exports")
+def _message_user_created_index(conn):
+    create_indexes(conn, "ix_chat_messages_user_created")
+
+
+@migration(9, "backfill checkin_daily from existing check-ins")
+def _checkin_daily_backfill(conn):
+    # /analytics/checkins reads only checkin_daily; databases from before the rollup have it empty.
+    # The session joins the migration's transaction (its commit is a savepoint release).
+    n = rebuild_checkin_daily(Session(bind=conn))
+    print(f"[db] checkin_daily rebuilt: {n} user-days")
+
+
+def applied_versions(bind: Engine) -> set:
+    with bind.connect() as conn:
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def migrate(bind: Engine = engine):
+    """Create missing tables, then apply pending migrations in order, one transaction each."""
+    Base.metadata.create_all(bind=bind)
+    schema_migrations.create(bind, checkfirst=True)
+    done = applied_versions(bind)
+    for version, name, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in done:
+            continue
+        try:
+            with bind.begin() as conn:
+                fn(conn)
+                conn.execute(insert(schema_migrations).values(
+                    version=version, name=name, applied_at=datetime.utcnow()))
+        except IntegrityError:
+            # another worker recorded it first; the steps themselves are idempotent
+            continue
+        print(f"[db] migration {version} applied: {name}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Apply pending schema migrations")
+    ap.add_argument("--list", action="store_true", help="show applied / pending migrations and exit")
+    args = ap.parse_args()
+    if args.list:
+        schema_migrations.create(engine, checkfirst=True)
+        done = applied_versions(engine)
+        for version, name, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+            print(f"{version:>4}  {'applied' if version in done else 'pending':8} {name}")
+    else:
+        migrate()
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Date, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from database import Base
 
+
+def _not_sqlite(ddl, target, bind, dialect=None, **kw):
+    # MySQL has no partial indexes; it gets a plain composite where SQLite gets a partial one
+    return dialect.name != "sqlite"
+
 # -------------------- Core Users / Check-ins / Chat --------------------
 
 class User(Base):
@@ -29,10 +34,43 @@ class AICheckIn(Base):
     notes        = Column(Text, nullable=True)
     deleted      = Column(Boolean, default=False)
     created_at   = Column(DateTime, default=datetime.utcnow)
+    client_id    = Column(String(64), nullable=True)  # set by offline clients; POST /checkins/batch dedupes on it
 
     user     = relationship("User",        back_populates="checkins")
     sessions = relationship("ChatSession", back_populates="checkin")
 
+    __table_args__ = (
+        # live check-ins per user, newest first (list, analytics, latest check-in)
+        Index("ix_ai_checkins_user_live_created", "user_id", "created_at",
+              sqlite_where=text("deleted = 0")).ddl_if(dialect="sqlite"),
+        Index("ix_ai_checkins_user_deleted_created", "user_id", "deleted", "created_at").ddl_if(callable_=_not_sqlite),
+        # replayed uploads of the same queued check-in (NULLs, i.e. POST /checkin rows, never collide)
+        Index("ux_ai_checkins_user_client", "user_id", "client_id", unique=True),
+    )
+
+
+class CheckInDaily(Base):
+    """Per-user, per-UTC-day check-in rollup, kept in step with ai_checkins (see rollups.py)."""
+    __tablename__ = "checkin_daily"
+    user_id      = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day          = Column(Date, primary_key=True)
+    count        = Column(Integer, default=0, nullable=False)
+    stress_sum   = Column(Integer, default=0, nullable=False)
+    mood_counts  = Column(Text, default="{}", nullable=False)  # JSON {mood: count}
+
+
+class UserCounters(Base):
+    """Per-user activity totals behind /analytics/overview, kept in step by the write routes (see rollups.py)."""
+    __tablename__ = "user_counters"
+    user_id             = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    sessions_count      = Column(Integer, default=0, nullable=False)
+    messages_count      = Column(Integer, default=0, nullable=False)
+    checkins_count      = Column(Integer, default=0, nullable=False)
+    last_checkin_id     = Column(Integer, nullable=True)
+    last_checkin_at     = Column(DateTime, nullable=True)
+    last_checkin_mood   = Column(String(100), nullable=True)
+    last_checkin_stress = Column(Integer, nullable=True)
+
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
@@ -43,11 +81,19 @@ class ChatSession(Base):
     checkin_id     = Column(Integer, ForeignKey("ai_checkins.id"), nullable=True)
     mood_at_start  = Column(String(100), nullable=True)
     stress_at_start= Column(Integer, nullable=True)
+    # rolling summary of turns that fell out of the prompt window (see chat_history.py)
+    summary        = Column(Text, nullable=True)
+    summary_upto_id= Column(Integer, default=0, server_default="0", nullable=False)
+    last_message_id= Column(Integer, nullable=True)  # bumped on every send; validates cached history
 
     user     = relationship("User",        back_populates="sessions")
     checkin  = relationship("AICheckIn",   back_populates="sessions")
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_chat_sessions_user_created", "user_id", "created_at"),
+    )
+
 
 class ChatRole:
     user      = "user"
@@ -65,6 +111,12 @@ class ChatMessage(Base):
 
     session = relationship("ChatSession", back_populates="messages")
 
+    __table_args__ = (
+        Index("ix_chat_messages_session_created", "session_id", "created_at"),
+        # a user's messages in time order across sessions (account export)
+        Index("ix_chat_messages_user_created", "user_id", "created_at"),
+    )
+
 
 class Resource(Base):
     __tablename__ = "resources"
@@ -76,6 +128,14 @@ class Resource(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class CatalogVersion(Base):
+    """Change counter per public catalog ("resources", "counselors"), bumped with every write to it (see catalog_cache.py)."""
+    __tablename__ = "catalog_versions"
+    name       = Column(String(50), primary_key=True)
+    version    = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
 # -------------------- Therapist Booking --------------------
 
 class BookingStatus:
@@ -87,17 +147,74 @@ class BookingStatus:
 class Counselor(Base):
     __tablename__ = "counselors"
     id          = Column(Integer, primary_key=True)
+    external_id = Column(String(100), nullable=True)  # partner's id; import_availability.py upserts on it
     full_name   = Column(String(255), nullable=False)
     bio         = Column(Text, nullable=True)
-    specialties = Column(String(500), nullable=True)  # comma-separated
+    specialties = Column(String(500), nullable=True)  # comma-separated display copy of counselor_specialties
     price_cents = Column(Integer, default=0, nullable=False)
     currency    = Column(String(10), default="BND", nullable=False)
     is_active   = Column(Boolean, default=True, nullable=False)
     created_at  = Column(DateTime, default=datetime.utcnow)
 
     slots    = relationship("AvailabilitySlot", back_populates="counselor", cascade="all, delete-orphan")
+    rules    = relationship("AvailabilityRule", back_populates="counselor", cascade="all, delete-orphan")
     bookings = relationship("Booking",          back_populates="counselor")
 
+    __table_args__ = (
+        Index("ux_counselors_external_id", "external_id", unique=True),
+    )
+
+
+class Specialty(Base):
+    __tablename__ = "specialties"
+    id   = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False, unique=True)  # normalized: lower-case, trimmed
+
+
+class CounselorSpecialty(Base):
+    __tablename__ = "counselor_specialties"
+    counselor_id = Column(Integer, ForeignKey("counselors.id"),  primary_key=True)
+    specialty_id = Column(Integer, ForeignKey("specialties.id"), primary_key=True)
+
+    __table_args__ = (
+        # counselors with a given specialty
+        Index("ix_counselor_specialties_specialty", "specialty_id", "counselor_id"),
+    )
+
+
+class AvailabilityRule(Base):
+    """Weekly recurring availability in the counselor's local time. Slots are
+    expanded from rules on read; a row in availability_slots is written only
+    when an occurrence is booked (see availability.py)."""
+    __tablename__ = "availability_rules"
+    id                 = Column(Integer, primary_key=True)
+    counselor_id       = Column(Integer, ForeignKey("counselors.id"), nullable=False, index=True)
+    weekday            = Column(Integer, nullable=False)   # 0 = Monday .. 6 = Sunday, local
+    start_minute       = Column(Integer, nullable=False)   # minutes after local midnight
+    duration_minutes   = Column(Integer, nullable=False)
+    utc_offset_minutes = Column(Integer, default=480, nullable=False)  # BNT = UTC+8, no DST
+    valid_from         = Column(Date, nullable=False)      # local dates, inclusive
+    valid_until        = Column(Date, nullable=True)       # null = open-ended
+    created_at         = Column(DateTime, default=datetime.utcnow)
+
+    counselor = relationship("Counselor", back_populates="rules")
+
+
+class AvailabilityException(Base):
+    """A local day (or one start time on it) on which a counselor's rules don't apply."""
+    __tablename__ = "availability_exceptions"
+    id           = Column(Integer, primary_key=True)
+    counselor_id = Column(Integer, ForeignKey("counselors.id"), nullable=False)
+    day          = Column(Date, nullable=False)            # local date
+    start_minute = Column(Integer, nullable=True)          # null = whole day off
+    reason       = Column(String(255), nullable=True)
+    created_at   = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_availability_exceptions_counselor_day", "counselor_id", "day"),
+        Index("ix_availability_exceptions_day", "day"),
+    )
+
 
 class AvailabilitySlot(Base):
     __tablename__ = "availability_slots"
@@ -111,6 +228,15 @@ class AvailabilitySlot(Base):
     counselor = relationship("Counselor",        back_populates="slots")
     booking   = relationship("Booking",          back_populates="slot", uselist=False)
 
+    __table_args__ = (
+        # open slots for a counselor in a time range
+        Index("ix_availability_slots_counselor_open_start", "counselor_id", "is_booked", "start_time"),
+        # open slots across counselors in a time range (slot search index load)
+        Index("ix_availability_slots_open_start", "is_booked", "start_time"),
+        # one row per counselor and start time: materializing a rule occurrence twice conflicts
+        Index("ux_availability_slots_counselor_start", "counselor_id", "start_time", unique=True),
+    )
+
 
 class Booking(Base):
     __tablename__ = "bookings"
@@ -124,3 +250,7 @@ class Booking(Base):
     user      = relationship("User",             back_populates="bookings")
     counselor = relationship("Counselor",        back_populates="bookings")
     slot      = relationship("AvailabilitySlot", back_populates="booking")
+
+    __table_args__ = (
+        Index("ix_bookings_user_created", "user_id", "created_at"),
+    )
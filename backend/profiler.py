@@ -0,0 +1,158 @@
+"""
+Sampled per-request SQL profiling.
+
+For SQL_PROFILE_SAMPLE_RATE of requests (1.0 while debugging, a small
+fraction in production) the ASGI middleware opens a RequestProfile in a
+context variable; engine cursor events add each statement's time to it. On
+sampled responses:
+
+- X-DB-Queries / X-DB-Time-ms headers (queries issued before the response
+  started; streamed bodies keep counting for the log line)
+- one JSON log line with the slowest statements and repeated shapes
+- the last SQL_PROFILE_KEEP profiles at /debug/sql (mounted with DEBUG_ROUTES=1)
+
+A statement shape (SQL text without parameters) running SQL_N_PLUS_ONE_THRESHOLD
+or more times in one request is logged as a likely N+1. Unsampled requests
+pay one random() call and a context-variable lookup per statement.
+"""
+import heapq
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+SQL_PROFILE_SAMPLE_RATE = float(os.getenv("SQL_PROFILE_SAMPLE_RATE", "0.01"))
+SQL_PROFILE_SLOWEST = int(os.getenv("SQL_PROFILE_SLOWEST", "3"))
+SQL_PROFILE_KEEP = int(os.getenv("SQL_PROFILE_KEEP", "100"))
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+_current = ContextVar("sql_profile", default=None)
+_IN_LIST = re.compile(r"\bIN \((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)", re.IGNORECASE)
+
+
+def statement_shape(statement: str) -> str:
+    """Whitespace-collapsed SQL with expanded IN lists folded to one placeholder."""
+    return _IN_LIST.sub("IN (?)", " ".join(statement.split()))
+
+
+class RequestProfile:
+    __slots__ = ("method", "path", "queries", "db_ms", "shapes", "slowest", "_lock")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.queries = 0
+        self.db_ms = 0.0
+        self.shapes = Counter()
+        self.slowest = []  # min-heap of (ms, shape)
+        self._lock = threading.Lock()  # background threads (streams, BackgroundTasks) share it
+
+    def record(self, statement: str, ms: float):
+        shape = statement_shape(statement)
+        with self._lock:
+            self.queries += 1
+            self.db_ms += ms
+            self.shapes[shape] += 1
+            if len(self.slowest) < SQL_PROFILE_SLOWEST:
+                heapq.heappush(self.slowest, (ms, shape))
+            elif ms > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (ms, shape))
+
+    def repeated(self) -> list:
+        return [{"count": n, "sql": shape} for shape, n in self.shapes.most_common()
+                if n >= SQL_N_PLUS_ONE_THRESHOLD]
+
+    def summary(self, status) -> dict:
+        with self._lock:
+            return {
+                "event": "sql_profile",
+                "method": self.method,
+                "path": self.path,
+                "status": status,
+                "queries": self.queries,
+                "db_ms": round(self.db_ms, 2),
+                "slowest": [{"ms": round(ms, 2), "sql": shape} for ms, shape in sorted(self.slowest, reverse=True)],
+                "repeated": self.repeated(),
+            }
+
+
+class SQLProfiler:
+    def __init__(self, sample_rate: float, keep: int):
+        self.sample_rate = sample_rate
+        self.recent = deque(maxlen=keep)
+        self.sampled = 0
+        self.n_plus_one_warnings = 0
+
+    def install(self, engine):
+        @event.listens_for(engine, "before_cursor_execute")
+        def _start(conn, cursor, statement, parameters, context, executemany):
+            if _current.get() is not None:
+                conn.info.setdefault("sql_profile_t0", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _stop(conn, cursor, statement, parameters, context, executemany):
+            profile = _current.get()
+            starts = conn.info.get("sql_profile_t0")
+            if profile is not None and starts:
+                profile.record(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+    def finish(self, profile: RequestProfile, status):
+        summary = profile.summary(status)
+        self.sampled += 1
+        self.recent.append(summary)
+        print(json.dumps(summary), flush=True)
+        for rep in summary["repeated"]:
+            self.n_plus_one_warnings += 1
+            print(f"[sql] possible N+1 in {profile.method} {profile.path}: "
+                  f"{rep['count']}x {rep['sql'][:200]}", flush=True)
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "sampled_requests": self.sampled,
+            "n_plus_one_warnings": self.n_plus_one_warnings,
+        }
+
+
+sql_profiler = SQLProfiler(SQL_PROFILE_SAMPLE_RATE, SQL_PROFILE_KEEP)
+
+
+class SQLProfileMiddleware:
+    """Pure ASGI middleware (no body buffering, streaming untouched)."""
+
+    def __init__(self, app, profiler: SQLProfiler = sql_profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.profiler.sample_rate:
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current.set(profile)
+        status = None
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                route = scope.get("route")
+                if route is not None and getattr(route, "path", None):
+                    profile.path = route.path  # template, so profiles group by route
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-queries", str(profile.queries).encode()),
+                    (b"x-db-time-ms", f"{profile.db_ms:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+            self.profiler.finish(profile, status)
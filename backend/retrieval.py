@@ -0,0 +1,139 @@
+"""
+Local retrieval over the MindCare+ knowledge file.
+
+The context file is split into paragraph chunks at startup and indexed with
+BM25. Each posting stores its precomputed BM25 weight, so scoring a query is
+one concatenation of the query terms' postings plus a np.bincount; no network
+or embedding model is involved.
+"""
+import re
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in is it its "
+    "me my of on or so that the their them there these they this to was we what when "
+    "where which who why will with you your".split()
+)
+# Light suffix stripping, repeated until the word stops changing, so inflected
+# forms meet: "counselor"/"counseling", "anonymous"/"anonymity",
+# "stress"/"stressed"/"stressful", "anxious"/"anxiety"/"anxieties".
+# (suffix, replacement) pairs, longest first; at least 4 chars of stem are kept.
+SUFFIXES = (
+    ("ations", ""), ("ation", ""), ("ities", ""), ("ity", ""), ("eties", ""), ("ety", ""),
+    ("ings", ""), ("ing", ""), ("ness", ""), ("ment", ""), ("ful", ""), ("ous", ""),
+    ("ors", ""), ("or", ""), ("ers", ""), ("er", ""), ("ies", "y"), ("ly", ""),
+    ("ed", ""), ("es", ""), ("s", ""), ("e", ""),
+)
+# A trailing "s" after these is part of the word ("stress", "crisis", "status")
+KEEP_S = ("ss", "is", "us")
+
+
+def _strip_once(word: str) -> str:
+    for suffix, repl in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            if suffix == "s" and word.endswith(KEEP_S):
+                continue
+            return word[: -len(suffix)] + repl
+    return word
+
+
+def stem(word: str) -> str:
+    while True:
+        stripped = _strip_once(word)
+        if stripped == word:
+            return word
+        word = stripped
+
+
+def tokenize(text: str) -> list:
+    return [stem(t) for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def split_paragraphs(text: str, max_chars: int = 1200) -> list:
+    """
+    Blank-line separated paragraphs. Short lines (headings such as
+    "Offered Solutions:") are carried into the next paragraph, and paragraphs
+    longer than max_chars are cut at sentence boundaries.
+    """
+    chunks = []
+    heading = ""
+    for para in re.split(r"\n\s*\n", text or ""):
+        para = " ".join(para.split())
+        if not para:
+            continue
+        if len(para) < 60 and not para.endswith("."):
+            heading = f"{heading} {para}".strip()
+            continue
+        if heading:
+            para = f"{heading} {para}"
+            heading = ""
+        current = ""
+        for sentence in SENTENCE_RE.split(para):
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                chunks.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}".strip()
+        if current:
+            chunks.append(current)
+    if heading:
+        chunks.append(heading)
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of chunks, stored as term -> postings (CSR)."""
+
+    def __init__(self, chunks: list, k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.vocab = {}
+        n = len(chunks)
+        term_ids, doc_ids, tfs = [], [], []
+        doc_len = np.zeros(n, dtype=np.float32)
+        for d, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            doc_len[d] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(self.vocab.setdefault(term, len(self.vocab)))
+                doc_ids.append(d)
+                tfs.append(tf)
+
+        terms = np.asarray(term_ids, dtype=np.int64)
+        docs = np.asarray(doc_ids, dtype=np.int32)
+        tf = np.asarray(tfs, dtype=np.float32)
+        order = np.argsort(terms, kind="stable")
+        terms, docs, tf = terms[order], docs[order], tf[order]
+
+        df = np.bincount(terms, minlength=len(self.vocab)).astype(np.float32)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        avgdl = float(doc_len.mean()) if n else 0.0
+        norm = k1 * (1 - b + b * doc_len[docs] / (avgdl or 1.0))
+
+        self.indptr = np.concatenate(([0], np.cumsum(df, dtype=np.int64)))
+        self.docs = docs
+        self.weights = (idf[terms] * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+    def search(self, query: str, k: int = 4) -> list:
+        """Top-k (chunk_index, score) pairs with a positive score, best first."""
+        ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not ids or not self.chunks:
+            return []
+        spans = [slice(self.indptr[t], self.indptr[t + 1]) for t in ids]
+        scores = np.bincount(
+            np.concatenate([self.docs[s] for s in spans]),
+            weights=np.concatenate([self.weights[s] for s in spans]),
+            minlength=len(self.chunks),
+        )
+        k = min(k, len(self.chunks))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    def top_chunks(self, query: str, k: int = 4) -> list:
+        """Best chunks for `query`, returned in their original file order."""
+        hits = sorted(i for i, _ in self.search(query, k))
+        return [self.chunks[i] for i in hits]
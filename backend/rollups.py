@@ -0,0 +1,322 @@
+"""
+Incrementally maintained aggregates for the analytics routes.
+
+checkin_daily holds one row per user per UTC day (count, stress sum, mood
+counts). apply_checkin() adjusts it inside the caller's transaction whenever a
+check-in is created (+1) or soft-deleted (-1), apply_checkins() for a batch
+upload, so /analytics/checkins reads at most 181 small rows instead of every
+check-in.
+
+user_counters holds one row per user with session / message / check-in totals
+and a snapshot of the latest check-in, so /analytics/overview is a primary-key
+read. Write routes adjust it with atomic UPDATEs in their own transaction; a
+missing row is built from the source tables on first use.
+
+Migration 9 fills checkin_daily once from existing check-ins on upgrade.
+Backfill / repair:
+  python rollups.py rebuild-checkins [--user-id ID]
+  python rollups.py reconcile-counters [--user-id ID] [--dry-run]
+"""
+import argparse
+import json
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import AICheckIn, ChatMessage, ChatSession, CheckInDaily, UserCounters
+
+
+def _as_date(value) -> date:
+    # func.date() comes back as a string on SQLite and a date on MySQL
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def _daily_row(db: Session, user_id: int, day: date) -> CheckInDaily:
+    """The (user, day) rollup row, locked for update; created if missing."""
+    row = (
+        db.query(CheckInDaily)
+        .filter(CheckInDaily.user_id == user_id, CheckInDaily.day == day)
+        .with_for_update()
+        .first()
+    )
+    if row:
+        return row
+    try:
+        with db.begin_nested():
+            row = CheckInDaily(user_id=user_id, day=day, count=0, stress_sum=0, mood_counts="{}")
+            db.add(row)
+        return row
+    except IntegrityError:
+        # another transaction created it first
+        return (
+            db.query(CheckInDaily)
+            .filter(CheckInDaily.user_id == user_id, CheckInDaily.day == day)
+            .with_for_update()
+            .one()
+        )
+
+
+def _add_to_daily(row: CheckInDaily, cis, sign: int):
+    moods = json.loads(row.mood_counts or "{}")
+    for ci in cis:
+        if ci.mood:
+            moods[ci.mood] = moods.get(ci.mood, 0) + sign
+            if moods[ci.mood] <= 0:
+                del moods[ci.mood]
+        row.count = max(0, row.count + sign)
+        row.stress_sum = max(0, row.stress_sum + sign * int(ci.stress_level or 0))
+    row.mood_counts = json.dumps(moods, ensure_ascii=False, sort_keys=True)
+
+
+def _offer_last_checkin(db: Session, user_id: int, ci):
+    """Make ci the counters' latest check-in unless a later one is already there."""
+    db.execute(
+        update(UserCounters)
+        .where(UserCounters.user_id == user_id,
+               or_(UserCounters.last_checkin_at.is_(None), UserCounters.last_checkin_at <= ci.created_at))
+        .values(**_last_checkin_values(ci))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def apply_checkin(db: Session, ci: AICheckIn, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) one flushed check-in from its day's rollup
+    and from the user's counters. Doesn't commit."""
+    _add_to_daily(_daily_row(db, ci.user_id, ci.created_at.date()), [ci], sign)
+
+    if _bump(db, ci.user_id, {"checkins_count": sign}):
+        return  # row was just built from ai_checkins, which already reflects ci
+    if sign > 0:
+        _offer_last_checkin(db, ci.user_id, ci)
+    else:
+        db.execute(
+            update(UserCounters)
+            .where(UserCounters.user_id == ci.user_id, UserCounters.last_checkin_id == ci.id)
+            .values(**_last_checkin_values(_latest_checkin(db, ci.user_id)))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def apply_checkins(db: Session, user_id: int, cis: list):
+    """apply_checkin(+1) for a batch of one user's inserted check-ins (anything with
+    id, created_at, mood, stress_level): one rollup update per day touched and one
+    counters update. Doesn't commit."""
+    if not cis:
+        return
+    by_day = defaultdict(list)
+    for ci in cis:
+        by_day[ci.created_at.date()].append(ci)
+    for day in sorted(by_day):  # same lock order for every writer
+        _add_to_daily(_daily_row(db, user_id, day), by_day[day], 1)
+
+    if _bump(db, user_id, {"checkins_count": len(cis)}):
+        return
+    _offer_last_checkin(db, user_id, max(cis, key=lambda ci: (ci.created_at, ci.id)))
+
+
+def read_checkin_daily(db: Session, user_id: int, start_day: date, end_day: date) -> list:
+    return (
+        db.query(CheckInDaily.day, CheckInDaily.count, CheckInDaily.stress_sum, CheckInDaily.mood_counts)
+        .filter(CheckInDaily.user_id == user_id, CheckInDaily.day >= start_day, CheckInDaily.day <= end_day)
+        .all()
+    )
+
+
+def rebuild_checkin_daily(db: Session, user_id: int = None, chunk: int = 5000) -> int:
+    """Recompute checkin_daily from ai_checkins (all users or one). Returns rows written; commits."""
+    q = db.query(CheckInDaily)
+    if user_id is not None:
+        q = q.filter(CheckInDaily.user_id == user_id)
+    q.delete(synchronize_session=False)
+
+    day_col = func.date(AICheckIn.created_at)
+    agg = (
+        db.query(AICheckIn.user_id, day_col, AICheckIn.mood,
+                 func.count(AICheckIn.id), func.coalesce(func.sum(AICheckIn.stress_level), 0))
+        .filter(AICheckIn.deleted == False)
+        .group_by(AICheckIn.user_id, day_col, AICheckIn.mood)
+    )
+    if user_id is not None:
+        agg = agg.filter(AICheckIn.user_id == user_id)
+
+    days = defaultdict(lambda: {"count": 0, "stress_sum": 0, "moods": {}})
+    for uid, day, mood, count, stress_sum in agg.yield_per(chunk):
+        d = days[(uid, _as_date(day))]
+        d["count"] += count
+        d["stress_sum"] += int(stress_sum)
+        if mood:
+            d["moods"][mood] = d["moods"].get(mood, 0) + count
+
+    rows = [
+        {"user_id": uid, "day": day, "count": d["count"], "stress_sum": d["stress_sum"],
+         "mood_counts": json.dumps(d["moods"], ensure_ascii=False, sort_keys=True)}
+        for (uid, day), d in days.items()
+    ]
+    for i in range(0, len(rows), chunk):
+        db.bulk_insert_mappings(CheckInDaily, rows[i:i + chunk])
+    db.commit()
+    return len(rows)
+
+
+# ---- user_counters ----
+
+def _last_checkin_values(ci) -> dict:
+    return {
+        "last_checkin_id": ci.id if ci else None,
+        "last_checkin_at": ci.created_at if ci else None,
+        "last_checkin_mood": ci.mood if ci else None,
+        "last_checkin_stress": ci.stress_level if ci else None,
+    }
+
+
+def _latest_checkin(db: Session, user_id: int):
+    return (
+        db.query(AICheckIn.id, AICheckIn.created_at, AICheckIn.mood, AICheckIn.stress_level)
+        .filter(AICheckIn.user_id == user_id, AICheckIn.deleted == False)
+        .order_by(AICheckIn.created_at.desc(), AICheckIn.id.desc())
+        .first()
+    )
+
+
+def _counters_from_source(db: Session, user_id: int) -> dict:
+    return {
+        "sessions_count": db.query(func.count(ChatSession.id)).filter(ChatSession.user_id == user_id).scalar(),
+        "messages_count": db.query(func.count(ChatMessage.id)).filter(ChatMessage.user_id == user_id).scalar(),
+        "checkins_count": db.query(func.count(AICheckIn.id))
+                            .filter(AICheckIn.user_id == user_id, AICheckIn.deleted == False).scalar(),
+        **_last_checkin_values(_latest_checkin(db, user_id)),
+    }
+
+
+def _init_counters(db: Session, user_id: int) -> bool:
+    """Insert the user's row computed from the source tables; False if another transaction beat us to it."""
+    try:
+        with db.begin_nested():
+            db.add(UserCounters(user_id=user_id, **_counters_from_source(db, user_id)))
+        return True
+    except IntegrityError:
+        return False
+
+
+def _bump(db: Session, user_id: int, deltas: dict) -> bool:
+    """Apply deltas in one UPDATE; True if the row had to be built from source instead."""
+    stmt = (
+        update(UserCounters)
+        .where(UserCounters.user_id == user_id)
+        .values({name: getattr(UserCounters, name) + delta for name, delta in deltas.items()})
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(stmt).rowcount:
+        return False
+    if _init_counters(db, user_id):
+        return True
+    db.execute(stmt)
+    return False
+
+
+def bump_counters(db: Session, user_id: int, sessions: int = 0, messages: int = 0):
+    """Adjust session/message totals after flushing the change they describe. Doesn't commit."""
+    _bump(db, user_id, {"sessions_count": sessions, "messages_count": messages})
+
+
+def read_user_counters(db: Session, user_id: int) -> UserCounters:
+    """The user's counters by primary key; built from the source tables (and committed) on first use."""
+    row = db.get(UserCounters, user_id)
+    if row is None:
+        _init_counters(db, user_id)
+        db.commit()
+        row = db.get(UserCounters, user_id)
+    return row
+
+
+def reconcile_user_counters(db: Session, user_id: int = None, fix: bool = True) -> list:
+    """Compare user_counters with the source tables and (if fix) correct any drift; commits.
+    Returns [{user_id, stored, actual}] for every row that differed or was missing."""
+    def per_user(q, user_col):
+        if user_id is not None:
+            q = q.filter(user_col == user_id)
+        return dict(q.group_by(user_col).all())
+
+    sessions = per_user(db.query(ChatSession.user_id, func.count(ChatSession.id)), ChatSession.user_id)
+    messages = per_user(db.query(ChatMessage.user_id, func.count(ChatMessage.id)), ChatMessage.user_id)
+    checkins = per_user(
+        db.query(AICheckIn.user_id, func.count(AICheckIn.id)).filter(AICheckIn.deleted == False),
+        AICheckIn.user_id,
+    )
+
+    newest = db.query(AICheckIn.user_id, func.max(AICheckIn.created_at).label("at")).filter(AICheckIn.deleted == False)
+    if user_id is not None:
+        newest = newest.filter(AICheckIn.user_id == user_id)
+    newest = newest.group_by(AICheckIn.user_id).subquery()
+    latest = {}
+    for ci in (
+        db.query(AICheckIn.user_id, AICheckIn.id, AICheckIn.created_at, AICheckIn.mood, AICheckIn.stress_level)
+        .join(newest, and_(AICheckIn.user_id == newest.c.user_id, AICheckIn.created_at == newest.c.at))
+        .filter(AICheckIn.deleted == False)
+    ):
+        if ci.user_id not in latest or ci.id > latest[ci.user_id].id:
+            latest[ci.user_id] = ci
+
+    stored = db.query(UserCounters)
+    if user_id is not None:
+        stored = stored.filter(UserCounters.user_id == user_id)
+    stored = {row.user_id: row for row in stored}
+
+    drift = []
+    for uid in sorted(set(sessions) | set(messages) | set(checkins) | set(stored)):
+        actual = {
+            "sessions_count": sessions.get(uid, 0),
+            "messages_count": messages.get(uid, 0),
+            "checkins_count": checkins.get(uid, 0),
+            **_last_checkin_values(latest.get(uid)),
+        }
+        row = stored.get(uid)
+        current = {name: getattr(row, name) for name in actual} if row else None
+        if current == actual:
+            continue
+        drift.append({"user_id": uid, "stored": current, "actual": actual})
+        if fix:
+            if row:
+                for name, value in actual.items():
+                    setattr(row, name, value)
+            else:
+                db.add(UserCounters(user_id=uid, **actual))
+    if fix:
+        db.commit()
+    return drift
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    from migrations import migrate
+
+    ap = argparse.ArgumentParser(description="Rebuild analytics rollups from source tables")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("rebuild-checkins", help="recompute checkin_daily from ai_checkins")
+    p.add_argument("--user-id", type=int)
+    p = sub.add_parser("reconcile-counters", help="check user_counters against the source tables and fix drift")
+    p.add_argument("--user-id", type=int)
+    p.add_argument("--dry-run", action="store_true", help="report drift without correcting it")
+    args = ap.parse_args()
+
+    migrate()
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild-checkins":
+            n = rebuild_checkin_daily(db, args.user_id)
+            print(f"[rollups] checkin_daily rebuilt: {n} rows")
+        elif args.command == "reconcile-counters":
+            drift = reconcile_user_counters(db, args.user_id, fix=not args.dry_run)
+            for d in drift:
+                print(json.dumps(d, default=str))
+            verb = "found" if args.dry_run else "fixed"
+            print(f"[rollups] user_counters: {verb} drift for {len(drift)} users")
+    finally:
+        db.close()
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
 
@@ -31,6 +32,16 @@ class CheckInIn(BaseModel):
     stress_level: int
     notes: Optional[str] = None
 
+class CheckInBatchItem(BaseModel):
+    client_id: str                        # generated on the device; replays are deduplicated on it
+    mood: str
+    stress_level: int
+    notes: Optional[str] = None
+    created_at: Optional[datetime] = None  # when it was logged on the device; default: now
+
+class CheckInBatchIn(BaseModel):
+    checkins: List[CheckInBatchItem]
+
 class CheckInOut(BaseModel):
     id: int
     mood: str
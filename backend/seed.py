@@ -1,5 +1,6 @@
 from database import Base, engine, SessionLocal
 from models import Resource
+import catalog_cache  # noqa: F401  (bumps the resources version, so running workers serve the new rows)
 from datetime import datetime
 
 def seed():
@@ -1,18 +1,20 @@
 """
-Seed a few counselors and their availability slots (next 14 days).
-- Stores datetimes in UTC (DB expects naive UTC DateTime in this project).
-- Slot times are defined in Brunei time (BNT, UTC+8) then converted to UTC.
+Seed a few counselors and their weekly availability rules.
+- Rules are in Brunei time (BNT, UTC+8); /counselors/{cid}/slots expands them
+  into UTC slots on the fly, and a slot row is only written when it is booked.
+- Idempotent: existing counselors and rules are left alone.
 
 Run: python3 seed_booking.py
 """
 from datetime import datetime, timedelta
 
-from database import Base, engine, SessionLocal  # assumes SessionLocal exists in database.py
-from models import Counselor, AvailabilitySlot
+from database import SessionLocal
+from migrations import migrate
+from models import Counselor, AvailabilityRule
+from specialties import set_counselor_specialties
 
 # --- config ---
-DAYS_AHEAD = 14
-# in Brunei time (UTC+8); we convert before saving
+# in Brunei time (UTC+8), every day of the week
 DAILY_TIMES_BNT = [(9, 0), (14, 0), (20, 0)]  # 09:00, 14:00, 20:00
 SLOT_MINUTES = 50
 UTC_OFFSET_HOURS = 8  # BNT = UTC+8
@@ -35,11 +37,6 @@ COUNSELORS = [
 ]
 
 
-def bnt_to_utc(dt_bnt: datetime) -> datetime:
-    """Convert naive BNT (UTC+8) to naive UTC for storage."""
-    return dt_bnt - timedelta(hours=UTC_OFFSET_HOURS)
-
-
 def ensure_counselors(db):
     created = []
     for c in COUNSELORS:
@@ -49,6 +46,8 @@ def ensure_counselors(db):
             continue
         obj = Counselor(**c)
         db.add(obj)
+        db.flush()
+        set_counselor_specialties(db, obj.id, c["specialties"])
         db.commit()
         db.refresh(obj)
         created.append(obj)
@@ -56,48 +55,40 @@ def ensure_counselors(db):
     return created
 
 
-def ensure_slots(db, counselor, days_ahead=DAYS_AHEAD):
-    today_bnt = datetime.utcnow() + timedelta(hours=UTC_OFFSET_HOURS)
-    start_date_bnt = today_bnt.replace(hour=0, minute=0, second=0, microsecond=0)
-
-    for d in range(days_ahead):
-        day_bnt = start_date_bnt + timedelta(days=d)
+def ensure_rules(db, counselor):
+    today_bnt = (datetime.utcnow() + timedelta(hours=UTC_OFFSET_HOURS)).date()
+    have = {
+        (r.weekday, r.start_minute)
+        for r in db.query(AvailabilityRule.weekday, AvailabilityRule.start_minute)
+        .filter(AvailabilityRule.counselor_id == counselor.id)
+    }
+    added = 0
+    for weekday in range(7):
         for (hh, mm) in DAILY_TIMES_BNT:
-            start_bnt = day_bnt.replace(hour=hh, minute=mm)
-            end_bnt = start_bnt + timedelta(minutes=SLOT_MINUTES)
-            start_utc = bnt_to_utc(start_bnt)
-            end_utc = bnt_to_utc(end_bnt)
-
-            # idempotency: skip if slot already exists for same start time
-            exists = (
-                db.query(AvailabilitySlot)
-                .filter(AvailabilitySlot.counselor_id == counselor.id,
-                        AvailabilitySlot.start_time == start_utc)
-                .first()
-            )
-            if exists:
+            if (weekday, hh * 60 + mm) in have:
                 continue
-
-            slot = AvailabilitySlot(
+            db.add(AvailabilityRule(
                 counselor_id=counselor.id,
-                start_time=start_utc,
-                end_time=end_utc,
-                is_booked=False,
-            )
-            db.add(slot)
+                weekday=weekday,
+                start_minute=hh * 60 + mm,
+                duration_minutes=SLOT_MINUTES,
+                utc_offset_minutes=UTC_OFFSET_HOURS * 60,
+                valid_from=today_bnt,
+            ))
+            added += 1
     db.commit()
-    print(f"[seed] slots created for {counselor.full_name}")
+    print(f"[seed] {added} availability rules created for {counselor.full_name}")
 
 
 if __name__ == "__main__":
-    # Create tables if not yet created
-    Base.metadata.create_all(bind=engine)
+    # Create tables / apply migrations if not yet done
+    migrate()
 
     db = SessionLocal()
     try:
         counselors = ensure_counselors(db)
         for c in counselors:
-            ensure_slots(db, c)
+            ensure_rules(db, c)
         print("[seed] done.")
     finally:
         db.close()
@@ -0,0 +1,234 @@
+"""
+In-memory index of free availability slots for /slots/search.
+
+Open future slots of active counselors (up to SLOT_INDEX_HORIZON_DAYS ahead),
+free concrete rows and unbooked occurrences of recurring rules alike, are held
+in two parallel lists sorted by (start_time, counselor_id), so a time window
+is one bisect plus a scan of just that window; counselor filters (specialty,
+price) are resolved to a set of counselor ids once per search. Searches issue
+no SQL.
+
+Freshness:
+- a booking made on this worker drops its slot immediately (discard())
+- the whole index is reloaded every SLOT_INDEX_TTL_SECONDS, in a background
+  thread while the old copy keeps serving; that picks up new slots, counselor
+  changes and bookings made on other workers. A slot booked elsewhere in the
+  meantime can still be listed; POST /bookings answers 409 for it.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from availability import expand, load_exceptions, load_rules
+from database import ReadSessionLocal
+from models import AvailabilitySlot, Counselor, CounselorSpecialty, Specialty
+
+SLOT_INDEX_TTL_SECONDS = float(os.getenv("SLOT_INDEX_TTL_SECONDS", "60"))
+SLOT_INDEX_HORIZON_DAYS = int(os.getenv("SLOT_INDEX_HORIZON_DAYS", "60"))
+
+
+class CounselorInfo:
+    __slots__ = ("id", "full_name", "price_cents", "currency", "specialties")
+
+    def __init__(self, id: int, full_name: str, price_cents: int, currency: str, specialties: tuple):
+        self.id = id
+        self.full_name = full_name
+        self.price_cents = price_cents
+        self.currency = currency
+        self.specialties = specialties
+
+
+class SlotIndex:
+    def __init__(self, session_factory, ttl_seconds: float = SLOT_INDEX_TTL_SECONDS,
+                 horizon_days: int = SLOT_INDEX_HORIZON_DAYS):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.horizon_days = horizon_days
+        self._lock = threading.Lock()        # guards the lists below
+        self._load_lock = threading.Lock()   # one loader at a time
+        self._keys = []     # (start_time, counselor_id), sorted and unique
+        self._slots = []    # (end_time, slot id), parallel to _keys
+        self._counselors = {}      # counselor_id -> CounselorInfo
+        self._by_specialty = {}    # name -> frozenset(counselor_id)
+        self._loaded_at = None     # monotonic
+        self._discarded_during_load = None  # keys booked while a load was reading
+        self._refreshing = False
+        self.loads = 0
+        self.last_load_ms = None
+        self.searches = 0
+        self.discards = 0
+
+    # ---- loading ----
+
+    def _read(self):
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            counselors = {
+                r.id: r for r in db.query(Counselor.id, Counselor.full_name, Counselor.price_cents, Counselor.currency)
+                .filter(Counselor.is_active == True)
+            }
+            names = {}
+            for cid, name in (
+                db.query(CounselorSpecialty.counselor_id, Specialty.name)
+                .join(Specialty, Specialty.id == CounselorSpecialty.specialty_id)
+            ):
+                if cid in counselors:
+                    names.setdefault(cid, []).append(name)
+            horizon = now + timedelta(days=self.horizon_days)
+            in_window = (AvailabilitySlot.start_time > now, AvailabilitySlot.start_time <= horizon)
+            slots = (
+                db.query(AvailabilitySlot.id, AvailabilitySlot.counselor_id,
+                         AvailabilitySlot.start_time, AvailabilitySlot.end_time)
+                .filter(AvailabilitySlot.is_booked == False, *in_window)
+                .all()
+            )
+            booked = {
+                (r.start_time, r.counselor_id)
+                for r in db.query(AvailabilitySlot.start_time, AvailabilitySlot.counselor_id)
+                .filter(AvailabilitySlot.is_booked == True, *in_window)
+            }
+            occurrences = expand(load_rules(db), load_exceptions(db, now, horizon), now, horizon)
+        finally:
+            db.close()
+
+        infos = {cid: CounselorInfo(cid, r.full_name, r.price_cents, r.currency, tuple(sorted(names.get(cid, ()))))
+                 for cid, r in counselors.items()}
+        by_specialty = {}
+        for info in infos.values():
+            for name in info.specialties:
+                by_specialty.setdefault(name, set()).add(info.id)
+        entries = {}
+        for o in occurrences:
+            key = (o.start_time, o.counselor_id)
+            if o.counselor_id in infos and o.start_time > now and key not in booked:
+                entries[key] = (o.end_time, o.id)
+        for s in slots:  # a concrete row replaces the occurrence at its start time
+            if s.counselor_id in infos:
+                entries[(s.start_time, s.counselor_id)] = (s.end_time, s.id)
+        keys = sorted(entries)
+        rows = [entries[k] for k in keys]
+        return keys, rows, infos, {k: frozenset(v) for k, v in by_specialty.items()}
+
+    def load(self):
+        """Reload from the database and swap the new copy in."""
+        with self._load_lock:
+            self._load()
+
+    def _load(self):
+        t0 = time.perf_counter()
+        with self._lock:
+            self._discarded_during_load = set()
+        try:
+            keys, rows, infos, by_specialty = self._read()
+        except Exception:
+            with self._lock:
+                self._discarded_during_load = None
+            raise
+        with self._lock:
+            # bookings committed while we were reading may be in the snapshot
+            gone = self._discarded_during_load
+            self._discarded_during_load = None
+            if gone:
+                kept = [i for i, key in enumerate(keys) if key not in gone]
+                keys = [keys[i] for i in kept]
+                rows = [rows[i] for i in kept]
+            self._keys, self._slots = keys, rows
+            self._counselors, self._by_specialty = infos, by_specialty
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+            self.last_load_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+    def _refresh_in_background(self):
+        try:
+            self.load()
+        except Exception as e:
+            print("[slots] index reload failed:", repr(e))
+        finally:
+            self._refreshing = False
+
+    def ensure_fresh(self):
+        if self._loaded_at is None:
+            with self._load_lock:  # first searches on this worker wait for one load
+                if self._loaded_at is None:
+                    self._load()
+            return
+        if time.monotonic() - self._loaded_at < self.ttl_seconds or self._refreshing:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def invalidate(self):
+        """Reload on the next search (this worker only)."""
+        self._loaded_at = None
+
+    # ---- updates ----
+
+    def discard(self, counselor_id: int, start_time: datetime):
+        """Drop the counselor's slot at start_time, which was just booked."""
+        key = (start_time, counselor_id)
+        with self._lock:
+            self.discards += 1
+            if self._discarded_during_load is not None:
+                self._discarded_during_load.add(key)
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+                del self._slots[i]
+
+    # ---- queries ----
+
+    def search(self, start: datetime, end: datetime, specialty: str = None, min_price: int = None,
+               max_price: int = None, min_minutes: int = None, limit: int = 50) -> list:
+        """Free slots starting in [start, end), earliest first, as
+        [(slot_id, start_time, end_time, CounselorInfo)]."""
+        self.ensure_fresh()
+        now = datetime.utcnow()
+        start = max(start, now)
+        min_length = timedelta(minutes=min_minutes) if min_minutes else None
+        with self._lock:
+            self.searches += 1
+            if specialty is not None:
+                allowed = self._by_specialty.get(specialty, frozenset())
+            else:
+                allowed = self._counselors.keys()
+            if min_price is not None or max_price is not None:
+                allowed = {cid for cid in allowed
+                           if (min_price is None or self._counselors[cid].price_cents >= min_price)
+                           and (max_price is None or self._counselors[cid].price_cents <= max_price)}
+            if not allowed:
+                return []
+
+            out = []
+            keys, rows, counselors = self._keys, self._slots, self._counselors
+            i = bisect_left(keys, (start,))
+            while i < len(keys) and len(out) < limit:
+                slot_start, cid = keys[i]
+                if slot_start >= end:
+                    break
+                slot_end, slot_id = rows[i]
+                if cid in allowed and (min_length is None or slot_end - slot_start >= min_length):
+                    out.append((slot_id, slot_start, slot_end, counselors[cid]))
+                i += 1
+            return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "slots": len(self._keys),
+                "counselors": len(self._counselors),
+                "specialties": len(self._by_specialty),
+                "loads": self.loads,
+                "last_load_ms": self.last_load_ms,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+                "searches": self.searches,
+                "discards": self.discards,
+            }
+
+
+slot_index = SlotIndex(ReadSessionLocal)
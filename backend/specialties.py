@@ -0,0 +1,75 @@
+"""
+Counselor specialties as a relation: specialties(id, name) and
+counselor_specialties(counselor_id, specialty_id), indexed both ways.
+
+Counselor.specialties (comma-separated) is kept as the display copy that
+/counselors returns; set_counselor_specialties() writes both, and
+sync_from_csv() (migration 3, seeders) derives the relation from the column
+for rows written before the relation existed.
+"""
+from sqlalchemy import delete, insert, select, update
+
+from catalog_cache import bump_catalog_version
+from models import Counselor, CounselorSpecialty, Specialty
+
+
+def normalize_specialty(name: str) -> str:
+    return " ".join((name or "").split()).lower()
+
+
+def split_specialties(csv: str) -> list:
+    """Distinct normalized names from a comma-separated string, first occurrence order."""
+    seen = []
+    for part in (csv or "").split(","):
+        name = normalize_specialty(part)
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+
+def specialty_ids(conn, names) -> dict:
+    """{name: id} for the given normalized names, inserting the missing ones.
+    conn is a Session or Connection inside the caller's transaction."""
+    names = sorted(set(names))
+    if not names:
+        return {}
+    have = dict(conn.execute(select(Specialty.name, Specialty.id).where(Specialty.name.in_(names))).all())
+    missing = [n for n in names if n not in have]
+    if missing:
+        conn.execute(insert(Specialty), [{"name": n} for n in missing])
+        have.update(conn.execute(select(Specialty.name, Specialty.id).where(Specialty.name.in_(missing))).all())
+    return have
+
+
+def _replace_links(conn, links: dict):
+    """links: {counselor_id: [normalized names]}; replaces those counselors' rows."""
+    if not links:
+        return
+    ids = specialty_ids(conn, [n for names in links.values() for n in names])
+    conn.execute(delete(CounselorSpecialty).where(CounselorSpecialty.counselor_id.in_(list(links))))
+    rows = [{"counselor_id": cid, "specialty_id": ids[n]} for cid, names in links.items() for n in names]
+    if rows:
+        conn.execute(insert(CounselorSpecialty), rows)
+
+
+def set_counselor_specialties(conn, counselor_id: int, names):
+    """Replace one counselor's specialties (relation and display copy). Caller commits."""
+    if isinstance(names, str):
+        names = split_specialties(names)
+    else:
+        names = split_specialties(",".join(names))
+    _replace_links(conn, {counselor_id: names})
+    conn.execute(update(Counselor).where(Counselor.id == counselor_id).values(specialties=",".join(names)))
+    bump_catalog_version(conn, "counselors")
+
+
+def sync_from_csv(conn, counselor_ids=None, chunk: int = 500):
+    """Rebuild counselor_specialties from Counselor.specialties (all counselors,
+    or the given ids). Idempotent; caller commits."""
+    q = select(Counselor.id, Counselor.specialties).order_by(Counselor.id)
+    if counselor_ids is not None:
+        q = q.where(Counselor.id.in_(list(counselor_ids)))
+    rows = conn.execute(q).all()
+    for i in range(0, len(rows), chunk):
+        _replace_links(conn, {cid: split_specialties(csv) for cid, csv in rows[i:i + chunk]})
+    return len(rows)
@@ -0,0 +1,51 @@
+"""Which /chat questions the answer cache may store and share between users."""
+from answer_cache import AnswerCache, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL_SECONDS
+
+
+def fresh_cache():
+    return AnswerCache(16, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL_SECONDS)
+
+
+def test_disclosure_with_faq_keyword_is_not_shared():
+    cache = fresh_cache()
+    first = "should I see a counselor about my panic attacks at work?"
+    second = "should I see a counselor about my panic attacks at school?"
+    assert not cache.cacheable(first)
+    assert not cache.cacheable(second)
+    cache.put(first, "answer for the first user")
+    assert cache.get(second) is None
+    # even without "my", the personal details are too many for an FAQ
+    assert not cache.cacheable("should I see a counselor about panic attacks at work?")
+
+
+def test_abuse_and_violence_are_never_cached():
+    cache = fresh_cache()
+    for message in [
+        "is my data private if I tell you my husband hits me?",
+        "is it private if someone hits me?",
+        "are sessions confidential if my partner threatens me?",
+        "can a counselor help with domestic abuse?",
+    ]:
+        assert not cache.cacheable(message), message
+        cache.put(message, "cached")
+        assert cache.get(message) is None, message
+
+
+def test_first_person_statements_are_not_cached():
+    cache = fresh_cache()
+    for message in [
+        "I feel anxious, can I book a counselor?",
+        "I have no money, is premium free?",
+        "can I cancel my booking?",
+        "I am not sure, how do I book a session?",
+    ]:
+        assert not cache.cacheable(message), message
+
+
+def test_faq_variants_still_hit():
+    cache = fresh_cache()
+    cache.put("how do I book a counselor", "Open Counselors and pick a slot.")
+    assert cache.get("How do I book a counsellor?") == "Open Counselors and pick a slot."
+    assert cache.get("how do I cancel a booking?") is None
+    cache.put("is it free?", "The basic tools are free.")
+    assert cache.get("is it not free?") is None
@@ -0,0 +1,55 @@
+"""Priority admission in the LLM scheduler when its queue is full."""
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import LLMScheduler, Priority, SchedulerBusy
+
+
+def full_scheduler(waiting):
+    """One slot taken and one waiter per priority in `waiting`; returns the
+    scheduler, the held slot and {priority: outcome} filled in as waiters finish."""
+    sched = LLMScheduler(1, len(waiting), 5.0, 3, 1.0)
+    held = sched.acquire(Priority.premium)
+    outcomes = {}
+
+    def wait(priority):
+        try:
+            sched.acquire(priority).release()
+            outcomes[priority] = "admitted"
+        except SchedulerBusy as e:
+            outcomes[priority] = e.reason
+
+    threads = [threading.Thread(target=wait, args=(p,)) for p in waiting]
+    for t in threads:
+        t.start()
+    while sched.stats()["queue_depth"] < len(waiting):
+        time.sleep(0.01)
+    return sched, held, outcomes, threads
+
+
+def test_higher_priority_arrival_displaces_the_lowest_waiter():
+    sched, held, outcomes, threads = full_scheduler([Priority.free, Priority.anonymous])
+    arrival = threading.Thread(target=lambda: sched.acquire(Priority.premium).release())
+    arrival.start()
+    for t in threads[1:]:
+        t.join(2)
+    assert outcomes[Priority.anonymous] == "queue full"
+    held.release()
+    arrival.join(2)
+    threads[0].join(2)
+    assert outcomes[Priority.free] == "admitted"
+    stats = sched.stats()
+    assert stats["shed_displaced"] == 1 and stats["shed_queue_full"] == 0
+
+
+def test_lowest_priority_arrival_is_rejected():
+    sched, held, outcomes, threads = full_scheduler([Priority.free, Priority.anonymous])
+    with pytest.raises(SchedulerBusy):
+        sched.acquire(Priority.anonymous)
+    held.release()
+    for t in threads:
+        t.join(2)
+    assert outcomes == {Priority.free: "admitted", Priority.anonymous: "admitted"}
+    assert sched.stats()["shed_queue_full"] == 1
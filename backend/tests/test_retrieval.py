@@ -0,0 +1,29 @@
+"""Stemming and BM25 retrieval over the knowledge file."""
+from retrieval import BM25Index, stem
+
+
+def test_inflected_forms_share_a_stem():
+    for words in (
+        "stress stressed stresses stressful",
+        "anxious anxiety anxieties",
+        "counselor counselors counseling",
+        "anonymous anonymity anonymously",
+        "therapy therapies",
+    ):
+        assert len({stem(w) for w in words.split()}) == 1, words
+
+
+def test_trailing_s_that_is_part_of_the_word_is_kept():
+    assert stem("crisis") == "crisis"
+    assert stem("status") == "status"
+
+
+def test_query_matches_other_inflections():
+    index = BM25Index([
+        "Exams and deadlines cause stress for many students.",
+        "Anxiety can disturb sleep.",
+        "Book a session with a counselor online.",
+    ])
+    assert index.top_chunks("I am so stressed", 1) == [index.chunks[0]]
+    assert index.top_chunks("I can't sleep and feel anxious", 1) == [index.chunks[1]]
+    assert index.search("hello there") == []
@@ -99,11 +99,25 @@ async function createCheckIn (payload) {
   return data // { ok, id }
 }
 
+// items: [{ client_id, mood, stress_level, notes, created_at }] queued while offline;
+// re-sending an item (same client_id) is safe
+async function syncCheckIns (items) {
+  const { data } = await api.post('/checkins/batch', { checkins: items })
+  return data ? data.results : [] // [{ client_id, status: created|duplicate|invalid, id | error }]
+}
+
 async function getRecentCheckIns (limit = 7) {
   const { data } = await api.get('/checkins', { params: { limit } })
   return data || []
 }
 
+// Data export (auth required): NDJSON ('ndjson') or gzip ('ndjson.gz') as a Blob.
+// since/until (ISO, UTC) limit it to a time range; the first line echoes `until`
+async function exportMyData ({ format = 'ndjson', since, until } = {}) {
+  const { data } = await api.get('/me/export', { params: { format, since, until }, responseType: 'blob' })
+  return data
+}
+
 // Resources (public)
 async function resources () {
   const { data } = await api.get('/resources')
@@ -167,7 +181,7 @@ export {
   createChatSession, listChatSessions, renameChatSession,
   deleteChatSession, listSessionMessages, sendInSession,
   // check-ins
-  createCheckIn, getRecentCheckIns,
+  createCheckIn, getRecentCheckIns, syncCheckIns, exportMyData,
   // resources
   resources,
   // consults
@@ -186,7 +200,7 @@ export default {
   createChatSession, listChatSessions, renameChatSession,
   deleteChatSession, listSessionMessages, sendInSession,
   // check-ins
-  createCheckIn, getRecentCheckIns,
+  createCheckIn, getRecentCheckIns, syncCheckIns, exportMyData,
   // resources
   resources,
   // consults